@@ -0,0 +1,158 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .analytics import unpack_answers
+
+# === Savol qiyinligi (Rasch shkalasi) ===
+DIFFICULTY_PRIOR = {'easy': -1.0, 'medium': 0.0, 'hard': 1.0}
+# Statistikadagi p_correct shuncha "soxta javob" og'irligidagi prior bilan aralashtiriladi
+CALIBRATION_PRIOR_WEIGHT = 20
+
+# === Foydalanuvchi mahorati ===
+OVERALL_RATE = 0.2
+ABILITY_RATE = 0.3
+QUESTION_RATE = 0.6
+# Oxirgi shuncha testda chiqqan savollar (yetarli nomzod bo'lsa) qayta berilmaydi
+REPEAT_WINDOW = 3
+MAX_TRACKED_USERS = 20000
+TIE_BREAK_JITTER = 0.05
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+class UserMastery:
+    """Bitta foydalanuvchi: umumiy va kategoriya bo'yicha qobiliyat, savol bo'yicha siljish"""
+
+    __slots__ = ('overall', 'ability', 'offset', 'last_quiz', 'quizzes', 'last_result_id')
+
+    def __init__(self, categories, questions):
+        self.overall = 0.0
+        self.ability = np.zeros(categories, dtype=np.float32)
+        self.offset = np.zeros(questions, dtype=np.float32)
+        # Savol oxirgi marta nechanchi testda chiqqan (-REPEAT_WINDOW - 1 = hech qachon)
+        self.last_quiz = np.full(questions, -REPEAT_WINDOW - 1, dtype=np.int32)
+        self.quizzes = 0
+        self.last_result_id = 0
+
+class AdaptiveSelector:
+    """Kutilgan axborot (Fisher: p(1-p)) bo'yicha keyingi savollarni tanlash.
+
+    To'g'ri javob ehtimoli p = σ(θ + θ[kategoriya] + δ[savol] - b[savol]). O'zlashtirilgan
+    savollarda p ~ 1, juda qiyinlarida p ~ 0 - ikkalasida ham axborot kam, shuning
+    uchun bola o'z darajasidagi savollarni oladi. Holat har bir test natijasi
+    bilan (observe) yangilanadi; tanlash faqat xotiradagi massivlardan.
+    """
+
+    def __init__(self, max_users=MAX_TRACKED_USERS):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+        self.source = None
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.categories = []
+        self.category_codes = np.zeros(0, dtype=np.int64)
+        self.difficulty = np.zeros(0)
+        self.prior = np.zeros(0)
+        self.position = {}
+
+    def set_questions(self, questions, source=None):
+        """Savollar bankini (id, category, difficulty) o'rnatish; eski holatlar tashlanadi"""
+        questions = [question for question in questions if 'id' in question]
+        categories = sorted({(question.get('category') or '').lower() for question in questions})
+        codes = {category: code for code, category in enumerate(categories)}
+        with self._lock:
+            self.source = source
+            self.ids = np.array([question['id'] for question in questions], dtype=np.int64)
+            self.categories = categories
+            self.category_codes = np.array(
+                [codes[(question.get('category') or '').lower()] for question in questions], dtype=np.int64)
+            self.difficulty = np.array(
+                [DIFFICULTY_PRIOR.get(question.get('difficulty'), 0.0) for question in questions])
+            self.prior = self.difficulty.copy()
+            self.position = {question_id: index for index, question_id in enumerate(self.ids.tolist())}
+            # Pozitsiyalar o'zgardi - holatlar bazadan qaytadan tiklanadi
+            self._users.clear()
+
+    def calibrate(self, question_ids, counts, p_correct):
+        """Umumiy statistikadan (ML/analytics.py) savol qiyinligini yangilash"""
+        with self._lock:
+            positions = np.array([self.position.get(question_id, -1) for question_id in np.asarray(question_ids).tolist()],
+                                 dtype=np.int64)
+            known = positions >= 0
+            if not known.any():
+                return
+            positions = positions[known]
+            counts = np.asarray(counts, dtype=np.float64)[known]
+            prior_p = sigmoid(-self.prior[positions])
+            p = (np.asarray(p_correct, dtype=np.float64)[known] * counts + prior_p * CALIBRATION_PRIOR_WEIGHT) \
+                / (counts + CALIBRATION_PRIOR_WEIGHT)
+            p = np.clip(p, 0.02, 0.98)
+            self.difficulty[positions] = -np.log(p / (1 - p))
+
+    def state(self, user_id):
+        """Foydalanuvchi holati (yo'q bo'lsa yangi); eng uzoq ishlatilmagani chiqariladi"""
+        with self._lock:
+            return self._state(user_id)
+
+    def _state(self, user_id):
+        state = self._users.get(user_id)
+        if state is None:
+            state = UserMastery(len(self.categories), len(self.ids))
+            self._users[user_id] = state
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return state
+
+    def observe(self, user_id, result_id, question_blob, correct_blob):
+        """Bitta QuizResult'ni qo'shish; avval qo'shilgan natija (id) qayta hisoblanmaydi"""
+        question_ids, _, correct = unpack_answers(question_blob, None, correct_blob)
+        with self._lock:
+            state = self._state(user_id)
+            if result_id <= state.last_result_id:
+                return
+            state.last_result_id = result_id
+            positions = np.array([self.position.get(question_id, -1) for question_id in question_ids.tolist()],
+                                 dtype=np.int64)
+            known = positions >= 0
+            if not known.any():
+                return
+            positions, correct = positions[known], correct[known].astype(np.float32)
+
+            codes = self.category_codes[positions]
+            p = sigmoid(state.overall + state.ability[codes] + state.offset[positions] - self.difficulty[positions])
+            error = correct - p
+            state.overall += OVERALL_RATE * float(error.mean())
+            # Bitta testdagi bir kategoriyali savollar qobiliyatni birga (o'rtacha) siljitadi
+            per_category = np.bincount(codes, minlength=len(self.categories))
+            np.add.at(state.ability, codes, ABILITY_RATE * error / per_category[codes])
+            state.offset[positions] += QUESTION_RATE * error
+            state.last_quiz[positions] = state.quizzes
+            state.quizzes += 1
+
+    def select(self, user_id, k, candidate_ids=None):
+        """Eng ko'p axborot beradigan k ta turli savol ID'si"""
+        with self._lock:
+            state = self._state(user_id)
+            if candidate_ids is None:
+                candidates = np.arange(len(self.ids))
+            else:
+                candidates = np.array(sorted({self.position[question_id] for question_id in candidate_ids
+                                              if question_id in self.position}), dtype=np.int64)
+            if not len(candidates):
+                return []
+
+            p = sigmoid(state.overall + state.ability[self.category_codes[candidates]] + state.offset[candidates]
+                        - self.difficulty[candidates])
+            information = p * (1 - p) * (1 + TIE_BREAK_JITTER * np.random.random(len(candidates)))
+            recent = state.last_quiz[candidates] >= state.quizzes - REPEAT_WINDOW
+            if len(candidates) - recent.sum() >= k:
+                information[recent] = -1.0
+
+            k = min(k, len(candidates))
+            chosen = np.argpartition(-information, k - 1)[:k]
+            chosen = chosen[np.argsort(-information[chosen])]
+            return self.ids[candidates[chosen]].tolist()
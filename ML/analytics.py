@@ -0,0 +1,178 @@
+import os
+import numpy as np
+
+# === Javoblarni ixcham ustunli ko'rinishda saqlash ===
+# QuizResult har bir test uchun uchta baytlar massivini saqlaydi (bir xil uzunlikda):
+# savol ID'lari (int32), tanlangan variant (int8, -1 = javob yo'q), to'g'riligi (uint8)
+QUESTION_ID_DTYPE = np.dtype('<i4')
+CHOICE_DTYPE = np.dtype('i1')
+CORRECT_DTYPE = np.dtype('u1')
+
+SCORE_BINS = 10
+STAT_FIELDS = ('n', 'sum_x', 'sum_y', 'sum_xy', 'sum_yy')
+
+def pack_answers(question_ids, choices, correct):
+    return (
+        np.asarray(question_ids, dtype=QUESTION_ID_DTYPE).tobytes(),
+        np.asarray(choices, dtype=CHOICE_DTYPE).tobytes(),
+        np.asarray(correct, dtype=CORRECT_DTYPE).tobytes(),
+    )
+
+def unpack_answers(question_blob, choice_blob, correct_blob):
+    return (
+        np.frombuffer(question_blob or b'', dtype=QUESTION_ID_DTYPE),
+        np.frombuffer(choice_blob or b'', dtype=CHOICE_DTYPE),
+        np.frombuffer(correct_blob or b'', dtype=CORRECT_DTYPE),
+    )
+
+def grow(array, size):
+    if len(array) >= size:
+        return array
+    grown = np.zeros((size,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+class QuizStats:
+    """Test tarixi bo'yicha qo'shiluvchi yig'indilar (savol ID'si bo'yicha massivlar).
+
+    Har bir savol uchun n, Σx, Σy, Σxy, Σy² saqlanadi: x - javob to'g'riligi,
+    y - shu testdagi qolgan savollar bo'yicha natija. Qiyinlik (p = Σx/n) va
+    diskriminatsiya (x va y orasidagi nuqtali-biserial korrelyatsiya) shulardan
+    olinadi. Yangi natijalar update() bilan qo'shiladi - tarix qayta o'qilmaydi.
+    """
+
+    def __init__(self):
+        self.last_result_id = 0
+        self.result_count = 0
+        self.answer_count = 0
+        self.stats = np.zeros((len(STAT_FIELDS), 0))
+        self.level_hist = np.zeros((0, SCORE_BINS), dtype=np.int64)
+        self.level_score_sum = np.zeros(0)
+
+    def update(self, result_ids, scores, levels, question_blobs, correct_blobs):
+        """Bir bo'lak QuizResult qatorlari (id bo'yicha o'sish tartibida)"""
+        if not len(result_ids):
+            return
+        scores = np.asarray(scores, dtype=np.float64)
+        levels = np.maximum(np.asarray(levels, dtype=np.int64), 0)
+        self._update_levels(scores, levels)
+
+        lengths = np.fromiter((len(blob or b'') for blob in question_blobs), dtype=np.int64,
+                              count=len(question_blobs)) // QUESTION_ID_DTYPE.itemsize
+        if lengths.sum():
+            question_ids = np.frombuffer(b''.join(blob or b'' for blob in question_blobs), dtype=QUESTION_ID_DTYPE)
+            correct = np.frombuffer(b''.join(blob or b'' for blob in correct_blobs), dtype=CORRECT_DTYPE)
+            self._update_questions(lengths, question_ids.astype(np.int64), correct.astype(np.float64))
+
+        self.last_result_id = int(max(result_ids))
+        self.result_count += len(result_ids)
+
+    def _update_levels(self, scores, levels):
+        bins = np.clip((scores // (100 / SCORE_BINS)).astype(np.int64), 0, SCORE_BINS - 1)
+        self.level_hist = grow(self.level_hist, int(levels.max()) + 1)
+        self.level_score_sum = grow(self.level_score_sum, len(self.level_hist))
+        size = len(self.level_hist)
+        self.level_hist += np.bincount(levels * SCORE_BINS + bins, minlength=size * SCORE_BINS).reshape(size, SCORE_BINS)
+        self.level_score_sum += np.bincount(levels, weights=scores, minlength=size)
+
+    def _update_questions(self, lengths, question_ids, correct):
+        # Har bir javob qaysi testga tegishli va shu testdagi to'g'ri javoblar soni
+        attempt = np.repeat(np.arange(len(lengths)), lengths)
+        totals = np.bincount(attempt, weights=correct, minlength=len(lengths))
+        others = (lengths - 1)[attempt]
+        # Bitta savolli testda "qolgan savollar" yo'q - diskriminatsiyaga qo'shilmaydi
+        usable = others > 0
+        question_ids, correct = question_ids[usable], correct[usable]
+        rest = (totals[attempt][usable] - correct) / others[usable]
+
+        size = int(question_ids.max()) + 1 if len(question_ids) else 0
+        if len(self.stats[0]) < size:
+            self.stats = grow(self.stats.T, size).T.copy()
+        width = len(self.stats[0])
+        for row, weights in enumerate((None, correct, rest, correct * rest, rest * rest)):
+            self.stats[row] += np.bincount(question_ids, weights=weights, minlength=width)
+        self.answer_count += int(usable.sum())
+
+    def questions(self):
+        """Javob berilgan savollar: (id, n, qiyinlik p, diskriminatsiya r yoki nan)"""
+        ids = np.flatnonzero(self.stats[0])
+        n, sum_x, sum_y, sum_xy, sum_yy = (column[ids] for column in self.stats)
+        mean_x = sum_x / n
+        mean_y = sum_y / n
+        cov = sum_xy / n - mean_x * mean_y
+        var = mean_x * (1 - mean_x) * (sum_yy / n - mean_y ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            discrimination = np.where(var > 1e-12, cov / np.sqrt(np.maximum(var, 1e-12)), np.nan)
+        return ids, n.astype(np.int64), mean_x, discrimination
+
+    def report(self, question_meta):
+        """question_meta: id -> {'question', 'category', 'difficulty'} (savollar banki)"""
+        ids, counts, difficulty, discrimination = self.questions()
+        correct = self.stats[1][ids] if len(ids) else np.zeros(0)
+
+        questions = []
+        for question_id, count, p, r in zip(ids.tolist(), counts.tolist(), difficulty.tolist(),
+                                            discrimination.tolist()):
+            meta = question_meta.get(question_id, {})
+            questions.append({
+                'id': question_id,
+                'question': meta.get('question'),
+                'category': meta.get('category'),
+                'difficulty': meta.get('difficulty'),
+                'answers': count,
+                'p_correct': round(p, 4),
+                'discrimination': None if np.isnan(r) else round(r, 4),
+            })
+
+        # Kategoriya bo'yicha aniqlik: savol yig'indilarini kategoriya kodlari bilan guruhlash
+        categories = [question_meta.get(question_id, {}).get('category') or 'noma\'lum' for question_id in ids.tolist()]
+        names, codes = np.unique(np.array(categories, dtype=object), return_inverse=True) if categories \
+            else (np.array([], dtype=object), np.zeros(0, dtype=np.int64))
+        category_answers = np.bincount(codes, weights=counts, minlength=len(names))
+        category_correct = np.bincount(codes, weights=correct, minlength=len(names))
+        category_stats = sorted((
+            {'category': name, 'answers': int(total), 'accuracy': round(right / total, 4)}
+            for name, total, right in zip(names.tolist(), category_answers.tolist(), category_correct.tolist())
+        ), key=lambda row: row['accuracy'])
+
+        level_counts = self.level_hist.sum(axis=1)
+        levels = [
+            {
+                'level': level,
+                'results': int(level_counts[level]),
+                'mean_score': round(float(self.level_score_sum[level] / level_counts[level]), 2),
+                'histogram': self.level_hist[level].tolist(),
+            }
+            for level in np.flatnonzero(level_counts).tolist()
+        ]
+
+        return {
+            'results': self.result_count,
+            'answers': self.answer_count,
+            'score_bins': [f'{int(low)}-{int(low + 100 / SCORE_BINS)}' for low in np.arange(SCORE_BINS) * 100 / SCORE_BINS],
+            'questions': sorted(questions, key=lambda row: row['p_correct']),
+            'categories': category_stats,
+            'levels': levels,
+        }
+
+    # === Ishga tushirishlar orasida diskda saqlash ===
+    def save(self, path):
+        temporary = f'{path}.tmp'
+        with open(temporary, 'wb') as f:
+            np.savez(f, counters=np.array([self.last_result_id, self.result_count, self.answer_count]),
+                     stats=self.stats, level_hist=self.level_hist, level_score_sum=self.level_score_sum)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """Saqlangan statistika yoki fayl yo'q/buzilgan bo'lsa bo'sh obyekt"""
+        stats = cls()
+        try:
+            with np.load(path) as data:
+                stats.last_result_id, stats.result_count, stats.answer_count = (int(value) for value in data['counters'])
+                stats.stats = data['stats']
+                stats.level_hist = data['level_hist']
+                stats.level_score_sum = data['level_score_sum']
+        except (OSError, KeyError, ValueError):
+            return cls()
+        return stats
@@ -1,41 +1,208 @@
 import json
+import os
+import re
+import sys
+import time
+import random
+import threading
+from collections import Counter
 from difflib import SequenceMatcher
 
-# === JSON fayldan variantlarni yuklash ===
-with open("ML/eco_roots.json", "r", encoding="utf-8") as f:
-    variants = json.load(f)
+VARIANTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eco_roots.json")
+
+NGRAM_SIZE = 3
+# Aniq o'xshashlik faqat shuncha nomzod uchun hisoblanadi
+SHORTLIST_SIZE = 30
+# Variantlarning yarmidan ko'pida uchraydigan n-gramlar (masalan " ed", "di ") nomzod tanlamaydi
+COMMON_NGRAM_RATIO = 0.5
+
+# O‘zbek lotin yozuvidagi apostrof shakllari: ‘ ’ ʻ ʼ ` ´ -> '
+APOSTROPHES = str.maketrans({char: "'" for char in "‘’ʻʼ`´′"})
+NON_WORD = re.compile(r"[^\w' ]+")
+SPACES = re.compile(r"\s+")
 
 # === Matnni normallashtirish ===
 def normalize(text: str):
-    return text.lower().strip()
+    text = text.lower().translate(APOSTROPHES)
+    text = NON_WORD.sub(" ", text)
+    return SPACES.sub(" ", text).strip()
 
 # === O‘xshashlikni % hisoblash ===
 def similarity(a, b):
     return SequenceMatcher(None, a, b).ratio()
 
-# === Asosiy funksiya ===
+def ngrams(text, size=NGRAM_SIZE):
+    padded = f" {text} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+class AnswerMatcher:
+    """Variantlar bir marta normallashtiriladi va n-gram indeksiga joylanadi.
+
+    Javob uchun avval indeks orqali umumiy n-gramlari ko'p bo'lgan nomzodlar
+    tanlanadi (Dice koeffitsienti), SequenceMatcher esa faqat shu qisqa ro'yxatda
+    ishlaydi. Aniq moslik (normallashtirilgandan keyin) lug'atdan olinadi.
+    """
+
+    def __init__(self, variants, ngram_size=NGRAM_SIZE, shortlist_size=SHORTLIST_SIZE):
+        self.variants = list(variants)
+        self.ngram_size = ngram_size
+        self.shortlist_size = shortlist_size
+        self.normalized = [normalize(variant) for variant in self.variants]
+        self.exact = {}
+        self.gram_counts = []
+        self.index = {}
+        for variant_id, text in enumerate(self.normalized):
+            self.exact.setdefault(text, variant_id)
+            grams = ngrams(text, ngram_size)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.index.setdefault(gram, []).append(variant_id)
+        self.common_limit = max(1, int(len(self.variants) * COMMON_NGRAM_RATIO))
+
+    def shortlist(self, text):
+        grams = ngrams(text, self.ngram_size)
+        postings = [self.index[gram] for gram in grams if gram in self.index]
+        selective = [posting for posting in postings if len(posting) <= self.common_limit]
+        # Faqat keng tarqalgan n-gramlar bo'lsa, ular ham hisobga olinadi
+        overlaps = Counter()
+        for posting in selective or postings:
+            overlaps.update(posting)
+        scored = (
+            (2 * overlap / (len(grams) + self.gram_counts[variant_id]), variant_id)
+            for variant_id, overlap in overlaps.items()
+        )
+        return [variant_id for _, variant_id in sorted(scored, reverse=True)[:self.shortlist_size]]
+
+    def best_match(self, text):
+        """(variant_id, o'xshashlik 0..1) yoki umumiy n-gram bo'lmasa (None, 0.0)"""
+        if text in self.exact:
+            return self.exact[text], 1.0
+        # SequenceMatcher simmetrik emas: similarity() dagidek javob - a, variant - b
+        matcher = SequenceMatcher(None)
+        matcher.set_seq1(text)
+        best_id, best_score = None, 0.0
+        for variant_id in self.shortlist(text):
+            matcher.set_seq2(self.normalized[variant_id])
+            if matcher.real_quick_ratio() <= best_score or matcher.quick_ratio() <= best_score:
+                continue
+            score = matcher.ratio()
+            if score > best_score:
+                best_id, best_score = variant_id, score
+        return best_id, best_score
+
+    def check_answer(self, user_answer: str):
+        variant_id, score = self.best_match(normalize(user_answer))
+        return {
+            "user_answer": user_answer,
+            "best_match": self.variants[variant_id] if variant_id is not None else None,
+            "match_percent": round(score * 100, 2)
+        }
+
+    def check_answers(self, answers):
+        """Bir nechta javob: bir xil normallashgan javoblar bir marta hisoblanadi"""
+        results = {}
+        output = []
+        for user_answer in answers:
+            text = normalize(user_answer)
+            if text not in results:
+                results[text] = self.best_match(text)
+            variant_id, score = results[text]
+            output.append({
+                "user_answer": user_answer,
+                "best_match": self.variants[variant_id] if variant_id is not None else None,
+                "match_percent": round(score * 100, 2)
+            })
+        return output
+
+# === JSON fayldan variantlarni yuklash (birinchi chaqiruvda) ===
+_default_matcher = None
+_default_matcher_lock = threading.Lock()
+
+def load_variants(path=VARIANTS_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def get_matcher():
+    global _default_matcher
+    if _default_matcher is None:
+        # Web ilovada bir necha oqim birinchi so'rovni bir vaqtda yuborishi mumkin
+        with _default_matcher_lock:
+            if _default_matcher is None:
+                _default_matcher = AnswerMatcher(load_variants())
+    return _default_matcher
+
+# === Asosiy funksiyalar ===
 def check_answer(user_answer: str):
+    return get_matcher().check_answer(user_answer)
+
+def check_answers(answers):
+    return get_matcher().check_answers(answers)
+
+# === Benchmark: chiziqli SequenceMatcher va indeks ===
+def linear_check_answer(variants, user_answer):
+    """Eski usul: har bir variant har safar normallashtiriladi va solishtiriladi"""
     user_norm = normalize(user_answer)
+    best_match, best_score = max(
+        ((variant, similarity(user_norm, normalize(variant))) for variant in variants),
+        key=lambda x: x[1]
+    )
+    return best_match, best_score
+
+def synthetic_variants(base, count, seed=42):
+    """Asosiy variantlardagi so'zlarni aralashtirib count ta yangi variant yaratish"""
+    rng = random.Random(seed)
+    words = sorted({word for variant in base for word in variant.split()})
+    generated = list(base)
+    while len(generated) < count:
+        generated.append(" ".join(rng.sample(words, rng.randint(2, 5))))
+    return generated[:count]
+
+def with_typo(text, rng):
+    if len(text) < 4:
+        return text
+    position = rng.randrange(len(text))
+    return text[:position] + rng.choice("abdeiklmnorstuy") + text[position + 1:]
+
+def benchmark(sizes=(100, 1000, 10000, 30000), queries=50, linear_limit=10000):
+    base = load_variants()
+    rng = random.Random(7)
+    print(f"{'variantlar':>10} {'chiziqli ms':>12} {'indeks ms':>10} {'tezlik':>8} {'mos':>6}")
+    for size in sizes:
+        variants = synthetic_variants(base, size)
+        answers = [with_typo(rng.choice(variants), rng) for _ in range(queries)]
 
-    scores = []
-    for variant in variants:
-        score = similarity(user_norm, normalize(variant))
-        scores.append((variant, score))
+        started = time.perf_counter()
+        matcher = AnswerMatcher(variants)
+        build_ms = (time.perf_counter() - started) * 1000
 
-    # eng yaxshi mos kelgan javob
-    best_match, best_score = max(scores, key=lambda x: x[1])
+        started = time.perf_counter()
+        indexed = [matcher.best_match(normalize(answer)) for answer in answers]
+        indexed_ms = (time.perf_counter() - started) * 1000 / queries
 
-    return {
-        "user_answer": user_answer,
-        "best_match": best_match,
-        "match_percent": round(best_score * 100, 2)
-    }
+        if size <= linear_limit:
+            started = time.perf_counter()
+            linear = [linear_check_answer(variants, answer) for answer in answers]
+            linear_ms = (time.perf_counter() - started) * 1000 / queries
+            agree = sum(
+                round(score, 6) == round(linear_score, 6)
+                for (_, score), (_, linear_score) in zip(indexed, linear)
+            ) / queries
+            print(f"{size:>10} {linear_ms:>12.2f} {indexed_ms:>10.3f} {linear_ms / indexed_ms:>7.0f}x {agree:>6.0%}")
+        else:
+            print(f"{size:>10} {'-':>12} {indexed_ms:>10.3f} {'':>8} {'':>6}")
+        print(f"{'':>10} indeks qurish: {build_ms:.0f} ms")
 
 # ======= TEST ========
-user_input = input("Javobni kiriting: ")
-result = check_answer(user_input)
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark()
+    else:
+        user_input = input("Javobni kiriting: ")
+        result = check_answer(user_input)
 
-print("\nNatija:")
-print("Sizning javob:", result["user_answer"])
-print("Eng yaqin javob:", result["best_match"])
-print("O‘xshashlik foizi:", result["match_percent"], "%")
+        print("\nNatija:")
+        print("Sizning javob:", result["user_answer"])
+        print("Eng yaqin javob:", result["best_match"])
+        print("O‘xshashlik foizi:", result["match_percent"], "%")
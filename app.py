@@ -1,21 +1,40 @@
 # app.py - TO'LIQ ECOVERSE BACKEND TIZIMI
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, Response, g, has_request_context, before_render_template, template_rendered
 from flask_sqlalchemy import SQLAlchemy
+from markupsafe import Markup
+from ecoverse import DATABASE_PATH, content_trigger_statements
+from ML.ml import get_matcher as get_answer_matcher, normalize as normalize_answer
+from ML.analytics import QuizStats, pack_answers
+from ML.adaptive import AdaptiveSelector
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import os
 import json
 import random
-from sqlalchemy import func
+import hashlib
+import base64
+from sqlalchemy import func, select, insert, update, delete, case, literal, or_, inspect, text, event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError, OperationalError
 import threading
 import time
+import queue
+import socket
+import uuid
+import bisect
+import math
+import atexit
+from collections import deque, Counter, OrderedDict
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'eco-verse-2024-secret-key'
 
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "ecoverse.db")}'
+# Telegram bot ham shu bazadan foydalanadi (ecoverse.DATABASE_PATH)
+app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DATABASE_PATH}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
@@ -25,6 +44,13 @@ login_manager.login_view = 'login'
 
 # DATABASE MODELLARI
 class User(UserMixin, db.Model):
+    __table_args__ = (
+        db.Index('ix_user_created', 'created_at'),
+        db.Index('ix_user_role_created', 'role', 'created_at'),
+        db.Index('ix_user_role_coins', 'role', 'coins'),
+        db.Index('ix_user_coins', 'coins'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -40,8 +66,14 @@ class User(UserMixin, db.Model):
     last_daily_reset = db.Column(db.DateTime, default=datetime.utcnow)
     level = db.Column(db.Integer, default=1)
     experience = db.Column(db.Integer, default=0)
+    stats_version = db.Column(db.Integer, default=0)
 
 class Task(db.Model):
+    __table_args__ = (
+        db.Index('ix_task_created', 'created_at'),
+        db.Index('ix_task_reward', 'reward_coins'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -71,6 +103,10 @@ class DailyTask(db.Model):
     quiz_1 = db.relationship('Task', foreign_keys=[quiz_1_id])
 
 class Item(db.Model):
+    __table_args__ = (
+        db.Index('ix_item_price', 'price'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     price = db.Column(db.Integer, nullable=False)
@@ -88,6 +124,10 @@ class EnergyPack(db.Model):
     is_active = db.Column(db.Boolean, default=True)
 
 class Inventory(db.Model):
+    __table_args__ = (
+        db.Index('ix_inventory_user_equipped', 'user_id', 'equipped'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     item_id = db.Column(db.Integer, db.ForeignKey('item.id'), nullable=False)
@@ -97,6 +137,12 @@ class Inventory(db.Model):
     item = db.relationship('Item', backref='inventory_items')
 
 class News(db.Model):
+    __table_args__ = (
+        db.Index('ix_news_status_created', 'status', 'created_at'),
+        db.Index('ix_news_created', 'created_at'),
+        db.Index('ix_news_views', 'views_count'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -110,6 +156,12 @@ class News(db.Model):
     author = db.relationship('User', backref=db.backref('news_posts', lazy=True))
 
 class Announcement(db.Model):
+    __table_args__ = (
+        db.Index('ix_announcement_active_window', 'is_active', 'start_date', 'end_date'),
+        db.Index('ix_announcement_created', 'created_at'),
+        db.Index('ix_announcement_start', 'start_date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -122,6 +174,10 @@ class Announcement(db.Model):
     author = db.relationship('User', backref=db.backref('announcements', lazy=True))
 
 class QuizResult(db.Model):
+    __table_args__ = (
+        db.Index('ix_quiz_result_user_task_completed', 'user_id', 'task_id', 'completed_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     score = db.Column(db.Integer, nullable=False)
@@ -130,10 +186,20 @@ class QuizResult(db.Model):
     coins_earned = db.Column(db.Integer, nullable=False)
     completed_at = db.Column(db.DateTime, default=datetime.utcnow)
     task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=True)
+    # Test paytidagi daraja va javoblar ustunli ko'rinishda (ML/analytics.py: pack_answers)
+    user_level = db.Column(db.Integer, nullable=True)
+    question_ids = db.Column(db.LargeBinary, nullable=True)
+    chosen_options = db.Column(db.LargeBinary, nullable=True)
+    correct_flags = db.Column(db.LargeBinary, nullable=True)
     user = db.relationship('User', backref='quiz_results')
     task = db.relationship('Task', backref='quiz_results')
 
 class UserTask(db.Model):
+    __table_args__ = (
+        db.Index('uq_user_task_user_task', 'user_id', 'task_id', unique=True),
+        db.Index('ix_user_task_user_completed', 'user_id', 'completed', 'task_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     task_id = db.Column(db.Integer, db.ForeignKey('task.id'), nullable=False)
@@ -144,6 +210,11 @@ class UserTask(db.Model):
     task = db.relationship('Task', backref='user_tasks')
 
 class DailyProgress(db.Model):
+    __table_args__ = (
+        db.Index('uq_daily_progress_user_date', 'user_id', 'date', unique=True),
+        db.Index('ix_daily_progress_date', 'date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -162,27 +233,260 @@ class UserAchievement(db.Model):
     earned_at = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('User', backref='achievements')
 
+class CoinTransaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_coin_transaction_user_created', 'user_id', 'created_at'),
+        db.Index('ix_coin_transaction_created', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    balance_after = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(30), nullable=False)
+    reference = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class EnergyTransaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_energy_transaction_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    amount = db.Column(db.Integer, nullable=False)
+    balance_after = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(30), nullable=False)
+    reference = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Admin qidiruvi va saralash uchun registrga bog'liq bo'lmagan ifoda indekslari
+db.Index('ix_user_username_lower', func.lower(User.username))
+db.Index('ix_user_email_lower', func.lower(User.email))
+db.Index('ix_task_title_lower', func.lower(Task.title))
+db.Index('ix_item_name_lower', func.lower(Item.name))
+db.Index('ix_news_title_lower', func.lower(News.title))
+db.Index('ix_announcement_title_lower', func.lower(Announcement.title))
+
+class TelegramUser(db.Model):
+    # Bot ecoverse.ProfileService orqali o'qiydi va yozadi
+    id = db.Column(db.Integer, primary_key=True)
+    telegram_id = db.Column(db.BigInteger, unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    username = db.Column(db.String(80))
+    first_name = db.Column(db.String(100))
+    last_name = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User', backref=db.backref('telegram_accounts', lazy=True))
+
+class ContentVersion(db.Model):
+    # Item/News/Announcement triggerlari oshiradi: bot tayyor matnlarini shunga qarab yangilaydi
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class SchemaVersion(db.Model):
+    version = db.Column(db.Integer, primary_key=True)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class JobLease(db.Model):
+    job_name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(120))
+    expires_at = db.Column(db.DateTime)
+    last_run_for = db.Column(db.DateTime)
+
+class JobRun(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(50), nullable=False, index=True)
+    scheduled_for = db.Column(db.DateTime, nullable=False)
+    owner = db.Column(db.String(120), nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Integer)
+    status = db.Column(db.String(20), default='running')
+    error = db.Column(db.Text)
+
 @login_manager.user_loader
 def load_user(user_id):
     return db.session.get(User, int(user_id))
 
+# SCHEMA MIGRATSIYA (drop_all'siz mavjud bazani yangilash)
+# Unique indekslar qo'shilishidan oldin takrorlangan qatorlar tozalanadi
+DEDUPLICATE_KEYS = {
+    'user_task': ('user_id', 'task_id'),
+    'daily_progress': ('user_id', 'date'),
+}
+
+def add_missing_columns(inspector, table):
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        column_type = column.type.compile(dialect=db.engine.dialect)
+        ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+        if column.default is not None and column.default.is_scalar:
+            ddl += f' DEFAULT {literal(column.default.arg).compile(compile_kwargs={"literal_binds": True})}'
+        db.session.execute(text(ddl))
+        added.append(f'{table.name}.{column.name}')
+    return added
+
+def deduplicate_rows(table_name, key_columns):
+    keys = ', '.join(key_columns)
+    result = db.session.execute(text(
+        f'DELETE FROM "{table_name}" WHERE id NOT IN '
+        f'(SELECT MIN(id) FROM "{table_name}" GROUP BY {keys})'
+    ))
+    return max(result.rowcount, 0)
+
+def migrate_schema():
+    """Yetishmayotgan jadval, ustun va indekslarni qo'shish (idempotent)"""
+    db.create_all()
+    inspector = inspect(db.engine)
+    report = {'columns': [], 'indexes': [], 'deduplicated': {}}
+    
+    for table in db.metadata.sorted_tables:
+        report['columns'].extend(add_missing_columns(inspector, table))
+        
+        # inspector.get_indexes() lower(...) kabi ifoda indekslarini qaytarmaydi
+        existing_indexes = set(db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+            {'table': table.name}
+        ).scalars())
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if index.unique and table.name in DEDUPLICATE_KEYS:
+                removed = deduplicate_rows(table.name, DEDUPLICATE_KEYS[table.name])
+                if removed:
+                    report['deduplicated'][table.name] = removed
+            db.session.commit()
+            index.create(bind=db.engine, checkfirst=True)
+            report['indexes'].append(index.name)
+    
+    db.session.commit()
+    with db.engine.begin() as connection:
+        for statement in content_trigger_statements():
+            connection.exec_driver_sql(statement)
+    return report
+
+# Eng ko'p ishlatiladigan so'rovlar: to'liq jadval skanerlashiga tushmasligi kerak
+HOT_QUERIES = {
+    'user_task_lookup': lambda: select(UserTask).where(UserTask.user_id == 1, UserTask.task_id == 1),
+    'user_task_completed': lambda: select(UserTask.task_id).where(UserTask.user_id == 1, UserTask.completed == True),
+    'daily_progress_today': lambda: select(DailyProgress).where(DailyProgress.user_id == 1, DailyProgress.date == datetime.utcnow().date()),
+    'daily_progress_by_date': lambda: select(DailyProgress).where(DailyProgress.date == datetime.utcnow().date()),
+    'latest_quiz_for_task': lambda: select(QuizResult).where(QuizResult.user_id == 1, QuizResult.task_id == 1).order_by(QuizResult.completed_at.desc()).limit(1),
+    'equipped_inventory': lambda: select(Inventory).where(Inventory.user_id == 1, Inventory.equipped == True),
+    'active_news': lambda: select(News).where(News.status == 'active').order_by(News.created_at.desc()).limit(3),
+    'active_announcements': lambda: select(Announcement).where(
+        Announcement.is_active == True,
+        Announcement.start_date <= datetime.utcnow(),
+        Announcement.end_date >= datetime.utcnow()
+    ),
+    'admin_child_page': lambda: select(User).where(User.role == 'child').order_by(User.created_at.desc(), User.id.desc()).limit(51),
+    'admin_user_search': lambda: select(User).where(or_(
+        (func.lower(User.username) >= 'eco') & (func.lower(User.username) < 'eco\U0010ffff'),
+        (func.lower(User.email) >= 'eco') & (func.lower(User.email) < 'eco\U0010ffff'),
+    )).limit(51),
+    'admin_tasks_page': lambda: select(Task).order_by(Task.created_at.desc(), Task.id.desc()).limit(51),
+    'top_viewed_news': lambda: select(News.id, News.views_count).where(News.status == 'active').order_by(News.views_count.desc(), News.id).limit(5),
+    'quiz_results_since': lambda: select(QuizResult.id, QuizResult.question_ids, QuizResult.correct_flags).where(QuizResult.user_id == 1, QuizResult.id > 0).order_by(QuizResult.id),
+    'admin_news_by_title': lambda: select(News).order_by(func.lower(News.title), News.id).limit(51),
+}
+
+def check_query_plans():
+    """EXPLAIN QUERY PLAN orqali to'liq skanerlangan so'rovlarni topish"""
+    failures = {}
+    for name, build_query in HOT_QUERIES.items():
+        statement = build_query().compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+        plan = [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}'))]
+        full_scans = [step for step in plan if step.startswith('SCAN') and 'INDEX' not in step]
+        if full_scans:
+            failures[name] = plan
+    return failures
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Mavjud bazaga yangi ustun va indekslarni qo'shish."""
+    report = migrate_schema()
+    print(f"✅ Schema yangilandi: {len(report['columns'])} ustun, {len(report['indexes'])} indeks")
+    for table_name, removed in report['deduplicated'].items():
+        print(f"   🧹 {table_name}: {removed} ta takroriy qator o'chirildi")
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Issiq so'rovlar indeksdan foydalanishini tekshirish."""
+    failures = check_query_plans()
+    for name, plan in failures.items():
+        print(f"❌ {name}: {' | '.join(plan)}")
+    if failures:
+        raise SystemExit(1)
+    print(f"✅ {len(HOT_QUERIES)} ta so'rov indeks orqali bajariladi")
+
+# Modellar o'zgarganda oshiriladi: ishga tushishda migrate_schema() faqat shunda ishlaydi
+SCHEMA_VERSION = 7
+STARTUP_BUDGET_SECONDS = 1.0
+
+def current_schema_version():
+    try:
+        return db.session.query(func.max(SchemaVersion.version)).scalar() or 0
+    except OperationalError:
+        # schema_version jadvali hali yo'q
+        db.session.rollback()
+        return 0
+
 def init_database():
+    """Idempotent bootstrap: ma'lumotlar o'chirilmaydi, faqat yetishmayotgan schema qo'shiladi"""
+    started = time.perf_counter()
     with app.app_context():
-        try:
-            db.drop_all()
-            db.create_all()
-            create_demo_data()
-            print("✅ Database yangilandi!")
-            
-            # Kunlik vazifalarni yaratish - APP CONTEXT ICHIDA
-            create_daily_tasks()
-            
-        except Exception as e:
-            print(f"❌ Database yangilashda xatolik: {e}")
-            db.create_all()
-            create_demo_data()
-            print("✅ Database yaratildi!")
-            create_daily_tasks()
+        version = current_schema_version()
+        if version < SCHEMA_VERSION:
+            report = migrate_schema()
+            try:
+                db.session.add(SchemaVersion(version=SCHEMA_VERSION))
+                db.session.commit()
+            except IntegrityError:
+                # Boshqa worker allaqachon yozib qo'ygan
+                db.session.rollback()
+            print(f"✅ Database schema v{version} -> v{SCHEMA_VERSION} "
+                  f"({len(report['columns'])} ustun, {len(report['indexes'])} indeks)")
+        
+        if not db.session.query(User.id).first():
+            print("ℹ️  Database bo'sh. Demo ma'lumotlar uchun: flask seed-demo")
+        
+        # Kunlik vazifalarni yaratish - APP CONTEXT ICHIDA
+        create_daily_tasks()
+    
+    elapsed = time.perf_counter() - started
+    if elapsed > STARTUP_BUDGET_SECONDS:
+        print(f"⚠️  Ishga tushish {elapsed:.2f}s davom etdi (limit {STARTUP_BUDGET_SECONDS}s)")
+    return elapsed
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Schema'ni yaratish/yangilash (ma'lumotlar saqlanadi)."""
+    elapsed = init_database()
+    print(f"✅ Database tayyor ({elapsed * 1000:.0f} ms)")
+
+@app.cli.command('seed-demo')
+def seed_demo_command():
+    """Demo foydalanuvchi, topshiriq va mahsulotlarni qo'shish (faqat bo'sh bazaga)."""
+    init_database()
+    if db.session.query(User.id).first():
+        print("ℹ️  Database bo'sh emas, demo ma'lumotlar qo'shilmadi")
+        return
+    create_demo_data()
+    create_daily_tasks()
+    print("✅ Demo ma'lumotlar qo'shildi!")
+
+@app.cli.command('startup-check')
+def startup_check_command():
+    """Ishga tushish vaqti STARTUP_BUDGET_SECONDS ichida ekanini tekshirish."""
+    elapsed = init_database()
+    if elapsed > STARTUP_BUDGET_SECONDS:
+        print(f"❌ Ishga tushish {elapsed * 1000:.0f} ms (limit {STARTUP_BUDGET_SECONDS * 1000:.0f} ms)")
+        raise SystemExit(1)
+    print(f"✅ Ishga tushish {elapsed * 1000:.0f} ms")
 
 def create_demo_data():
     # Asosiy topshiriqlar
@@ -285,69 +589,269 @@ def create_demo_data():
     
     db.session.commit()
 
+# KUNLIK TOPSHIRIQLAR REJASI
+# Rejalar oldindan (ishga tushishda, 00:00 job'ida, admin o'zgarishlarida) bir nechta kunga
+# yoziladi va 00:00 job'i oynani har kuni to'ldiradi. So'rov yo'li odatda faqat o'qiydi:
+# bugungi reja jarayon ichida keshlanadi, reja umuman bo'lmasa kuniga bir marta tuziladi.
+DAILY_PLAN_DAYS = 7
+DAILY_PLAN_HISTORY_DAYS = 7
+DAILY_TASK_SLOTS = 3
+PLAN_COLUMNS = ('task_1_id', 'task_2_id', 'task_3_id', 'quiz_1_id')
+
+def pick_least_recent(task_ids, last_used, date, count):
+    """Eng uzoq vaqt ishlatilmagan topshiriqlar; teng bo'lsa tasodifiy"""
+    def staleness(task_id):
+        used = last_used.get(task_id)
+        days = (date - used).days if used else DAILY_PLAN_HISTORY_DAYS + 1
+        return min(days, DAILY_PLAN_HISTORY_DAYS + 1) + random.random()
+    return sorted(task_ids, key=staleness, reverse=True)[:count]
+
+def plan_daily_tasks(days=DAILY_PLAN_DAYS, start=None):
+    """Bugundan `days` kunga yetishmayotgan DailyTask rejalarini bitta INSERT bilan yozish.
+    
+    Bir nechta worker bir vaqtda chaqirsa ham xavfsiz: sana unique, mavjud reja
+    ON CONFLICT DO NOTHING bilan o'tkazib yuboriladi. Yozilgan rejalar soni qaytariladi.
+    """
+    start = start or datetime.utcnow().date()
+    end = start + timedelta(days=days)
+    existing = db.session.execute(
+        select(DailyTask.date, *(getattr(DailyTask, column) for column in PLAN_COLUMNS))
+        .where(DailyTask.date >= start - timedelta(days=DAILY_PLAN_HISTORY_DAYS), DailyTask.date < end)
+        .order_by(DailyTask.date)
+    ).all()
+    planned = {row.date: row for row in existing}
+    dates = [start + timedelta(days=offset) for offset in range(days)]
+    if all(date in planned for date in dates):
+        return 0
+    
+    daily_ids = db.session.execute(select(Task.id).where(Task.task_type == 'daily', Task.is_active == True)).scalars().all()
+    quiz_ids = db.session.execute(select(Task.id).where(Task.task_type == 'quiz', Task.is_active == True)).scalars().all()
+    if len(daily_ids) < DAILY_TASK_SLOTS or not quiz_ids:
+        return 0
+    
+    # Oxirgi kunlardagi va allaqachon rejalangan kunlardagi topshiriqlar qayta tanlanmaslikka intiladi
+    last_used = {}
+    for row in existing:
+        if row.date < start:
+            for task_id in row[1:]:
+                last_used[task_id] = row.date
+    
+    rows = []
+    for date in dates:
+        if date in planned:
+            task_ids = planned[date][1:]
+        else:
+            task_ids = pick_least_recent(daily_ids, last_used, date, DAILY_TASK_SLOTS) + \
+                       pick_least_recent(quiz_ids, last_used, date, 1)
+            rows.append({'date': date, **dict(zip(PLAN_COLUMNS, task_ids)), 'created_at': datetime.utcnow()})
+        for task_id in task_ids:
+            last_used[task_id] = date
+    
+    result = db.session.execute(
+        sqlite_insert(DailyTask).values(rows).on_conflict_do_nothing(index_elements=['date'])
+    )
+    db.session.commit()
+    created = max(result.rowcount, 0)
+    if created:
+        # Shu jarayonda "reja yo'q" deb eslab qolingan sana qayta o'qiladi
+        plan_missed_at.clear()
+        print(f"✅ Kunlik topshiriqlar rejalandi: {dates[0]} - {dates[-1]} ({created} kun)")
+    return created
+
+def replan_daily_tasks(task_id):
+    """Topshiriq o'zgarganda/o'chirilganda ertangi va keyingi rejalarni qayta tuzish"""
+    tomorrow = datetime.utcnow().date() + timedelta(days=1)
+    db.session.execute(
+        delete(DailyTask)
+        .where(DailyTask.date >= tomorrow)
+        .where(or_(*(getattr(DailyTask, column) == task_id for column in PLAN_COLUMNS)))
+    )
+    db.session.commit()
+    return plan_daily_tasks()
+
 def create_daily_tasks():
-    """Har kuni yangi topshiriqlar yaratish"""
+    """Rejalarni to'ldirish va bugungi DailyTask'ni qaytarish (scheduler, admin, CLI uchun)"""
+    plan_daily_tasks()
+    return DailyTask.query.filter_by(date=datetime.utcnow().date()).first()
+
+# sana -> bugungi (task_1, task_2, task_3, quiz_1) id'lari
+todays_plan_cache = {}
+# Reja topilmasa so'rovlar uni tuzmaydi (scheduler tuzadi) - bazaga shu oraliqda qayta qaraladi
+PLAN_MISS_RECHECK_SECONDS = 60
+plan_missed_at = {}
+
+def load_todays_plan(today):
+    return db.session.execute(
+        select(*(getattr(DailyTask, column) for column in PLAN_COLUMNS)).where(DailyTask.date == today)
+    ).first()
+
+def todays_plan():
+    """Bugungi reja id'lari yoki None (reja hali tuzilmagan); faqat o'qiydi"""
     today = datetime.utcnow().date()
-    
-    # Bugun uchun topshiriqlar mavjudligini tekshirish
-    existing_daily = DailyTask.query.filter_by(date=today).first()
-    if existing_daily:
-        return existing_daily
-    
-    # Kunlik topshiriqlarni olish
-    daily_tasks = Task.query.filter_by(task_type='daily', is_active=True).all()
-    quiz_tasks = Task.query.filter_by(task_type='quiz', is_active=True).all()
-    
-    if len(daily_tasks) >= 3 and len(quiz_tasks) >= 1:
-        # Tasodifiy kunlik topshiriqlar tanlash
-        selected_daily = random.sample(daily_tasks, 3)
-        selected_quiz = random.choice(quiz_tasks)
-        
-        new_daily = DailyTask(
-            date=today,
-            task_1_id=selected_daily[0].id,
-            task_2_id=selected_daily[1].id,
-            task_3_id=selected_daily[2].id,
-            quiz_1_id=selected_quiz.id
-        )
-        
-        db.session.add(new_daily)
-        db.session.commit()
-        print(f"✅ Kunlik topshiriqlar yaratildi: {today}")
-        return new_daily
-    
-    return None
+    plan = todays_plan_cache.get(today)
+    if plan is None:
+        missed_at = plan_missed_at.get(today)
+        if missed_at is not None and time.monotonic() - missed_at < PLAN_MISS_RECHECK_SECONDS:
+            return None
+        row = load_todays_plan(today)
+        if row is None:
+            plan_missed_at.clear()
+            plan_missed_at[today] = time.monotonic()
+            return None
+        plan = tuple(row)
+        todays_plan_cache.clear()
+        todays_plan_cache[today] = plan
+    return plan
+
+# MA'LUMOTLARNI YUKLASH (sahifa uchun kerakli bog'lanishlar bitta so'rovda)
+INVENTORY_TYPES = ('clothes', 'hat', 'shoes', 'accessory')
+
+def load_inventory(user_id):
+    """Inventar + Item bitta so'rovda, item_type bo'yicha bir o'tishda guruhlangan"""
+    inventory_items = Inventory.query.options(joinedload(Inventory.item)).filter_by(user_id=user_id).all()
+    
+    equipped_items = []
+    by_type = {item_type: [] for item_type in INVENTORY_TYPES}
+    for inventory_item in inventory_items:
+        if inventory_item.equipped:
+            equipped_items.append(inventory_item)
+        by_type.setdefault(inventory_item.item.item_type, []).append(inventory_item)
+    
+    return inventory_items, equipped_items, by_type
+
+def news_with_authors():
+    return News.query.options(joinedload(News.author))
 
 def get_todays_tasks():
-    """Bugungi kunlik topshiriqlarni olish"""
-    today = datetime.utcnow().date()
-    daily_task = DailyTask.query.filter_by(date=today).first()
+    """Bugungi kunlik topshiriqlar (keshdagi reja + 4 ta Task bitta so'rovda)"""
+    plan = todays_plan()
+    if not plan:
+        return None
     
-    if not daily_task:
-        daily_task = create_daily_tasks()
-    
-    if daily_task:
-        return {
-            'daily_tasks': [daily_task.task_1, daily_task.task_2, daily_task.task_3],
-            'daily_quiz': daily_task.quiz_1
-        }
-    return None
+    tasks = {task.id: task for task in Task.query.filter(Task.id.in_(plan)).all()}
+    return {
+        'daily_tasks': [tasks.get(task_id) for task_id in plan[:DAILY_TASK_SLOTS]],
+        'daily_quiz': tasks.get(plan[DAILY_TASK_SLOTS])
+    }
 
 # ML SAVOLLARNI JSON FAYLDAN O'QISH
+QUESTIONS_PATH = os.path.join(basedir, 'ml_questions.json')
+QUESTIONS_PER_QUIZ = 5
+
+DIFFICULTY_MAPPING = {
+    'easy': ['easy', 'oson', 'oddiy'],
+    'medium': ['medium', 'o\'rta', 'ortacha', 'middle'],
+    'hard': ['hard', 'qiyin', 'murakkab', 'difficult']
+}
+DIFFICULTY_ALIASES = {alias: level for level, aliases in DIFFICULTY_MAPPING.items() for alias in aliases}
+
+def normalize_difficulty(value):
+    value = (value or '').lower()
+    return DIFFICULTY_ALIASES.get(value, value)
+
+class QuestionBank:
+    """ml_questions.json bir marta o'qiladi va difficulty/kategoriya bo'yicha indekslanadi.
+    
+    Fayl o'zgarsa (mtime) keyingi murojaatda qayta yuklanadi.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.data = {}
+        self.questions = []
+        self.by_difficulty = {}
+        self.by_category = {}
+        self.by_id = {}
+    
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def refresh(self):
+        mtime = self._current_mtime()
+        if self.questions and mtime == self._mtime:
+            return self
+        
+        with self._lock:
+            if self.questions and mtime == self._mtime:
+                return self
+            
+            data = self._read()
+            if data is None:
+                # Yangi fayl buzilgan bo'lsa, oldingi yaxshi nusxa qoladi
+                data = self.data if self.questions else create_demo_questions()
+            self._index(data)
+            self._mtime = mtime
+        return self
+    
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            print("⚠️  ml_questions.json fayli topilmadi! Demo savollar ishlatiladi.")
+        except json.JSONDecodeError as e:
+            print(f"⚠️  JSON faylini o'qishda xatolik: {e}")
+        except Exception as e:
+            print(f"⚠️  Xatolik: {e}")
+        return None
+    
+    def _index(self, data):
+        questions = data.get('eco_questions', [])
+        by_difficulty = {}
+        by_category = {}
+        for question in questions:
+            by_difficulty.setdefault(normalize_difficulty(question.get('difficulty', '')), []).append(question)
+            by_category.setdefault((question.get('category') or '').lower(), []).append(question)
+        
+        self.data = data
+        self.questions = questions
+        self.by_difficulty = by_difficulty
+        self.by_category = by_category
+        self.by_id = {question['id']: question for question in questions if 'id' in question}
+    
+    def candidates(self, difficulty, category=None):
+        """Tanlash uchun savollar havzasi (eski to'ldirish qoidalari saqlangan)"""
+        if category:
+            in_category = self.by_category.get(category.lower(), [])
+            same_level = [q for q in in_category if normalize_difficulty(q.get('difficulty', '')) == difficulty]
+            if len(same_level) >= QUESTIONS_PER_QUIZ:
+                return same_level
+            if in_category:
+                return in_category
+        
+        main_questions = self.by_difficulty.get(difficulty, [])
+        if len(main_questions) >= QUESTIONS_PER_QUIZ:
+            return main_questions
+        
+        remaining_needed = QUESTIONS_PER_QUIZ - len(main_questions)
+        easy = self.by_difficulty.get('easy', [])
+        medium = self.by_difficulty.get('medium', [])
+        hard = self.by_difficulty.get('hard', [])
+        
+        # Agar yetarli savol bo'lmasa, boshqa difficulty'lardan qo'shamiz
+        if difficulty == 'easy' or difficulty == 'hard':
+            pool = main_questions + medium[:remaining_needed]
+        elif difficulty == 'medium':
+            # 70% o'rta, 30% oson va qiyin
+            pool = main_questions[:4] + easy[:1] + hard[:1]
+        else:
+            pool = list(main_questions)
+        
+        return pool or self.questions
+    
+    def sample(self, difficulty, k=QUESTIONS_PER_QUIZ, category=None):
+        pool = self.candidates(difficulty, category)
+        return random.sample(pool, min(k, len(pool)))
+
+question_bank = QuestionBank(QUESTIONS_PATH)
+
 def load_questions_from_json():
-    try:
-        with open('ml_questions.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
-    except FileNotFoundError:
-        print("⚠️  ml_questions.json fayli topilmadi! Demo savollar ishlatiladi.")
-        return create_demo_questions()
-    except json.JSONDecodeError as e:
-        print(f"⚠️  JSON faylini o'qishda xatolik: {e}")
-        return create_demo_questions()
-    except Exception as e:
-        print(f"⚠️  Xatolik: {e}")
-        return create_demo_questions()
+    return question_bank.refresh().data
 
 def create_demo_questions():
     return {
@@ -400,50 +904,1459 @@ def create_demo_questions():
         ]
     }
 
+# ERKIN JAVOBLARNI BAHOLASH (ML/ml.py indeksli matcher + LRU kesh)
+# Sinf bir vaqtda deyarli bir xil javob yozadi: normallashtirilgan javob bo'yicha natija keshlanadi
+ANSWER_CACHE_SIZE = 4096
+MAX_ANSWER_BATCH = 100
+MAX_ANSWER_LENGTH = 500
+ANSWER_PASS_PERCENT = 70
+
+# Variantlar indeksi ilova sozlanishida (import paytida) quriladi: gunicorn worker'lari ham
+# birinchi /ml/check_answer so'rovida indekslashni kutmaydi (--preload bilan master'da bir marta)
+get_answer_matcher()
+
+class AnswerScoreCache:
+    """Normallashtirilgan javob -> (variant_id, o'xshashlik); to'lsa eng eski ishlatilgani chiqariladi"""
+
+    def __init__(self, maxsize=ANSWER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+answer_scores = AnswerScoreCache()
+
+def score_answers(answers):
+    """Javoblar ro'yxatini variantlar korpusiga solishtirish (takroriy javoblar bir marta)"""
+    matcher = get_answer_matcher()
+    scored = {}
+    results = []
+    for answer in answers:
+        text = normalize_answer(answer)
+        if text not in scored:
+            match = answer_scores.get(text)
+            if match is None:
+                match = matcher.best_match(text)
+                answer_scores.put(text, match)
+            scored[text] = match
+        variant_id, score = scored[text]
+        match_percent = round(score * 100, 2)
+        results.append({
+            'user_answer': answer,
+            'best_match': matcher.variants[variant_id] if variant_id is not None else None,
+            'match_percent': match_percent,
+            'is_correct': match_percent >= ANSWER_PASS_PERCENT
+        })
+    return results
+
+def pack_quiz_answers(results):
+    """submit_quiz natijalaridan (savol ID, tanlangan variant, to'g'riligi) ustunlari.
+    
+    To'g'rilik klient yuborgan is_correct'dan emas, savollar bankidan aniqlanadi;
+    bankda yo'q savollar tashlab yuboriladi.
+    """
+    bank = question_bank.refresh()
+    question_ids, choices, correct = [], [], []
+    for entry in results if isinstance(results, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        question = bank.by_id.get(entry.get('question_id'))
+        if question is None:
+            continue
+        choice = entry.get('user_answer')
+        if isinstance(choice, bool) or not isinstance(choice, int) or not 0 <= choice < len(question.get('options', [])):
+            choice = -1
+        question_ids.append(question['id'])
+        choices.append(choice)
+        correct.append(choice == question.get('correct_answer'))
+    if not question_ids:
+        return None, None, None
+    return pack_answers(question_ids, choices, correct)
+
+# ADAPTIV SAVOL TANLASH (ML/adaptive.py: mahorat vektori va kutilgan axborot)
+adaptive_selector = AdaptiveSelector()
+
+def level_difficulty(user_level):
+    """Tarix bo'lmaganda (savollarda id yo'q) eski daraja chegaralari"""
+    if user_level <= 3:
+        return 'easy'
+    if user_level <= 6:
+        return 'medium'
+    return 'hard'
+
+def adaptive_questions(bank):
+    """Savollar banki qayta yuklangan bo'lsa selector ham qayta quriladi"""
+    if adaptive_selector.source is not bank.questions:
+        adaptive_selector.set_questions([
+            {
+                'id': question['id'],
+                'category': question.get('category'),
+                'difficulty': normalize_difficulty(question.get('difficulty')),
+            }
+            for question in bank.questions if 'id' in question
+        ], source=bank.questions)
+        # Qiyinlik oxirgi saqlangan test analitikasidan (bazaga murojaatsiz)
+        stats = quiz_analytics.stats or QuizStats.load(quiz_analytics.path)
+        adaptive_selector.calibrate(*stats.questions()[:3])
+    return adaptive_selector
+
+def sync_mastery(user_id):
+    """Holatga hali qo'shilmagan test natijalari (user_id indeksi, odatda 0 qator)"""
+    state = adaptive_selector.state(user_id)
+    rows = db.session.execute(
+        select(QuizResult.id, QuizResult.question_ids, QuizResult.correct_flags)
+        .where(QuizResult.user_id == user_id, QuizResult.id > state.last_result_id)
+        .order_by(QuizResult.id)
+    ).all()
+    for row in rows:
+        adaptive_selector.observe(user_id, row.id, row.question_ids, row.correct_flags)
+
 # KUNLIK YANGILANISH FUNKSIYASI
-def daily_reset_system():
-    """Har kuni tungi soat 00:00 da bajariladigan yangilanish"""
+DAILY_RESET_ENERGY = 50
+DAILY_RESET_MAX_ENERGY = 100
+DAILY_RESET_CHUNK_SIZE = 1000
+
+def print_reset_progress(done, total):
+    print(f"   ↳ {done}/{total} foydalanuvchi")
+
+def daily_reset_system(chunk_size=DAILY_RESET_CHUNK_SIZE, progress_callback=print_reset_progress):
+    """Har kuni tungi soat 00:00 da bajariladigan yangilanish.
+    
+    Foydalanuvchilar id oraliqlari bo'yicha bo'laklarga ajratiladi, har bir bo'lak
+    bitta INSERT ... SELECT va bitta UPDATE bilan bajarilib alohida commit qilinadi.
+    Sana bo'yicha idempotent: qayta ishga tushirilsa energiya ikki marta berilmaydi.
+    """
     with app.app_context():
         today = datetime.utcnow().date()
+        day_start = datetime.combine(today, datetime.min.time())
         print(f"🔄 Kunlik yangilanish boshlandi: {today}")
         
-        # Yangi kunlik topshiriqlar yaratish
-        create_daily_tasks()
+        # Kunlik topshiriqlar oynasini (bugundan DAILY_PLAN_DAYS kun) to'ldirish
+        plan_daily_tasks()
+        
+        max_user_id = db.session.query(func.max(User.id)).scalar() or 0
+        summary = {'date': today.isoformat(), 'users_reset': 0, 'progress_created': 0, 'chunks': 0}
         
-        # Barcha foydalanuvchilarning kunlik progressini yangilash
-        users = User.query.all()
-        for user in users:
-            # Kunlik progress yaratish
-            daily_progress = DailyProgress(
-                user_id=user.id,
-                date=today,
-                tasks_completed=0,
-                quizzes_completed=0,
-                coins_earned=0
+        for chunk_start in range(0, max_user_id, chunk_size):
+            chunk_end = min(chunk_start + chunk_size, max_user_id)
+            in_chunk = (User.id > chunk_start) & (User.id <= chunk_end)
+            now = datetime.utcnow()
+            
+            # Kunlik progress: bugungi yozuvi yo'q foydalanuvchilar uchun
+            has_progress = select(DailyProgress.id).where(
+                DailyProgress.user_id == User.id,
+                DailyProgress.date == today
+            ).exists()
+            progress_rows = select(
+                User.id,
+                literal(today, db.Date),
+                literal(0), literal(0), literal(0),
+                literal(now, db.DateTime)
+            ).where(in_chunk, ~has_progress)
+            inserted = db.session.execute(
+                insert(DailyProgress).from_select(
+                    ['user_id', 'date', 'tasks_completed', 'quizzes_completed', 'coins_earned', 'created_at'],
+                    progress_rows
+                )
             )
-            db.session.add(daily_progress)
             
-            # Energiyani to'ldirish (har kuni 50 energiya)
-            user.energy = min(100, user.energy + 50)
-            user.last_daily_reset = datetime.utcnow()
+            # Energiyani to'ldirish (har kuni 50 energiya) - bugun hali berilmaganlarga
+            boosted_energy = func.coalesce(User.energy, 0) + DAILY_RESET_ENERGY
+            updated = db.session.execute(
+                update(User)
+                .where(in_chunk)
+                .where(or_(User.last_daily_reset.is_(None), User.last_daily_reset < day_start))
+                .values(
+                    energy=case((boosted_energy > DAILY_RESET_MAX_ENERGY, DAILY_RESET_MAX_ENERGY), else_=boosted_energy),
+                    last_daily_reset=now,
+                    stats_version=func.coalesce(User.stats_version, 0) + 1
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            
+            summary['progress_created'] += max(inserted.rowcount, 0)
+            summary['users_reset'] += max(updated.rowcount, 0)
+            summary['chunks'] += 1
+            if progress_callback:
+                progress_callback(chunk_end, max_user_id)
+        
+        # Ochiq SSE oqimlari statistikani qayta olsin
+        if summary['users_reset']:
+            event_hub.broadcast('resync', {'reason': 'daily_reset'})
+        
+        print(f"✅ Kunlik yangilanish bajarildi: {today} ({summary['users_reset']} foydalanuvchi)")
+        return summary
+
+# JOB SCHEDULER (bir nechta worker uchun xavfsiz)
+JOB_LEASE_TTL = timedelta(minutes=30)
+SCHEDULER_MAX_SLEEP_SECONDS = 300
+# Xato bilan tugagan slot shuncha marta, kutish har safar ikki barobar oshib qayta uriniladi
+SCHEDULER_MAX_ATTEMPTS = 4
+SCHEDULER_RETRY_SECONDS = 60
+SCHEDULER_INSTANCE = uuid.uuid4().hex[:8]
+
+def scheduler_owner():
+    """Lease egasi: pid har safar olinadi - --preload bilan fork qilingan worker'lar farqlanadi"""
+    return f"{socket.gethostname()}:{os.getpid()}:{SCHEDULER_INSTANCE}"
+
+def daily_slot(now):
+    """Eng oxirgi 00:00 (UTC) vaqti"""
+    return datetime.combine(now.date(), datetime.min.time())
+
+def next_daily_run(now):
+    return daily_slot(now) + timedelta(days=1)
+
+# job nomi -> (funksiya, oxirgi slotni hisoblash, keyingi ishga tushish vaqti)
+SCHEDULED_JOBS = {
+    'daily_reset': (daily_reset_system, daily_slot, next_daily_run),
+}
+
+def acquire_job_lease(job_name, slot, owner=None):
+    """Job uchun lease olish: slot hali bajarilmagan va boshqa worker ushlab turmagan bo'lsa"""
+    owner = owner or scheduler_owner()
+    if not db.session.get(JobLease, job_name):
+        try:
+            db.session.add(JobLease(job_name=job_name))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+    
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(JobLease)
+        .where(JobLease.job_name == job_name)
+        .where(or_(JobLease.last_run_for.is_(None), JobLease.last_run_for < slot))
+        .where(or_(JobLease.expires_at.is_(None), JobLease.expires_at < now, JobLease.owner == owner))
+        .values(owner=owner, expires_at=now + JOB_LEASE_TTL)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+def release_job_lease(job_name, slot, completed, owner=None):
+    owner = owner or scheduler_owner()
+    values = {'expires_at': None}
+    if completed:
+        values['last_run_for'] = slot
+    db.session.execute(
+        update(JobLease)
+        .where(JobLease.job_name == job_name, JobLease.owner == owner)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+def run_scheduled_job(job_name, slot):
+    """Lease olingan bo'lsa jobni bajarish va tarixga yozish.
+    
+    'success' yoki 'failed'; lease olinmasa (bajarilgan yoki boshqa worker'da) None.
+    """
+    job_func = SCHEDULED_JOBS[job_name][0]
+    with app.app_context():
+        if not acquire_job_lease(job_name, slot):
+            return None
         
+        job_run = JobRun(job_name=job_name, scheduled_for=slot, owner=scheduler_owner())
+        db.session.add(job_run)
         db.session.commit()
-        print(f"✅ Kunlik yangilanish bajarildi: {today}")
+        run_id = job_run.id
+        
+        started = time.perf_counter()
+        status, error = 'success', None
+        try:
+            job_func()
+        except Exception as e:
+            db.session.rollback()
+            status, error = 'failed', str(e)
+            print(f"❌ {job_name} bajarilmadi: {e}")
+        
+        job_run = db.session.get(JobRun, run_id)
+        job_run.finished_at = datetime.utcnow()
+        job_run.duration_ms = int((time.perf_counter() - started) * 1000)
+        job_run.status = status
+        job_run.error = error
+        db.session.commit()
+        
+        release_job_lease(job_name, slot, completed=(status == 'success'))
+        return status
+
+def run_job_with_retry(job_name, slot, sleep=time.sleep):
+    """Xato bilan tugagan slotni keyingi kungacha kutmasdan qayta urinish (cheklangan)"""
+    status = None
+    for attempt in range(SCHEDULER_MAX_ATTEMPTS):
+        if attempt:
+            sleep(SCHEDULER_RETRY_SECONDS * 2 ** (attempt - 1))
+        status = run_scheduled_job(job_name, slot)
+        if status != 'failed':
+            break
+    return status
+
+def scheduler_catch_up(now=None, sleep=time.sleep):
+    """Ishga tushishda o'tkazib yuborilgan slotlarni bajarish"""
+    now = now or datetime.utcnow()
+    for job_name, (_, last_slot, _) in SCHEDULED_JOBS.items():
+        run_job_with_retry(job_name, last_slot(now), sleep)
+
+def next_scheduled_job(now):
+    """(job nomi, ishga tushish vaqti) - eng yaqin navbatdagi job"""
+    next_runs = {job_name: next_run(now) for job_name, (_, _, next_run) in SCHEDULED_JOBS.items()}
+    return min(next_runs.items(), key=lambda item: item[1])
+
+def scheduler_loop(clock=datetime.utcnow, sleep=time.sleep, max_runs=None):
+    """Navbatdagi job vaqti bir marta tanlanadi va shu vaqt kelguncha kutiladi.
+    
+    Kutish SCHEDULER_MAX_SLEEP_SECONDS bo'laklarida - soat siljishi yoki uyqu
+    kechikishiga chidamli. max_runs test uchun: shuncha job bajarilgach to'xtaydi.
+    """
+    runs = 0
+    while max_runs is None or runs < max_runs:
+        job_name, run_at = next_scheduled_job(clock())
+        while clock() < run_at:
+            sleep(min((run_at - clock()).total_seconds(), SCHEDULER_MAX_SLEEP_SECONDS))
+        
+        # Kechikib uyg'ongan bo'lsa ham slot bo'yicha bajariladi
+        run_job_with_retry(job_name, run_at, sleep)
+        runs += 1
 
 def start_daily_scheduler():
-    """Kunlik yangilanish scheduler'ini ishga tushirish"""
+    """Kunlik yangilanish scheduler'ini ishga tushirish.
+    
+    Har bir worker chaqirishi mumkin: slot uchun lease faqat bittasiga beriladi.
+    """
     def scheduler():
-        while True:
-            now = datetime.utcnow()
-            # Har kuni soat 00:00 da yangilash
-            if now.hour == 0 and now.minute == 0:
-                daily_reset_system()
-                time.sleep(60)  # Keyingi minutgacha kutish
-            time.sleep(30)  # 30 soniyada bir tekshirish
+        # Reja oynasi ishga tushishda to'ldiriladi: so'rovlar todays_plan() da yozmaydi
+        with app.app_context():
+            try:
+                plan_daily_tasks()
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Kunlik rejalarni tuzishda xatolik: {e}")
+        scheduler_catch_up()
+        scheduler_loop()
     
     thread = threading.Thread(target=scheduler, daemon=True)
     thread.start()
-    print("🕒 Kunlik yangilanish scheduler'i ishga tushdi")
+    print(f"🕒 Kunlik yangilanish scheduler'i ishga tushdi ({scheduler_owner()})")
+
+# FON XIZMATLARI: gunicorn __main__ ni chaqirmaydi, shuning uchun har bir worker jarayoni
+# ularni birinchi so'rovda o'zi ishga tushiradi (testlarda ECOVERSE_BACKGROUND=0)
+app.config.setdefault('BACKGROUND_SERVICES', os.environ.get('ECOVERSE_BACKGROUND', '1') != '0')
+background_lock = threading.Lock()
+background_pid = None
+
+@app.before_request
+def start_background_services():
+    global background_pid
+    if background_pid == os.getpid() or not app.config['BACKGROUND_SERVICES']:
+        return
+    with background_lock:
+        # pid bo'yicha: --preload bilan fork qilingan worker'da oqimlar yo'q, qaytadan boshlanadi
+        if background_pid == os.getpid():
+            return
+        background_pid = os.getpid()
+        start_daily_scheduler()
+
+# REAL-TIME HODISALAR (SERVER-SENT EVENTS)
+SSE_HEARTBEAT_SECONDS = 15
+SSE_HISTORY_SIZE = 50
+SSE_QUEUE_SIZE = 100
+# EventHub faqat shu jarayon ichida ishlaydi: boshqa worker yoki bot yozgan o'zgarishlar
+# oqimga shu oraliqda tekshiriladigan versiyalar orqali (resync) yetib keladi
+SSE_VERSION_CHECK_SECONDS = 30
+# Har bir oqim bitta worker oqimini (thread/greenlet) band qiladi. Sync worker'da (gunicorn
+# standarti) bitta tab butun worker'ni egallaydi - shuning uchun oqim faqat
+# wsgi.multithread serverlarda (gunicorn -k gthread/gevent, gunicorn.conf.py) beriladi.
+# 'auto' | '1' (majburan yoqish) | '0' (o'chirish). Qolgan hollarda mijoz /get_stats ni so'raydi
+app.config.setdefault('SSE_STREAMING', os.environ.get('ECOVERSE_SSE', 'auto'))
+# Bitta worker jarayonidagi ochiq oqimlar chegarasi (qolgan thread'lar oddiy so'rovlar uchun)
+app.config.setdefault('SSE_MAX_STREAMS', int(os.environ.get('ECOVERSE_SSE_MAX_STREAMS', 16)))
+
+class EventHub:
+    """Jarayon ichidagi pub/sub: foydalanuvchi va umumiy (broadcast) hodisalar"""
+    
+    def __init__(self, history_size=SSE_HISTORY_SIZE, queue_size=SSE_QUEUE_SIZE):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._history_size = history_size
+        self._queue_size = queue_size
+        # user_id (broadcast uchun None) -> oxirgi hodisalar va chiqib ketgan eng katta id
+        self._history = {}
+        self._evicted = {}
+        self._subscribers = {}
+        self._overflowed = set()
+    
+    def publish(self, user_id, event, data):
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            entry = (event_id, event, data)
+            
+            history = self._history.setdefault(user_id, deque(maxlen=self._history_size))
+            if len(history) == history.maxlen:
+                self._evicted[user_id] = history[0][0]
+            history.append(entry)
+            
+            if user_id is None:
+                targets = [q for subs in self._subscribers.values() for q in subs]
+            else:
+                targets = list(self._subscribers.get(user_id, ()))
+            
+            for subscriber in targets:
+                try:
+                    subscriber.put_nowait(entry)
+                except queue.Full:
+                    # Sekin mijoz: hodisalar tashlanadi, mijozga resync yuboriladi
+                    self._overflowed.add(id(subscriber))
+        return event_id
+    
+    def broadcast(self, event, data):
+        return self.publish(None, event, data)
+    
+    def subscribe(self, user_id):
+        subscriber = queue.Queue(maxsize=self._queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if subs is not None:
+                subs.discard(subscriber)
+                if not subs:
+                    del self._subscribers[user_id]
+            self._overflowed.discard(id(subscriber))
+    
+    def take_overflow(self, subscriber):
+        with self._lock:
+            if id(subscriber) in self._overflowed:
+                self._overflowed.discard(id(subscriber))
+                return True
+            return False
+    
+    def replay(self, user_id, last_event_id):
+        """Last-Event-ID dan keyingi hodisalar; to'liq tiklab bo'lmasa complete=False"""
+        with self._lock:
+            if last_event_id >= self._next_id:
+                # Server qayta ishga tushgan - id'lar mos emas
+                return [], False
+            
+            complete = True
+            events = []
+            for key in (user_id, None):
+                if self._evicted.get(key, 0) > last_event_id:
+                    complete = False
+                events.extend(e for e in self._history.get(key, ()) if e[0] > last_event_id)
+        
+        events.sort(key=lambda e: e[0])
+        return events, complete
+
+event_hub = EventHub()
+
+def format_sse(event_id, event, data):
+    message = f'event: {event}\ndata: {json.dumps(data)}\n\n'
+    if event_id is not None:
+        message = f'id: {event_id}\n' + message
+    return message
+
+open_streams = 0
+open_streams_lock = threading.Lock()
+
+def streaming_supported(environ):
+    mode = str(app.config['SSE_STREAMING'])
+    if mode in ('0', '1'):
+        return mode == '1'
+    return bool(environ.get('wsgi.multithread'))
+
+def acquire_stream_slot():
+    global open_streams
+    with open_streams_lock:
+        if open_streams >= app.config['SSE_MAX_STREAMS']:
+            return False
+        open_streams += 1
+        return True
+
+def release_stream_slot():
+    global open_streams
+    with open_streams_lock:
+        open_streams -= 1
+
+def stream_versions(engine, user_id):
+    """(stats_version, e'lonlar versiyasi) - qisqa ulanishda, oqim sessiyasiz"""
+    statement = select(
+        select(func.coalesce(User.stats_version, 0)).where(User.id == user_id).scalar_subquery(),
+        select(ContentVersion.version).where(ContentVersion.name == 'announcement').scalar_subquery()
+    )
+    with engine.connect() as connection:
+        return tuple(connection.execute(statement).one())
+
+def publish_user_stats(user):
+    """Foydalanuvchining coin/energiya o'zgarishini uning SSE oqimiga yuborish"""
+    event_hub.publish(user.id, 'stats', {'version': user.stats_version or 0, **build_user_stats(user)})
+
+def after_balance_commit(user):
+    """Balans commit qilingandan keyin: SSE va reytingni yangilash"""
+    publish_user_stats(user)
+    leaderboard_engine.update(user.id, user.username, user.coins, user.role)
+
+# SO'ROVLAR PROFILI (SQL soni, SQL va render vaqti, N+1)
+# Standart o'chiq: yoqish uchun ECOVERSE_PROFILING=1
+app.config.setdefault('SQL_PROFILING', os.environ.get('ECOVERSE_PROFILING', '0') != '0')
+SLOW_QUERY_MS = 100
+PROFILE_WINDOW = 500
+SLOW_QUERY_LOG_SIZE = 100
+N_PLUS_ONE_THRESHOLD = 5
+
+def redact_parameters(parameters):
+    """Parametr qiymatlari (parol hash, email, username) log va admin sahifasiga chiqmaydi - faqat turlari"""
+    if isinstance(parameters, dict):
+        return ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items())[:200]
+    if isinstance(parameters, (list, tuple)):
+        if parameters and all(isinstance(value, (list, tuple, dict)) for value in parameters):
+            return f'{len(parameters)} qator'
+        return ', '.join(type(value).__name__ for value in parameters)[:200]
+    return type(parameters).__name__
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class RequestProfiler:
+    """Endpoint bo'yicha oxirgi PROFILE_WINDOW ta so'rov statistikasi (xotirada)"""
+    
+    def __init__(self, window=PROFILE_WINDOW, slow_log_size=SLOW_QUERY_LOG_SIZE):
+        self._lock = threading.Lock()
+        self._window = window
+        self.endpoints = {}
+        self.slow_queries = deque(maxlen=slow_log_size)
+    
+    def record(self, endpoint, total_ms, sql_ms, render_ms, query_count, statements):
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = {
+                    'requests': 0,
+                    'total_ms': deque(maxlen=self._window),
+                    'sql_ms': deque(maxlen=self._window),
+                    'render_ms': deque(maxlen=self._window),
+                    'queries': deque(maxlen=self._window),
+                    'n_plus_one': Counter(),
+                }
+            stats['requests'] += 1
+            stats['total_ms'].append(total_ms)
+            stats['sql_ms'].append(sql_ms)
+            stats['render_ms'].append(render_ms)
+            stats['queries'].append(query_count)
+            for statement, repeats in statements.items():
+                if repeats >= N_PLUS_ONE_THRESHOLD:
+                    stats['n_plus_one'][statement] = max(stats['n_plus_one'][statement], repeats)
+    
+    def log_slow_query(self, endpoint, statement, parameters, elapsed_ms):
+        entry = {
+            'at': datetime.utcnow().isoformat(timespec='seconds'),
+            'endpoint': endpoint,
+            'duration_ms': round(elapsed_ms, 2),
+            'statement': statement,
+            'parameters': redact_parameters(parameters),
+        }
+        with self._lock:
+            self.slow_queries.appendleft(entry)
+        app.logger.warning('Sekin SQL (%.1f ms) %s: %s %s', elapsed_ms, endpoint, statement, entry['parameters'])
+    
+    def snapshot(self):
+        with self._lock:
+            items = [(endpoint, {key: (list(value) if isinstance(value, deque) else value) for key, value in stats.items()})
+                     for endpoint, stats in self.endpoints.items()]
+            slow_queries = list(self.slow_queries)
+        
+        rows = []
+        for endpoint, stats in items:
+            total_ms = sorted(stats['total_ms'])
+            samples = len(total_ms) or 1
+            rows.append({
+                'endpoint': endpoint,
+                'requests': stats['requests'],
+                'p50_ms': round(percentile(total_ms, 0.50), 2),
+                'p95_ms': round(percentile(total_ms, 0.95), 2),
+                'p99_ms': round(percentile(total_ms, 0.99), 2),
+                'avg_queries': round(sum(stats['queries']) / samples, 1),
+                'max_queries': max(stats['queries'], default=0),
+                'avg_sql_ms': round(sum(stats['sql_ms']) / samples, 2),
+                'avg_render_ms': round(sum(stats['render_ms']) / samples, 2),
+                'n_plus_one': stats['n_plus_one'].most_common(5),
+            })
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return {'endpoints': rows, 'slow_queries': slow_queries}
+    
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.slow_queries.clear()
+
+request_profiler = RequestProfiler()
+
+def current_sql_profile():
+    if has_request_context():
+        return g.get('sql_profile')
+    return None
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def profile_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def profile_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    profile = current_sql_profile()
+    if profile is None:
+        return
+    
+    profile['queries'] += 1
+    profile['sql_ms'] += elapsed_ms
+    profile['statements'][statement[:300]] += 1
+    if elapsed_ms >= SLOW_QUERY_MS:
+        request_profiler.log_slow_query(request.endpoint, statement, parameters, elapsed_ms)
+
+@before_render_template.connect_via(app)
+def profile_before_render(sender, template, context, **extra):
+    profile = current_sql_profile()
+    if profile is not None:
+        profile['render_started'] = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def profile_template_rendered(sender, template, context, **extra):
+    profile = current_sql_profile()
+    if profile is not None and profile.get('render_started'):
+        profile['render_ms'] += (time.perf_counter() - profile.pop('render_started')) * 1000
+
+@app.before_request
+def start_request_profile():
+    if app.config['SQL_PROFILING']:
+        g.sql_profile = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'sql_ms': 0.0,
+            'render_ms': 0.0,
+            'statements': Counter(),
+        }
+
+@app.after_request
+def finish_request_profile(response):
+    profile = g.pop('sql_profile', None)
+    if profile is not None and request.endpoint:
+        total_ms = (time.perf_counter() - profile['started']) * 1000
+        request_profiler.record(
+            request.endpoint, total_ms, profile['sql_ms'], profile['render_ms'],
+            profile['queries'], profile['statements']
+        )
+    return response
+
+# REYTING (LEADERBOARD)
+LEADERBOARD_SIZE = 20
+LEADERBOARD_AROUND = 2
+LEADERBOARD_REFRESH_SECONDS = 60
+PERIOD_BOARD_TTL_SECONDS = 60
+PERIOD_BOARD_DAYS = {'daily': 1, 'weekly': 7}
+
+class Leaderboard:
+    """Bolalar reytingi xotirada: (-coins, user_id) bo'yicha saralangan ro'yxat.
+    
+    Coin o'zgarganda shu jarayonda bisect bilan yangilanadi; boshqa worker'lardagi
+    o'zgarishlar uchun har LEADERBOARD_REFRESH_SECONDS da bazadan qayta quriladi.
+    Faqat birinchi yuklash so'rov ichida bo'ladi; keyingi qayta qurishlar fon
+    oqimida, shu vaqtda so'rovlarga joriy indeks beriladi.
+    """
+    
+    def __init__(self, refresh_seconds=LEADERBOARD_REFRESH_SECONDS):
+        self._lock = threading.RLock()
+        self._refresh_seconds = refresh_seconds
+        self._loaded_at = None
+        self._rebuilding = None
+        self._keys = []
+        self._coins = {}
+        self._names = {}
+    
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded_at is not None:
+                if self._rebuilding is None and time.monotonic() - self._loaded_at >= self._refresh_seconds:
+                    self._start_rebuild()
+                return
+        self._rebuild(db.engine)
+    
+    def _start_rebuild(self):
+        # Qayta qurish paytidagi update()'lar shu yerga yoziladi va yangi indeksga qo'llanadi
+        self._rebuilding = {}
+        engine = db.engine
+        
+        def rebuild():
+            try:
+                self._rebuild(engine)
+            except Exception as e:
+                print(f"❌ Reytingni qayta qurishda xatolik: {e}")
+                with self._lock:
+                    self._rebuilding = None
+                    self._loaded_at = time.monotonic()
+        
+        threading.Thread(target=rebuild, daemon=True).start()
+    
+    def _rebuild(self, engine):
+        # O'z ulanishi: fon oqimida ham, so'rov ichida ham db.session'ga tegmaydi
+        with engine.connect() as connection:
+            rows = connection.execute(select(User.id, User.username, User.coins).where(User.role == 'child')).all()
+        keys = sorted((-(row.coins or 0), row.id) for row in rows)
+        with self._lock:
+            self._keys = keys
+            self._coins = {row.id: row.coins or 0 for row in rows}
+            self._names = {row.id: row.username for row in rows}
+            self._loaded_at = time.monotonic()
+            changes, self._rebuilding = self._rebuilding or {}, None
+            for user_id, change in changes.items():
+                self._apply(user_id, *change)
+    
+    def invalidate(self):
+        """Keyingi o'qishda qayta qurish (yuklangan bo'lsa - fon oqimida)"""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._loaded_at = time.monotonic() - self._refresh_seconds
+    
+    def _remove(self, user_id):
+        coins = self._coins.pop(user_id, None)
+        if coins is not None:
+            index = bisect.bisect_left(self._keys, (-coins, user_id))
+            if index < len(self._keys) and self._keys[index] == (-coins, user_id):
+                del self._keys[index]
+        self._names.pop(user_id, None)
+    
+    def _apply(self, user_id, username, coins, role):
+        self._remove(user_id)
+        if role == 'child':
+            coins = coins or 0
+            bisect.insort(self._keys, (-coins, user_id))
+            self._coins[user_id] = coins
+            self._names[user_id] = username
+    
+    def update(self, user_id, username, coins, role='child'):
+        with self._lock:
+            if self._loaded_at is None:
+                # Hali yuklanmagan: birinchi o'qishda bazadan olinadi
+                return
+            self._apply(user_id, username, coins, role)
+            if self._rebuilding is not None:
+                self._rebuilding[user_id] = (username, coins, role)
+    
+    def remove(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+            if self._rebuilding is not None:
+                self._rebuilding[user_id] = (None, None, None)
+    
+    def _entry(self, index):
+        neg_coins, user_id = self._keys[index]
+        return {'rank': index + 1, 'user_id': user_id, 'username': self._names.get(user_id), 'coins': -neg_coins}
+    
+    def top(self, limit=LEADERBOARD_SIZE):
+        self._ensure_loaded()
+        with self._lock:
+            return [self._entry(index) for index in range(min(limit, len(self._keys)))]
+    
+    def rank(self, user_id):
+        self._ensure_loaded()
+        with self._lock:
+            coins = self._coins.get(user_id)
+            if coins is None:
+                return None
+            return bisect.bisect_left(self._keys, (-coins, user_id)) + 1
+    
+    def around(self, user_id, radius=LEADERBOARD_AROUND):
+        self._ensure_loaded()
+        with self._lock:
+            rank = self.rank(user_id)
+            if rank is None:
+                return []
+            start = max(0, rank - 1 - radius)
+            end = min(len(self._keys), rank + radius)
+            return [self._entry(index) for index in range(start, end)]
+    
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._keys)
+
+leaderboard_engine = Leaderboard()
+period_board_cache = {}
+
+def period_leaderboard(period, limit=LEADERBOARD_SIZE):
+    """Kunlik/haftalik reyting: DailyProgress.coins_earned yig'indisi (qisqa TTL bilan keshlanadi)"""
+    cached = period_board_cache.get((period, limit))
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    start_date = datetime.utcnow().date() - timedelta(days=PERIOD_BOARD_DAYS[period] - 1)
+    earned = func.sum(DailyProgress.coins_earned).label('coins')
+    rows = db.session.execute(
+        select(User.id, User.username, earned)
+        .join(User, User.id == DailyProgress.user_id)
+        .where(DailyProgress.date >= start_date, User.role == 'child')
+        .group_by(User.id, User.username)
+        .order_by(earned.desc(), User.id)
+        .limit(limit)
+    ).all()
+    board = [
+        {'rank': index + 1, 'user_id': row.id, 'username': row.username, 'coins': row.coins or 0}
+        for index, row in enumerate(rows)
+    ]
+    period_board_cache[(period, limit)] = (time.monotonic() + PERIOD_BOARD_TTL_SECONDS, board)
+    return board
+
+# ADMIN STATISTIKASI (keshlangan agregatlar va trendlar)
+ADMIN_STATS_TTL_SECONDS = 30
+TREND_WINDOWS = {
+    'hour': (24, '%Y-%m-%d %H:00', timedelta(hours=1)),
+    'day': (7, '%Y-%m-%d', timedelta(days=1)),
+}
+aggregate_cache = {}
+
+def cached_aggregate(key, compute, ttl=ADMIN_STATS_TTL_SECONDS):
+    cached = aggregate_cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    value = compute()
+    aggregate_cache[key] = (time.monotonic() + ttl, value)
+    return value
+
+def compute_admin_totals():
+    """Admin dashboard hisoblagichlari bitta SQL so'rovda"""
+    today = datetime.utcnow().date()
+    
+    def count(model, *conditions):
+        return select(func.count(model.id)).where(*conditions).scalar_subquery()
+    
+    def today_sum(column):
+        return select(func.coalesce(func.sum(column), 0)).where(DailyProgress.date == today).scalar_subquery()
+    
+    row = db.session.execute(select(
+        count(User).label('total_users'),
+        count(Task).label('total_tasks'),
+        count(QuizResult).label('total_quiz_results'),
+        count(News).label('total_posts'),
+        count(User, User.role == 'child').label('total_child_users'),
+        count(User, User.role == 'adult').label('total_adult_users'),
+        today_sum(DailyProgress.tasks_completed).label('total_tasks_today'),
+        today_sum(DailyProgress.quizzes_completed).label('total_quizzes_today'),
+    )).one()
+    return dict(row._mapping)
+
+def compute_activity_trend(granularity):
+    """Soatlik/kunlik trend: ledger va ro'yxatdan o'tishlar bo'yicha guruhlangan SQL"""
+    buckets, bucket_format, step = TREND_WINDOWS[granularity]
+    now = datetime.utcnow()
+    if granularity == 'hour':
+        last_bucket = now.replace(minute=0, second=0, microsecond=0)
+    else:
+        last_bucket = datetime.combine(now.date(), datetime.min.time())
+    since = last_bucket - step * (buckets - 1)
+    
+    coin_bucket = func.strftime(bucket_format, CoinTransaction.created_at)
+    activity = db.session.execute(
+        select(
+            coin_bucket.label('bucket'),
+            func.sum(case((CoinTransaction.reason == 'task', 1), else_=0)).label('tasks'),
+            func.sum(case((CoinTransaction.reason == 'quiz', 1), else_=0)).label('quizzes'),
+            func.sum(case((CoinTransaction.amount > 0, CoinTransaction.amount), else_=0)).label('coins_earned'),
+        )
+        .where(CoinTransaction.created_at >= since)
+        .group_by(coin_bucket)
+    ).all()
+    
+    user_bucket = func.strftime(bucket_format, User.created_at)
+    signups = dict(db.session.execute(
+        select(user_bucket, func.count(User.id))
+        .where(User.created_at >= since)
+        .group_by(user_bucket)
+    ).all())
+    
+    by_bucket = {row.bucket: row for row in activity}
+    trend = []
+    for index in range(buckets):
+        bucket = (since + step * index).strftime(bucket_format)
+        row = by_bucket.get(bucket)
+        trend.append({
+            'bucket': bucket,
+            'tasks': row.tasks if row else 0,
+            'quizzes': row.quizzes if row else 0,
+            'coins_earned': row.coins_earned if row else 0,
+            'new_users': signups.get(bucket, 0),
+        })
+    return trend
+
+def admin_totals():
+    return cached_aggregate('admin_totals', compute_admin_totals)
+
+def activity_trend(granularity):
+    return cached_aggregate(('activity_trend', granularity), lambda: compute_activity_trend(granularity))
+
+# TEST ANALITIKASI (savol qiyinligi, diskriminatsiya, kategoriya aniqligi, daraja bo'yicha ballar)
+# Yig'indilar diskda saqlanadi: qayta ishga tushganda faqat yangi QuizResult qatorlari o'qiladi
+# Ish vaqtidagi fayl - repo ichida emas, Flask instance papkasida (ECOVERSE_QUIZ_ANALYTICS bilan o'zgartiriladi)
+app.config.setdefault('QUIZ_ANALYTICS_PATH', os.environ.get(
+    'ECOVERSE_QUIZ_ANALYTICS', os.path.join(app.instance_path, 'quiz_analytics.npz')))
+QUIZ_ANALYTICS_CHUNK_SIZE = 5000
+
+class QuizAnalytics:
+    def __init__(self, path=None, chunk_size=QUIZ_ANALYTICS_CHUNK_SIZE):
+        self.path = path or app.config['QUIZ_ANALYTICS_PATH']
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self.stats = None
+    
+    def refresh(self):
+        """Oxirgi hisoblangan id'dan keyingi natijalarni bo'laklab qo'shish"""
+        with self._lock:
+            stats = self.stats or QuizStats.load(self.path)
+            counted = db.session.scalar(select(func.count(QuizResult.id)).where(QuizResult.id <= stats.last_result_id))
+            if counted != stats.result_count:
+                # Natijalar o'chirilgan (masalan topshiriq bilan birga) - yig'indilar qaytadan
+                stats = QuizStats()
+            
+            result_count = stats.result_count
+            rows = db.session.execute(
+                select(
+                    QuizResult.id,
+                    QuizResult.score,
+                    func.coalesce(QuizResult.user_level, User.level, 0),
+                    QuizResult.question_ids,
+                    QuizResult.correct_flags
+                )
+                .outerjoin(User, User.id == QuizResult.user_id)
+                .where(QuizResult.id > stats.last_result_id)
+                .order_by(QuizResult.id)
+                .execution_options(yield_per=self.chunk_size)
+            )
+            for chunk in rows.partitions():
+                stats.update(*zip(*chunk))
+            
+            if stats.result_count != result_count:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                stats.save(self.path)
+            self.stats = stats
+            return stats
+
+quiz_analytics = QuizAnalytics()
+
+def compute_quiz_analytics():
+    question_meta = {
+        question_id: {
+            'question': question.get('question'),
+            'category': question.get('category'),
+            'difficulty': normalize_difficulty(question.get('difficulty')),
+        }
+        for question_id, question in question_bank.refresh().by_id.items()
+    }
+    stats = quiz_analytics.refresh()
+    adaptive_questions(question_bank.refresh()).calibrate(*stats.questions()[:3])
+    return stats.report(question_meta)
+
+def quiz_analytics_report():
+    return cached_aggregate('quiz_analytics', compute_quiz_analytics)
+
+# ADMIN RO'YXATLARI (keyset pagination, qidiruv, saralash)
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 200
+SEARCH_UPPER_BOUND = '\U0010ffff'
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        payload = ['dt', sort_value.isoformat(), row_id]
+    else:
+        payload = ['raw', sort_value, row_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Noto'g'ri cursor birinchi sahifa sifatida qabul qilinadi"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        kind, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if kind == 'dt':
+            value = datetime.fromisoformat(value)
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+class AdminPage:
+    def __init__(self, items, total, next_cursor, prev_cursor, params):
+        self.items = items
+        self.total = total
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.params = params
+
+class AdminList:
+    """Admin ro'yxati: faqat indekslangan ustunlar bo'yicha seek-pagination va prefiks qidiruv.
+    
+    Sahifa narxi jadval hajmiga bog'liq emas: OFFSET o'rniga oxirgi (qiymat, id) juftidan
+    keyingi qatorlar indeks orqali olinadi.
+    """
+    
+    def __init__(self, name, model, sorts, default_sort, search=(), filters=(), fields=(), options=()):
+        self.name = name
+        self.model = model
+        self.sorts = sorts
+        self.default_sort = default_sort
+        self.search = search
+        self.filters = filters
+        self.fields = fields
+        self.options = options
+    
+    def filtered_query(self, q):
+        query = self.model.query.filter(*self.filters)
+        if q:
+            prefix = q.lower()
+            # LIKE o'rniga diapazon: lower(...) ifoda indeksidan foydalanadi
+            query = query.filter(or_(*[
+                (column >= prefix) & (column < prefix + SEARCH_UPPER_BOUND)
+                for column in self.search
+            ]))
+        return query
+    
+    def page(self, args):
+        q = args.get('q', '').strip()[:100]
+        sort = args.get('sort', self.default_sort)
+        if sort not in self.sorts:
+            sort = self.default_sort
+        descending = args.get('order', 'desc') != 'asc'
+        limit = min(max(args.get('limit', ADMIN_PAGE_SIZE, type=int) or ADMIN_PAGE_SIZE, 1), ADMIN_MAX_PAGE_SIZE)
+        after = decode_cursor(args['after']) if args.get('after') else None
+        before = decode_cursor(args['before']) if args.get('before') and not after else None
+        
+        sort_column = self.sorts[sort]
+        id_column = self.model.id
+        # Orqaga yurishda tartib teskari olinadi, keyin qayta aylantiriladi
+        forward = before is None
+        step_descending = descending if forward else not descending
+        
+        query = self.filtered_query(q).options(*self.options)
+        cursor = after or before
+        if cursor:
+            value, row_id = cursor
+            if step_descending:
+                query = query.filter(or_(sort_column < value, (sort_column == value) & (id_column < row_id)))
+            else:
+                query = query.filter(or_(sort_column > value, (sort_column == value) & (id_column > row_id)))
+        if step_descending:
+            query = query.order_by(sort_column.desc(), id_column.desc())
+        else:
+            query = query.order_by(sort_column.asc(), id_column.asc())
+        
+        rows = query.add_columns(sort_column).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+        items = [row[0] for row in rows]
+        
+        first_key = encode_cursor(rows[0][1], rows[0][0].id) if rows else None
+        last_key = encode_cursor(rows[-1][1], rows[-1][0].id) if rows else None
+        if forward:
+            next_cursor = last_key if has_more else None
+            prev_cursor = first_key if after else None
+        else:
+            next_cursor = last_key
+            prev_cursor = first_key if has_more else None
+        
+        total = cached_aggregate(
+            ('admin_list_total', self.name, q),
+            lambda: self.filtered_query(q).order_by(None).count()
+        )
+        params = {'q': q, 'sort': sort, 'order': 'desc' if descending else 'asc', 'limit': limit}
+        return AdminPage(items, total, next_cursor, prev_cursor, params)
+    
+    def to_dict(self, item):
+        data = {}
+        for field in self.fields:
+            value = getattr(item, field)
+            data[field] = value.isoformat() if isinstance(value, datetime) else value
+        return data
+    
+    def json_response(self, page):
+        return jsonify({
+            'success': True,
+            'items': [self.to_dict(item) for item in page.items],
+            'total': page.total,
+            'next_cursor': page.next_cursor,
+            'prev_cursor': page.prev_cursor,
+            **page.params,
+        })
+
+USER_LIST_FIELDS = ('id', 'username', 'email', 'role', 'coins', 'energy', 'level', 'streak', 'is_admin', 'created_at', 'last_login')
+USER_LIST_SORTS = {
+    'created': User.created_at,
+    'username': func.lower(User.username),
+    'coins': User.coins,
+}
+USER_SEARCH = (func.lower(User.username), func.lower(User.email))
+
+ADMIN_LISTS = {
+    'users': AdminList('users', User, USER_LIST_SORTS, 'created', USER_SEARCH, fields=USER_LIST_FIELDS),
+    'child': AdminList('child', User, USER_LIST_SORTS, 'created', USER_SEARCH,
+                       filters=(User.role == 'child',), fields=USER_LIST_FIELDS),
+    'adult': AdminList('adult', User, USER_LIST_SORTS, 'created', USER_SEARCH,
+                       filters=(User.role == 'adult',), fields=USER_LIST_FIELDS),
+    'tasks': AdminList('tasks', Task, {
+        'created': Task.created_at,
+        'title': func.lower(Task.title),
+        'reward': Task.reward_coins,
+    }, 'created', (func.lower(Task.title),), fields=(
+        'id', 'title', 'description', 'reward_coins', 'energy_cost', 'difficulty',
+        'quiz_required', 'is_active', 'daily_reset', 'task_type', 'category', 'created_at',
+    )),
+    'news': AdminList('news', News, {
+        'created': News.created_at,
+        'title': func.lower(News.title),
+        'views': News.views_count,
+    }, 'created', (func.lower(News.title),), options=(joinedload(News.author),), fields=(
+        'id', 'title', 'category', 'status', 'views_count', 'author_id', 'created_at',
+    )),
+    'announcements': AdminList('announcements', Announcement, {
+        'created': Announcement.created_at,
+        'start': Announcement.start_date,
+        'title': func.lower(Announcement.title),
+    }, 'created', (func.lower(Announcement.title),), options=(joinedload(Announcement.author),), fields=(
+        'id', 'title', 'announcement_type', 'start_date', 'end_date', 'is_active', 'created_at',
+    )),
+    'shop': AdminList('shop', Item, {
+        'id': Item.id,
+        'price': Item.price,
+        'name': func.lower(Item.name),
+    }, 'id', (func.lower(Item.name),), fields=(
+        'id', 'name', 'price', 'item_type', 'image_path', 'energy_boost', 'is_active',
+    )),
+}
+
+def wants_json():
+    return request.args.get('format') == 'json'
+
+def compute_task_counts():
+    row = db.session.execute(select(
+        func.count(Task.id).label('total'),
+        func.coalesce(func.sum(case((Task.is_active == True, 1), else_=0)), 0).label('active'),
+        func.coalesce(func.sum(case((Task.daily_reset == True, 1), else_=0)), 0).label('daily_reset'),
+    )).one()
+    return dict(row._mapping)
+
+def compute_announcement_counts():
+    # Faollar soni kontent keshidan olinadi (active_announcements)
+    return {'expired': Announcement.query.filter(Announcement.end_date < datetime.utcnow()).count()}
+
+def task_counts():
+    return cached_aggregate('task_counts', compute_task_counts)
+
+def announcement_counts():
+    return cached_aggregate('announcement_counts', compute_announcement_counts)
+
+# Ro'yxatga bog'liq qo'shimcha hisoblagichlar
+ADMIN_LIST_AGGREGATES = {
+    'tasks': 'task_counts',
+    'announcements': 'announcement_counts',
+}
+
+def invalidate_admin_lists(*names):
+    """Admin yozuvidan keyin jami sonlar TTL kutmasdan qayta hisoblanadi"""
+    for key in list(aggregate_cache):
+        if isinstance(key, tuple) and key[0] == 'admin_list_total' and key[1] in names:
+            aggregate_cache.pop(key, None)
+    for name in names:
+        aggregate_cache.pop(ADMIN_LIST_AGGREGATES.get(name), None)
+
+# YANGILIK KO'RISHLARI (write-behind hisoblagich)
+# O'qish yo'lida yozuv yo'q: ko'rishlar xotirada yig'iladi va bitta UPDATE bilan yoziladi.
+# Jarayon qulasa ko'pi bilan VIEW_FLUSH_INTERVAL_SECONDS yoki VIEW_FLUSH_MAX_PENDING ta ko'rish yo'qoladi.
+app.config.setdefault('NEWS_UNIQUE_VIEWERS', True)
+VIEW_FLUSH_INTERVAL_SECONDS = 10
+VIEW_FLUSH_MAX_PENDING = 1000
+HLL_PRECISION = 10
+# Unikal ko'ruvchilar taxmini faqat shu jarayonda va xotirada: har bir worker o'zi ko'rgan
+# foydalanuvchilarni sanaydi, qayta ishga tushganda nolga tushadi. Eng so'nggi ko'rilgan
+# shuncha yangilik uchun sketch saqlanadi (har biri 2^HLL_PRECISION bayt)
+VIEW_SKETCH_MAX_NEWS = 500
+NEWS_TOP_TTL_SECONDS = 10
+
+class HyperLogLog:
+    """Unikal ko'ruvchilar uchun taxminiy sanagich (2^p registr, p=10 da ~3% xato)"""
+    
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+    
+    def add(self, value):
+        hashed = int.from_bytes(hashlib.sha1(str(value).encode()).digest()[:8], 'big')
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+    
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Kichik to'plamlar uchun linear counting aniqroq
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+class ViewCounter:
+    """News id bo'yicha ko'rishlarni yig'ib, davriy ravishda bitta UPDATE bilan yozish"""
+    
+    def __init__(self, flush_interval=VIEW_FLUSH_INTERVAL_SECONDS, max_pending=VIEW_FLUSH_MAX_PENDING):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = Counter()
+        self._pending_total = 0
+        self._sketches = OrderedDict()
+        self._wake = threading.Event()
+        self._thread = None
+    
+    def record(self, news_id, viewer_id=None):
+        with self._lock:
+            self._pending[news_id] += 1
+            self._pending_total += 1
+            if viewer_id is not None and app.config['NEWS_UNIQUE_VIEWERS']:
+                sketch = self._sketches.get(news_id)
+                if sketch is None:
+                    sketch = self._sketches[news_id] = HyperLogLog()
+                    while len(self._sketches) > VIEW_SKETCH_MAX_NEWS:
+                        self._sketches.popitem(last=False)
+                else:
+                    self._sketches.move_to_end(news_id)
+                sketch.add(viewer_id)
+            full = self._pending_total >= self.max_pending
+        # Fon oqimi birinchi ko'rishda ishga tushadi (gunicorn ham __main__ ni chaqirmaydi)
+        if app.config['BACKGROUND_SERVICES']:
+            self.start()
+        if full:
+            if self._thread is not None:
+                self._wake.set()
+            else:
+                # Fon xizmatlari o'chirilgan (test, CLI): chegara shu yerda saqlanadi
+                self.flush()
+    
+    def pending(self, news_id=None):
+        with self._lock:
+            if news_id is None:
+                return dict(self._pending)
+            return self._pending.get(news_id, 0)
+    
+    def unique_viewers(self, news_id):
+        with self._lock:
+            sketch = self._sketches.get(news_id)
+            return sketch.count() if sketch else 0
+    
+    def flush(self):
+        """Yig'ilgan ko'rishlarni bitta UPDATE ... CASE bilan yozish; xatoda qaytarib qo'yiladi.
+        
+        O'z ulanishi (db.engine.begin) ishlatiladi - so'rovning db.session tranzaksiyasiga
+        aralashmaydi va uni commit/rollback qilmaydi.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, Counter()
+                self._pending_total = 0
+            if not batch:
+                return 0
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(
+                        update(News)
+                        .where(News.id.in_(list(batch)))
+                        .values(views_count=func.coalesce(News.views_count, 0) + case(dict(batch), value=News.id, else_=0))
+                    )
+            except Exception:
+                with self._lock:
+                    self._pending.update(batch)
+                    self._pending_total += sum(batch.values())
+                raise
+            return sum(batch.values())
+    
+    def forget(self, news_id):
+        """O'chirilgan yangilik: yozilmagan ko'rishlar va sketch tashlanadi"""
+        with self._lock:
+            self._pending_total -= self._pending.pop(news_id, 0)
+            self._sketches.pop(news_id, None)
+        for key in [key for key in aggregate_cache if isinstance(key, tuple) and key[0] == 'news_top']:
+            aggregate_cache.pop(key, None)
+    
+    def top(self, limit=5):
+        """Eng ko'p ko'rilgan faol yangiliklar (NEWS_TOP_TTL_SECONDS keshlanadi)"""
+        return cached_aggregate(('news_top', limit), lambda: self._top(limit), ttl=NEWS_TOP_TTL_SECONDS)
+    
+    def _top(self, limit):
+        # Bazadagi son + hali yozilmagan ko'rishlar
+        pending = self.pending()
+        rows = db.session.execute(
+            select(News.id, News.title, News.category, News.views_count)
+            .where(News.status == 'active')
+            .order_by(News.views_count.desc(), News.id)
+            .limit(limit)
+        ).all()
+        missing = set(pending) - {row.id for row in rows}
+        if missing:
+            rows += db.session.execute(
+                select(News.id, News.title, News.category, News.views_count)
+                .where(News.status == 'active', News.id.in_(missing))
+            ).all()
+        board = [{
+            'id': row.id,
+            'title': row.title,
+            'category': row.category,
+            'views': (row.views_count or 0) + pending.get(row.id, 0),
+            'unique_viewers': self.unique_viewers(row.id),
+        } for row in rows]
+        board.sort(key=lambda entry: (-entry['views'], entry['id']))
+        return board[:limit]
+    
+    def start(self):
+        def flusher():
+            while True:
+                self._wake.wait(self.flush_interval)
+                self._wake.clear()
+                with app.app_context():
+                    try:
+                        self.flush()
+                    except Exception as e:
+                        print(f"❌ Ko'rishlarni yozishda xatolik: {e}")
+        
+        if self._thread is not None:
+            return
+        with self._flush_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=flusher, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush_on_exit)
+    
+    def flush_on_exit(self):
+        with app.app_context():
+            self.flush()
+
+news_views = ViewCounter()
+
+# KONTENT KESHI (faol e'lonlar, so'nggi yangiliklar va ularning HTML fragmentlari)
+# Kun davomida bir necha marta o'zgaradi: admin yozuvlari namespace bo'yicha tozalaydi,
+# e'lonlar esa keyingi start_date/end_date chegarasida o'z-o'zidan eskiradi.
+CONTENT_CACHE_TTL_SECONDS = 300
+DASHBOARD_NEWS_LIMIT = 3
+
+class ContentCache:
+    def __init__(self, ttl=CONTENT_CACHE_TTL_SECONDS):
+        self.ttl = timedelta(seconds=ttl)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = Counter()
+    
+    def get(self, key, loader):
+        """loader() -> (qiymat, eskirish vaqti yoki None); kalit namespace bilan boshlanadi"""
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generations[key[0]]
+        if entry and now < entry[0]:
+            return entry[1]
+        
+        value, boundary = loader()
+        expires_at = min(boundary, now + self.ttl) if boundary else now + self.ttl
+        with self._lock:
+            # Yuklash paytida invalidate bo'lgan bo'lsa eski natija saqlanmaydi
+            if self._generations[key[0]] == generation:
+                self._entries[key] = (expires_at, value)
+        return value
+    
+    def expires_at(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry else None
+    
+    def invalidate(self, namespace):
+        with self._lock:
+            self._generations[namespace] += 1
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+content_cache = ContentCache()
+
+def load_active_announcements():
+    now = datetime.utcnow()
+    rows = db.session.execute(
+        select(Announcement.id, Announcement.title, Announcement.content, Announcement.announcement_type,
+               Announcement.start_date, Announcement.end_date, Announcement.created_at)
+        .where(
+            Announcement.is_active == True,
+            Announcement.start_date <= now,
+            Announcement.end_date >= now
+        )
+        .order_by(Announcement.created_at.desc())
+    ).all()
+    next_start = db.session.execute(
+        select(func.min(Announcement.start_date))
+        .where(Announcement.is_active == True, Announcement.start_date > now)
+    ).scalar()
+    # end_date >= now: e'lon end_date dan keyingina chiqib ketadi
+    boundaries = [row.end_date + timedelta(microseconds=1) for row in rows]
+    if next_start:
+        boundaries.append(next_start)
+    return rows, min(boundaries) if boundaries else None
+
+def load_active_news(limit=None):
+    query = (
+        select(News.id, News.title, News.content, News.category, News.image_path, News.created_at)
+        .where(News.status == 'active')
+        .order_by(News.created_at.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).all(), None
+
+def active_announcements():
+    return content_cache.get(('announcements', 'active'), load_active_announcements)
+
+def active_news(limit=None):
+    return content_cache.get(('news', 'active', limit), lambda: load_active_news(limit))
+
+def news_fragment():
+    """Dashboard'dagi yangiliklar karuseli - foydalanuvchiga bog'liq emas"""
+    return content_cache.get(('news', 'fragment'), lambda: (
+        Markup(render_template('_news_carousel.html', news_list=active_news(DASHBOARD_NEWS_LIMIT))),
+        content_cache.expires_at(('news', 'active', DASHBOARD_NEWS_LIMIT)),
+    ))
+
+def announcements_fragment():
+    return content_cache.get(('announcements', 'fragment'), lambda: (
+        Markup(render_template('_announcements_list.html', announcements=active_announcements())),
+        content_cache.expires_at(('announcements', 'active')),
+    ))
 
 # ASOSIY ROUTE'LAR
 @app.route('/')
@@ -469,6 +2382,7 @@ def login():
         
         if user and check_password_hash(user.password_hash, password):
             today = datetime.now().date()
+            streak_bonus = False
             if user.last_login:
                 last_login_date = user.last_login.date()
                 if last_login_date != today:
@@ -476,7 +2390,7 @@ def login():
                         user.streak += 1
                         # 7 kunlik streak uchun mukofot
                         if user.streak % 7 == 0:
-                            user.coins += 100
+                            streak_bonus = True
                             flash('7 kunlik ketma-ket tizimga kirish uchun 100 coin mukofoti!', 'success')
                     else:
                         user.streak = 1
@@ -484,7 +2398,13 @@ def login():
                 user.streak = 1
             
             user.last_login = datetime.utcnow()
+            bump_stats_version(user)
+            db.session.flush()
+            if streak_bonus:
+                apply_balance_change(user.id, 'streak_bonus', coins=100, reference=user.streak)
             db.session.commit()
+            if streak_bonus:
+                leaderboard_engine.update(user.id, user.username, user.coins, user.role)
             login_user(user, remember=True)
             flash(f'Xush kelibsiz, {user.username}!', 'success')
             
@@ -531,33 +2451,28 @@ def register():
         
         db.session.add(new_user)
         db.session.commit()
+        leaderboard_engine.update(new_user.id, new_user.username, new_user.coins, new_user.role)
         flash('Hisob muvaffaqiyatli yaratildi! Iltimos, tizimga kiring.', 'success')
         return redirect(url_for('login'))
     
     return render_template('register.html')
 
+def announcement_to_dict(announcement):
+    return {
+        'id': announcement.id,
+        'title': announcement.title,
+        'content': announcement.content,
+        'announcement_type': announcement.announcement_type,
+        'start_date': announcement.start_date.isoformat(),
+        'end_date': announcement.end_date.isoformat()
+    }
+
 @app.route('/get_announcements')
 @login_required
 def get_announcements():
     """E'lonlarni JSON formatida qaytarish"""
     try:
-        now = datetime.utcnow()
-        active_announcements = Announcement.query.filter(
-            Announcement.is_active == True,
-            Announcement.start_date <= now,
-            Announcement.end_date >= now
-        ).order_by(Announcement.created_at.desc()).all()
-        
-        announcements_data = []
-        for announcement in active_announcements:
-            announcements_data.append({
-                'id': announcement.id,
-                'title': announcement.title,
-                'content': announcement.content,
-                'announcement_type': announcement.announcement_type,
-                'start_date': announcement.start_date.isoformat(),
-                'end_date': announcement.end_date.isoformat()
-            })
+        announcements_data = [announcement_to_dict(announcement) for announcement in active_announcements()]
         
         return jsonify({
             'success': True,
@@ -599,16 +2514,9 @@ def dashboard():
     # Test topshiriqlari
     quiz_tasks = [task for task in all_tasks if task.task_type == 'quiz']
     
-    # Yangiliklarni olish
-    news_list = News.query.filter_by(status='active').order_by(News.created_at.desc()).limit(3).all()
-    
-    # E'lonlarni olish
-    now = datetime.utcnow()
-    announcements = Announcement.query.filter(
-        Announcement.is_active == True,
-        Announcement.start_date <= now,
-        Announcement.end_date >= now
-    ).order_by(Announcement.created_at.desc()).all()
+    # Yangiliklar va e'lonlar keshlangan HTML fragment sifatida
+    news_html = news_fragment()
+    announcements_html = announcements_fragment()
     
     # Foydalanuvchining bajargan topshiriqlari
     completed_tasks = UserTask.query.filter_by(user_id=current_user.id, completed=True).all()
@@ -628,36 +2536,74 @@ def dashboard():
                          regular_tasks=regular_tasks,
                          quiz_tasks=quiz_tasks,
                          all_tasks=all_tasks,
-                         news_list=news_list,           # Yangi qo'shildi
-                         announcements=announcements,   # Yangi qo'shildi
+                         news_html=news_html,
+                         announcements_html=announcements_html,
                          items=items, 
                          energy_packs=energy_packs,
                          completed_task_ids=completed_task_ids,
                          daily_progress=daily_progress,
                          now=datetime.utcnow())
      
+# sana -> {user_id: bugungi task id'lari}: shu kun uchun UserTask'lar tayyor.
+# Faqat bugungi sana saqlanadi - kun almashganda eski yozuvlar tashlanadi
+materialized_daily_tasks = {}
+
+def materialized_for(today):
+    users = materialized_daily_tasks.get(today)
+    if users is None:
+        for day in [day for day in materialized_daily_tasks if day != today]:
+            materialized_daily_tasks.pop(day, None)
+        users = materialized_daily_tasks.setdefault(today, {})
+    return users
+
 def reset_daily_tasks(user_id):
-    """Kunlik topshiriqlarni yangilash"""
+    """Kunlik topshiriqlarni yangilash (bitta SELECT, kerak bo'lsa bitta INSERT va UPDATE)"""
     today = datetime.utcnow().date()
     
-    # Kunlik topshiriqlarni olish
-    todays_tasks = get_todays_tasks()
-    if todays_tasks:
-        daily_task_ids = [task.id for task in todays_tasks['daily_tasks']] + [todays_tasks['daily_quiz'].id]
-        
-        for task_id in daily_task_ids:
-            user_task = UserTask.query.filter_by(user_id=user_id, task_id=task_id).first()
-            if user_task:
+    # Kunlik topshiriqlarni olish (Task obyektlari kerak emas, faqat id'lar)
+    daily_task_ids = todays_plan()
+    if not daily_task_ids:
+        return
+    
+    materialized = materialized_for(today)
+    if materialized.get(user_id) == daily_task_ids:
+        return
+    
+    day_start = datetime.combine(today, datetime.min.time())
+    rows = db.session.execute(
+        select(UserTask.task_id, UserTask.completed_at)
+        .where(UserTask.user_id == user_id, UserTask.task_id.in_(daily_task_ids))
+    ).all()
+    existing_ids = {row.task_id for row in rows}
+    stale = any(row.completed_at and row.completed_at < day_start for row in rows)
+    missing_ids = [task_id for task_id in daily_task_ids if task_id not in existing_ids]
+    
+    if missing_ids or stale:
+        try:
+            if missing_ids:
+                # Yangi user task'larni yaratish
+                db.session.execute(insert(UserTask), [
+                    {'user_id': user_id, 'task_id': task_id, 'completed': False, 'created_at': datetime.utcnow()}
+                    for task_id in missing_ids
+                ])
+            if stale:
                 # Agar oxirgi bajarilgan sana bugun bo'lmasa, yangilash
-                if user_task.completed_at and user_task.completed_at.date() != today:
-                    user_task.completed = False
-                    user_task.completed_at = None
-            else:
-                # Yangi user task yaratish
-                new_user_task = UserTask(user_id=user_id, task_id=task_id)
-                db.session.add(new_user_task)
+                db.session.execute(
+                    update(UserTask)
+                    .where(
+                        UserTask.user_id == user_id,
+                        UserTask.task_id.in_(daily_task_ids),
+                        UserTask.completed_at < day_start
+                    )
+                    .values(completed=False, completed_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+            db.session.commit()
+        except IntegrityError:
+            # Parallel so'rov allaqachon yaratgan
+            db.session.rollback()
     
-    db.session.commit()
+    materialized[user_id] = daily_task_ids
 
 # YANGI: KUNLIK TEST ROUTE'I
 @app.route('/daily_quiz')
@@ -692,86 +2638,45 @@ def ml_quiz():
 @login_required
 def get_questions():
     try:
-        data = load_questions_from_json()
+        bank = question_bank.refresh()
         
-        if 'eco_questions' not in data:
+        if 'eco_questions' not in bank.data:
             return jsonify({'success': False, 'error': 'JSON faylda eco_questions topilmadi!'})
         
-        all_questions = data['eco_questions']
-        
-        if len(all_questions) == 0:
+        if len(bank.questions) == 0:
             return jsonify({'success': False, 'error': 'JSON faylda savollar topilmadi!'})
         
         difficulty_filter = request.args.get('difficulty', '').lower()
+        category = request.args.get('category', '')
         task_id = request.args.get('task_id', type=int)
         user_level = current_user.level
         
-        # Foydalanuvchi darajasiga qarab difficulty aniqlash
-        if not difficulty_filter:
-            if user_level <= 3:
-                difficulty_filter = 'easy'
-            elif user_level <= 6:
-                difficulty_filter = 'medium'
-            else:
-                difficulty_filter = 'hard'
-        
         if task_id:
             task = Task.query.get(task_id)
             if task:
                 difficulty_filter = task.difficulty
         
-        # Darajaga mos savollarni filtrlash
-        filtered_questions = []
+        difficulty_filter = normalize_difficulty(difficulty_filter)
         
-        if difficulty_filter:
-            difficulty_mapping = {
-                'easy': ['easy', 'oson', 'oddiy'],
-                'medium': ['medium', 'o\'rta', 'ortacha', 'middle'],
-                'hard': ['hard', 'qiyin', 'murakkab', 'difficult']
-            }
-            
-            target_difficulties = difficulty_mapping.get(difficulty_filter, [difficulty_filter])
-            
-            # Asosiy difficulty bo'yicha filtrlash
-            main_questions = [q for q in all_questions if q.get('difficulty', '').lower() in target_difficulties]
-            
-            # Agar yetarli savol bo'lmasa, boshqa difficulty'lardan qo'shamiz
-            if len(main_questions) < 5:
-                remaining_needed = 5 - len(main_questions)
-                
-                # Oson darajali foydalanuvchilar uchun
-                if difficulty_filter == 'easy':
-                    additional_questions = [q for q in all_questions if q.get('difficulty', '').lower() in difficulty_mapping['medium']]
-                    additional_questions = additional_questions[:remaining_needed]
-                    main_questions.extend(additional_questions)
-                
-                # O'rta darajali foydalanuvchilar uchun
-                elif difficulty_filter == 'medium':
-                    # 70% o'rta, 30% oson va qiyin
-                    medium_count = min(4, len(main_questions))
-                    easy_questions = [q for q in all_questions if q.get('difficulty', '').lower() in difficulty_mapping['easy']]
-                    hard_questions = [q for q in all_questions if q.get('difficulty', '').lower() in difficulty_mapping['hard']]
-                    
-                    additional_easy = easy_questions[:1] if easy_questions else []
-                    additional_hard = hard_questions[:1] if hard_questions else []
-                    
-                    main_questions = main_questions[:medium_count]
-                    main_questions.extend(additional_easy)
-                    main_questions.extend(additional_hard)
-                
-                # Qiyin darajali foydalanuvchilar uchun
-                elif difficulty_filter == 'hard':
-                    additional_questions = [q for q in all_questions if q.get('difficulty', '').lower() in difficulty_mapping['medium']]
-                    additional_questions = additional_questions[:remaining_needed]
-                    main_questions.extend(additional_questions)
-            
-            filtered_questions = main_questions
-            
-            if len(filtered_questions) == 0:
-                filtered_questions = all_questions
+        # Difficulty/kategoriya berilgan bo'lsa tanlash shu havza ichida, aks holda butun bankdan
+        candidate_ids = None
+        if difficulty_filter or category:
+            candidate_ids = [question['id'] for question in bank.candidates(difficulty_filter, category) if 'id' in question]
+        
+        # Foydalanuvchi mahoratiga qarab eng foydali 5 ta savol (takrorlanmaydi)
+        selector = adaptive_questions(bank)
+        sync_mastery(current_user.id)
+        selected_questions = [bank.by_id[question_id] for question_id in
+                              selector.select(current_user.id, QUESTIONS_PER_QUIZ, candidate_ids)]
         
-        # Tasodifiy 5 ta savol tanlash
-        selected_questions = random.sample(filtered_questions, min(5, len(filtered_questions)))
+        if not selected_questions:
+            selected_questions = bank.sample(difficulty_filter or level_difficulty(user_level), category=category)
+        
+        if not difficulty_filter:
+            # Mukofot darajasi tanlangan savollarda eng ko'p uchragan difficulty
+            difficulty_filter = Counter(
+                normalize_difficulty(question.get('difficulty')) for question in selected_questions
+            ).most_common(1)[0][0]
         
         return jsonify({
             'success': True,
@@ -796,6 +2701,8 @@ def submit_quiz():
         total_questions = data.get('total_questions', 0)
         task_id = data.get('task_id', None)
         difficulty = data.get('difficulty', 'medium')
+        user_level = current_user.level
+        question_ids, chosen_options, correct_flags = pack_quiz_answers(results)
         
         # Darajaga qarab mukofotlarni hisoblash
         base_coins = 20
@@ -827,17 +2734,54 @@ def submit_quiz():
                 elif task.difficulty == 'hard':
                     coins_earned += 20
         
+        def record_quiz():
+            # Mukofotlarni berish (energiya yetmasa UPDATE hech narsa o'zgartirmaydi)
+            balances = apply_balance_change(
+                current_user.id, 'quiz',
+                coins=coins_earned,
+                energy=-energy_cost,
+                reference=task.id if task else None,
+                values={'experience': User.experience + exp_gained}
+            )
+            if balances is None:
+                db.session.rollback()
+                return None
+            
+            level_up = check_level_up(current_user.id)
+            
+            # Test natijasini saqlash
+            quiz_result = QuizResult(
+                user_id=current_user.id,
+                score=score,
+                correct_answers=correct_count,
+                total_questions=total_questions,
+                coins_earned=coins_earned,
+                task_id=task.id if task else None,
+                user_level=user_level,
+                question_ids=question_ids,
+                chosen_options=chosen_options,
+                correct_flags=correct_flags
+            )
+            db.session.add(quiz_result)
+            
+            # Kunlik progress yangilash
+            add_daily_progress(current_user.id, quizzes=1, coins=coins_earned)
+            
+            db.session.commit()
+            return level_up
+        
+        level_up = run_ledger_operation(record_quiz)
+        
         # Energiya tekshirish
-        if current_user.energy < energy_cost:
+        if level_up is None:
             return jsonify({
                 'success': False,
                 'error': f'Energiya yetarli emas! Sizda {current_user.energy} energiya bor, kerak: {energy_cost}'
             })
         
-        # Mukofotlarni berish
-        current_user.coins += coins_earned
-        current_user.energy = max(0, current_user.energy - energy_cost)
+        after_balance_commit(current_user)
         
+        message = f'Test yakunlandi! +{coins_earned} coin, -{energy_cost} energiya'
         if level_up:
             message += f' Tabriklaymiz! Siz {current_user.level}-darajaga ko\'tarildingiz!'
         
@@ -865,14 +2809,102 @@ def submit_quiz():
     except Exception as e:
         return jsonify({'success': False, 'error': f'Natijalarni saqlashda xatolik: {str(e)}'})
 
-def check_level_up(user):
-    """Foydalanuvchi darajasini tekshirish"""
-    required_exp = user.level * 100
-    if user.experience >= required_exp:
-        user.level += 1
-        user.experience = 0
-        user.coins += user.level * 50
-        return True
+@app.route('/ml/check_answer', methods=['POST'])
+@login_required
+def check_answer():
+    """Erkin javob(lar)ni baholash: {"answer": "..."} yoki butun sinf uchun {"answers": [...]}"""
+    data = request.get_json(silent=True) or {}
+    batch = 'answers' in data
+    answers = data.get('answers') if batch else [data.get('answer')]
+
+    if not isinstance(answers, list) or not answers:
+        return jsonify({'success': False, 'error': 'Javob yuborilmadi'})
+    if len(answers) > MAX_ANSWER_BATCH:
+        return jsonify({'success': False, 'error': f'Bir so\'rovda ko\'pi bilan {MAX_ANSWER_BATCH} ta javob'})
+    if not all(isinstance(answer, str) and answer.strip() for answer in answers):
+        return jsonify({'success': False, 'error': 'Javob bo\'sh bo\'lmagan matn bo\'lishi kerak'})
+    if any(len(answer) > MAX_ANSWER_LENGTH for answer in answers):
+        return jsonify({'success': False, 'error': f'Javob {MAX_ANSWER_LENGTH} belgidan oshmasligi kerak'})
+
+    try:
+        results = score_answers(answers)
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Javobni baholashda xatolik: {str(e)}'})
+
+    if batch:
+        return jsonify({'success': True, 'results': results, 'total': len(results)})
+    return jsonify({'success': True, **results[0]})
+
+# COIN/ENERGIYA LEDGER
+# Balans Python'da o'qib-yozilmaydi: har bir o'zgarish bitta shartli UPDATE
+# (coins >= narx) va append-only tranzaksiya yozuvi.
+LEDGER_MAX_RETRIES = 5
+LEDGER_RETRY_BASE_SECONDS = 0.02
+
+def apply_balance_change(user_id, reason, coins=0, energy=0, reference=None, values=None, conditions=()):
+    """Coin/energiyani atomar o'zgartirish. Balans yetmasa None (commit chaqiruvchida)"""
+    statement = update(User).where(User.id == user_id, *conditions)
+    if coins < 0:
+        statement = statement.where(User.coins >= -coins)
+    if energy < 0:
+        statement = statement.where(User.energy >= -energy)
+    
+    new_values = {'stats_version': func.coalesce(User.stats_version, 0) + 1}
+    if coins:
+        new_values['coins'] = User.coins + coins
+    if energy:
+        new_values['energy'] = User.energy + energy
+    new_values.update(values or {})
+    
+    result = db.session.execute(statement.values(**new_values).execution_options(synchronize_session=False))
+    if result.rowcount != 1:
+        return None
+    
+    balances = db.session.execute(select(User.coins, User.energy).where(User.id == user_id)).one()
+    reference = str(reference) if reference is not None else None
+    if coins:
+        db.session.add(CoinTransaction(user_id=user_id, amount=coins, balance_after=balances.coins, reason=reason, reference=reference))
+    if energy:
+        db.session.add(EnergyTransaction(user_id=user_id, amount=energy, balance_after=balances.energy, reason=reason, reference=reference))
+    return balances
+
+def run_ledger_operation(operation):
+    """Yozish konflikti (SQLite 'database is locked') bo'lsa operatsiyani qayta bajarish"""
+    for attempt in range(LEDGER_MAX_RETRIES):
+        try:
+            return operation()
+        except OperationalError:
+            db.session.rollback()
+            if attempt == LEDGER_MAX_RETRIES - 1:
+                raise
+            time.sleep(LEDGER_RETRY_BASE_SECONDS * (2 ** attempt) * (0.5 + random.random()))
+
+def add_daily_progress(user_id, tasks=0, quizzes=0, coins=0):
+    today = datetime.utcnow().date()
+    db.session.execute(
+        update(DailyProgress)
+        .where(DailyProgress.user_id == user_id, DailyProgress.date == today)
+        .values(
+            tasks_completed=DailyProgress.tasks_completed + tasks,
+            quizzes_completed=DailyProgress.quizzes_completed + quizzes,
+            coins_earned=DailyProgress.coins_earned + coins
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def check_level_up(user_id):
+    """Foydalanuvchi darajasini tekshirish (bir vaqtda faqat bitta so'rov oshiradi)"""
+    level, experience = db.session.execute(select(User.level, User.experience).where(User.id == user_id)).one()
+    required_exp = level * 100
+    if experience >= required_exp:
+        new_level = level + 1
+        return apply_balance_change(
+            user_id, 'level_up',
+            coins=new_level * 50,
+            reference=new_level,
+            values={'level': new_level, 'experience': 0},
+            conditions=(User.level == level,)
+        ) is not None
     return False
 
 @app.route('/start_task_quiz/<int:task_id>')
@@ -916,38 +2948,65 @@ def complete_task(task_id):
                 'quiz_required': True
             })
     
-    if current_user.energy >= task.energy_cost:
-        current_user.coins += task.reward_coins
-        current_user.energy = max(0, current_user.energy - task.energy_cost)
-        
-        # Tajriba qo'shish
-        exp_gained = 0
-        if task.difficulty == 'easy':
-            exp_gained = 5
-        elif task.difficulty == 'medium':
-            exp_gained = 10
-        else:
-            exp_gained = 20
-        
-        current_user.experience += exp_gained
-        check_level_up(current_user)
-        
-        # UserTask ni yangilash
-        if not user_task:
-            user_task = UserTask(user_id=current_user.id, task_id=task_id)
-            db.session.add(user_task)
+    # Tajriba qo'shish
+    exp_gained = 0
+    if task.difficulty == 'easy':
+        exp_gained = 5
+    elif task.difficulty == 'medium':
+        exp_gained = 10
+    else:
+        exp_gained = 20
+    
+    def record_completion():
+        # UserTask ni yangilash: faqat hali bajarilmagan bo'lsa (ikki marta bosishdan himoya)
+        now = datetime.utcnow()
+        marked = db.session.execute(
+            update(UserTask)
+            .where(UserTask.user_id == current_user.id, UserTask.task_id == task_id, UserTask.completed == False)
+            .values(completed=True, completed_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not marked:
+            exists = db.session.execute(
+                select(UserTask.id).where(UserTask.user_id == current_user.id, UserTask.task_id == task_id)
+            ).first()
+            if exists:
+                db.session.rollback()
+                return 'already_completed'
+            db.session.add(UserTask(user_id=current_user.id, task_id=task_id, completed=True, completed_at=now))
+            db.session.flush()
+        
+        balances = apply_balance_change(
+            current_user.id, 'task',
+            coins=task.reward_coins,
+            energy=-task.energy_cost,
+            reference=task.id,
+            values={'experience': User.experience + exp_gained}
+        )
+        if balances is None:
+            db.session.rollback()
+            return 'no_energy'
         
-        user_task.completed = True
-        user_task.completed_at = datetime.utcnow()
+        check_level_up(current_user.id)
         
         # Kunlik progress yangilash
-        today = datetime.utcnow().date()
-        daily_progress = DailyProgress.query.filter_by(user_id=current_user.id, date=today).first()
-        if daily_progress:
-            daily_progress.tasks_completed += 1
-            daily_progress.coins_earned += task.reward_coins
+        add_daily_progress(current_user.id, tasks=1, coins=task.reward_coins)
         
         db.session.commit()
+        return 'ok'
+    
+    try:
+        outcome = run_ledger_operation(record_completion)
+    except IntegrityError:
+        # Parallel so'rov shu UserTask'ni allaqachon yaratgan
+        db.session.rollback()
+        outcome = 'already_completed'
+    
+    if outcome == 'already_completed':
+        return jsonify({'success': False, 'error': 'Bu topshiriq allaqachon bajarilgan!'})
+    
+    if outcome == 'ok':
+        after_balance_commit(current_user)
         
         return jsonify({
             'success': True, 
@@ -967,15 +3026,24 @@ def buy_item(item_id):
     if not item.is_active:
         return jsonify({'success': False, 'error': 'Bu mahsulot hozir mavjud emas!'})
     
-    if current_user.coins >= item.price:
-        current_user.coins -= item.price
-        
-        if item.energy_boost > 0:
-            current_user.energy += item.energy_boost
+    def purchase():
+        balances = apply_balance_change(
+            current_user.id, 'shop_item',
+            coins=-item.price,
+            energy=max(item.energy_boost or 0, 0),
+            reference=item.id
+        )
+        if balances is None:
+            db.session.rollback()
+            return False
         
         new_inventory = Inventory(user_id=current_user.id, item_id=item.id)
         db.session.add(new_inventory)
         db.session.commit()
+        return True
+    
+    if run_ledger_operation(purchase):
+        after_balance_commit(current_user)
         
         message = f'{item.name} sotib olindi!'
         if item.energy_boost > 0:
@@ -995,13 +3063,27 @@ def buy_item(item_id):
 def buy_energy():
     try:
         data = request.get_json()
-        energy_amount = data.get('energy', 0)
-        price = data.get('price', 0)
-        
-        if current_user.coins >= price:
-            current_user.coins -= price
-            current_user.energy += energy_amount
+        energy_amount = int(data.get('energy', 0))
+        price = int(data.get('price', 0))
+        
+        if energy_amount <= 0 or price <= 0:
+            return jsonify({'success': False, 'error': 'Noto\'g\'ri energiya paketi!'})
+        
+        def purchase():
+            balances = apply_balance_change(
+                current_user.id, 'energy_pack',
+                coins=-price,
+                energy=energy_amount,
+                reference=f'{energy_amount}/{price}'
+            )
+            if balances is None:
+                db.session.rollback()
+                return False
             db.session.commit()
+            return True
+        
+        if run_ledger_operation(purchase):
+            after_balance_commit(current_user)
             
             return jsonify({
                 'success': True,
@@ -1018,29 +3100,23 @@ def buy_energy():
 @app.route('/hero')
 @login_required
 def hero():
-    inventory_items = Inventory.query.filter_by(user_id=current_user.id).all()
-    equipped_items = [item for item in inventory_items if item.equipped]
-    
     # Kategoriyalar bo'yicha inventar
-    clothes_items = [item for item in inventory_items if item.item.item_type == 'clothes']
-    hat_items = [item for item in inventory_items if item.item.item_type == 'hat']
-    shoe_items = [item for item in inventory_items if item.item.item_type == 'shoes']
-    accessory_items = [item for item in inventory_items if item.item.item_type == 'accessory']
+    inventory_items, equipped_items, by_type = load_inventory(current_user.id)
     
     return render_template('hero.html', 
                          user=current_user,
                          inventory_items=inventory_items,
                          equipped_items=equipped_items,
-                         clothes_items=clothes_items,
-                         hat_items=hat_items,
-                         shoe_items=shoe_items,
-                         accessory_items=accessory_items)
+                         clothes_items=by_type['clothes'],
+                         hat_items=by_type['hat'],
+                         shoe_items=by_type['shoes'],
+                         accessory_items=by_type['accessory'])
 
 @app.route('/equip_item/<int:item_id>', methods=['POST'])
 @login_required
 def equip_item(item_id):
     try:
-        inventory_item = Inventory.query.filter_by(user_id=current_user.id, id=item_id).first()
+        inventory_item = Inventory.query.options(joinedload(Inventory.item)).filter_by(user_id=current_user.id, id=item_id).first()
         
         if not inventory_item:
             return jsonify({'success': False, 'error': 'Item topilmadi!'})
@@ -1068,7 +3144,7 @@ def equip_item(item_id):
 @login_required
 def unequip_item(item_id):
     try:
-        inventory_item = Inventory.query.filter_by(user_id=current_user.id, id=item_id).first()
+        inventory_item = Inventory.query.options(joinedload(Inventory.item)).filter_by(user_id=current_user.id, id=item_id).first()
         
         if not inventory_item:
             return jsonify({'success': False, 'error': 'Item topilmadi!'})
@@ -1095,33 +3171,70 @@ def admin_dashboard():
         flash('Sizga admin huquqi berilmagan!', 'error')
         return redirect(url_for('dashboard'))
     
-    total_users = User.query.count()
-    total_tasks = Task.query.count()
-    total_quiz_results = QuizResult.query.count()
-    total_posts = News.query.count()
-    total_child_users = User.query.filter_by(role='child').count()
-    total_adult_users = User.query.filter_by(role='adult').count()
+    totals = admin_totals()
     recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
-    recent_posts = News.query.order_by(News.created_at.desc()).limit(5).all()
-    
-    # Kunlik statistikalar
-    today = datetime.utcnow().date()
-    daily_progress_today = DailyProgress.query.filter_by(date=today).all()
-    total_tasks_today = sum(dp.tasks_completed for dp in daily_progress_today)
-    total_quizzes_today = sum(dp.quizzes_completed for dp in daily_progress_today)
+    recent_posts = news_with_authors().order_by(News.created_at.desc()).limit(5).all()
+    daily_trend = activity_trend('day')
     
     return render_template('admin_dashboard.html', 
                          user=current_user,
-                         total_users=total_users,
-                         total_tasks=total_tasks,
-                         total_quiz_results=total_quiz_results,
-                         total_posts=total_posts,
-                         total_child_users=total_child_users,
-                         total_adult_users=total_adult_users,
                          recent_users=recent_users,
                          recent_posts=recent_posts,
-                         total_tasks_today=total_tasks_today,
-                         total_quizzes_today=total_quizzes_today)
+                         daily_trend=daily_trend,
+                         trend_max=max([point['tasks'] + point['quizzes'] for point in daily_trend] + [1]),
+                         **totals)
+
+@app.route('/admin/stats/trends')
+@login_required
+def admin_stats_trends():
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Admin huquqi yo\'q'})
+    
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in TREND_WINDOWS:
+        return jsonify({'success': False, 'error': 'granularity: hour yoki day'})
+    
+    return jsonify({
+        'success': True,
+        'granularity': granularity,
+        'totals': admin_totals(),
+        'trend': activity_trend(granularity)
+    })
+
+@app.route('/admin/stats/quiz')
+@login_required
+def admin_quiz_analytics():
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Admin huquqi yo\'q'})
+    
+    return jsonify({'success': True, **quiz_analytics_report()})
+
+@app.route('/admin/profiling')
+@login_required
+def admin_profiling():
+    if not current_user.is_admin:
+        flash('Sizga admin huquqi berilmagan!', 'error')
+        return redirect(url_for('dashboard'))
+    
+    snapshot = request_profiler.snapshot()
+    if request.args.get('format') == 'json':
+        return jsonify({'success': True, **snapshot})
+    
+    return render_template('admin_profiling.html',
+                         user=current_user,
+                         endpoints=snapshot['endpoints'],
+                         slow_queries=snapshot['slow_queries'],
+                         slow_query_ms=SLOW_QUERY_MS,
+                         n_plus_one_threshold=N_PLUS_ONE_THRESHOLD)
+
+@app.route('/admin/profiling/reset', methods=['POST'])
+@login_required
+def reset_profiling():
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Admin huquqi yo\'q'})
+    
+    request_profiler.reset()
+    return jsonify({'success': True, 'message': 'Profil statistikasi tozalandi'})
 
 @app.route('/admin/users')
 @login_required
@@ -1130,8 +3243,11 @@ def admin_users():
         flash('Sizga admin huquqi berilmagan!', 'error')
         return redirect(url_for('dashboard'))
     
-    users = User.query.all()
-    return render_template('admin_users.html', user=current_user, users=users)
+    admin_list = ADMIN_LISTS['users']
+    page = admin_list.page(request.args)
+    if wants_json():
+        return admin_list.json_response(page)
+    return render_template('admin_users.html', user=current_user, users=page.items, page=page)
 
 @app.route('/admin/tasks')
 @login_required
@@ -1140,8 +3256,12 @@ def admin_tasks():
         flash('Sizga admin huquqi berilmagan!', 'error')
         return redirect(url_for('dashboard'))
     
-    tasks = Task.query.all()
-    return render_template('admin_tasks.html', user=current_user, tasks=tasks)
+    admin_list = ADMIN_LISTS['tasks']
+    page = admin_list.page(request.args)
+    if wants_json():
+        return admin_list.json_response(page)
+    return render_template('admin_tasks.html', user=current_user, tasks=page.items, page=page,
+                         task_counts=task_counts())
 
 @app.route('/admin/child')
 @login_required
@@ -1150,9 +3270,13 @@ def admin_child():
         flash('Sizga admin huquqi berilmagan!', 'error')
         return redirect(url_for('dashboard'))
     
-    child_users = User.query.filter_by(role='child').all()
-    tasks = Task.query.all()
-    return render_template('admin_child.html', user=current_user, child_users=child_users, tasks=tasks)
+    admin_list = ADMIN_LISTS['child']
+    page = admin_list.page(request.args)
+    if wants_json():
+        return admin_list.json_response(page)
+    # To'liq ro'yxat /admin/tasks sahifasida; bu yerda faqat oxirgilari
+    tasks = Task.query.order_by(Task.created_at.desc(), Task.id.desc()).limit(ADMIN_PAGE_SIZE).all()
+    return render_template('admin_child.html', user=current_user, child_users=page.items, tasks=tasks, page=page)
 
 @app.route('/admin/adult')
 @login_required
@@ -1161,8 +3285,11 @@ def admin_adult():
         flash('Sizga admin huquqi berilmagan!', 'error')
         return redirect(url_for('dashboard'))
     
-    adult_users = User.query.filter_by(role='adult').all()
-    return render_template('admin_adult.html', user=current_user, adult_users=adult_users)
+    admin_list = ADMIN_LISTS['adult']
+    page = admin_list.page(request.args)
+    if wants_json():
+        return admin_list.json_response(page)
+    return render_template('admin_adult.html', user=current_user, adult_users=page.items, page=page)
 
 @app.route('/admin/news')
 @login_required
@@ -1171,8 +3298,11 @@ def admin_news():
         flash('Sizga admin huquqi berilmagan!', 'error')
         return redirect(url_for('dashboard'))
     
-    news_list = News.query.order_by(News.created_at.desc()).all()
-    return render_template('admin_news.html', user=current_user, news_list=news_list)
+    admin_list = ADMIN_LISTS['news']
+    page = admin_list.page(request.args)
+    if wants_json():
+        return admin_list.json_response(page)
+    return render_template('admin_news.html', user=current_user, news_list=page.items, page=page)
 
 @app.route('/admin/announcements')
 @login_required
@@ -1181,25 +3311,18 @@ def admin_announcements():
         flash('Sizga admin huquqi berilmagan!', 'error')
         return redirect(url_for('dashboard'))
     
-    announcements = Announcement.query.order_by(Announcement.created_at.desc()).all()
-    now = datetime.utcnow()
-    
-    # Statistikalar
-    active_announcements_count = Announcement.query.filter(
-        Announcement.start_date <= now,
-        Announcement.end_date >= now,
-        Announcement.is_active == True
-    ).count()
-    
-    expired_announcements_count = Announcement.query.filter(
-        Announcement.end_date < now
-    ).count()
+    admin_list = ADMIN_LISTS['announcements']
+    page = admin_list.page(request.args)
+    if wants_json():
+        return admin_list.json_response(page)
+    counts = announcement_counts()
     
     return render_template('admin_announcements.html', 
                          user=current_user, 
-                         announcements=announcements,
-                         active_announcements_count=active_announcements_count,
-                         expired_announcements_count=expired_announcements_count,
+                         announcements=page.items,
+                         page=page,
+                         active_announcements_count=len(active_announcements()),
+                         expired_announcements_count=counts['expired'],
                          datetime=datetime)
 
 @app.route('/admin/daily_tasks')
@@ -1225,12 +3348,16 @@ def admin_shop():
         flash('Sizga admin huquqi berilmagan!', 'error')
         return redirect(url_for('dashboard'))
     
-    items = Item.query.all()
+    admin_list = ADMIN_LISTS['shop']
+    page = admin_list.page(request.args)
+    if wants_json():
+        return admin_list.json_response(page)
     energy_packs = EnergyPack.query.all()
     
     return render_template('admin_shop.html', 
                          user=current_user, 
-                         items=items,
+                         items=page.items,
+                         page=page,
                          energy_packs=energy_packs)
 
 # YANGI ADMIN API ROUTE'LARI
@@ -1256,6 +3383,7 @@ def add_task():
         )
         db.session.add(new_task)
         db.session.commit()
+        invalidate_admin_lists('tasks')
         return jsonify({'success': True, 'message': 'Topshiriq muvaffaqiyatli qo\'shildi', 'task_id': new_task.id})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1309,6 +3437,8 @@ def update_task(task_id):
         task.updated_at = datetime.utcnow()
         
         db.session.commit()
+        invalidate_admin_lists('tasks')
+        replan_daily_tasks(task_id)
         return jsonify({'success': True, 'message': 'Topshiriq muvaffaqiyatli yangilandi'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1327,6 +3457,8 @@ def delete_task(task_id):
         QuizResult.query.filter_by(task_id=task_id).delete()
         db.session.delete(task)
         db.session.commit()
+        invalidate_admin_lists('tasks')
+        replan_daily_tasks(task_id)
         return jsonify({'success': True, 'message': 'Topshiriq muvaffaqiyatli o\'chirildi'})
     
     return jsonify({'success': False, 'error': 'Topshiriq topilmadi'})
@@ -1341,6 +3473,8 @@ def toggle_task(task_id):
     if task:
         task.is_active = not task.is_active
         db.session.commit()
+        invalidate_admin_lists('tasks')
+        replan_daily_tasks(task_id)
         status = "faol" if task.is_active else "nofaol"
         return jsonify({'success': True, 'message': f'Topshiriq {status} holatga o\'zgartirildi', 'is_active': task.is_active})
     
@@ -1368,11 +3502,38 @@ def manual_daily_reset():
         return jsonify({'success': False, 'error': 'Admin huquqi yo\'q'})
     
     try:
-        daily_reset_system()
-        return jsonify({'success': True, 'message': 'Kunlik yangilanish bajarildi'})
+        summary = daily_reset_system()
+        return jsonify({'success': True, 'message': 'Kunlik yangilanish bajarildi', 'summary': summary})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/admin/scheduler_jobs')
+@login_required
+def admin_scheduler_jobs():
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Admin huquqi yo\'q'})
+    
+    runs = JobRun.query.order_by(JobRun.started_at.desc()).limit(50).all()
+    leases = JobLease.query.all()
+    return jsonify({
+        'success': True,
+        'leases': [{
+            'job_name': lease.job_name,
+            'owner': lease.owner,
+            'expires_at': lease.expires_at.isoformat() if lease.expires_at else None,
+            'last_run_for': lease.last_run_for.isoformat() if lease.last_run_for else None
+        } for lease in leases],
+        'runs': [{
+            'job_name': run.job_name,
+            'scheduled_for': run.scheduled_for.isoformat(),
+            'owner': run.owner,
+            'started_at': run.started_at.isoformat() if run.started_at else None,
+            'duration_ms': run.duration_ms,
+            'status': run.status,
+            'error': run.error
+        } for run in runs]
+    })
+
 # YANGILIK VA E'LON FUNKSIYALARI
 @app.route('/admin/add_news', methods=['POST'])
 @login_required
@@ -1391,16 +3552,75 @@ def add_news():
         )
         db.session.add(new_news)
         db.session.commit()
+        invalidate_admin_lists('news')
+        content_cache.invalidate('news')
         return jsonify({'success': True, 'message': 'Yangilik muvaffaqiyatli qo\'shildi', 'news_id': new_news.id})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/admin/delete_news/<int:news_id>', methods=['POST'])
+@login_required
+def delete_news(news_id):
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Admin huquqi yo\'q'})
+    
+    news = News.query.get(news_id)
+    if news:
+        db.session.delete(news)
+        db.session.commit()
+        invalidate_admin_lists('news')
+        content_cache.invalidate('news')
+        news_views.forget(news_id)
+        return jsonify({'success': True, 'message': 'Yangilik muvaffaqiyatli o\'chirildi'})
+    
+    return jsonify({'success': False, 'error': 'Yangilik topilmadi'})
+
 @app.route('/admin/add_announcement', methods=['POST'])
 @login_required
 def add_announcement():
     if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Admin huquqi yo\'q'})
+    
+    try:
+        data = request.get_json()
+        new_announcement = Announcement(
+            title=data.get('title'),
+            content=data.get('content'),
+            announcement_type=data.get('type', data.get('announcement_type', 'info')),
+            start_date=datetime.fromisoformat(data['start_date']) if data.get('start_date') else datetime.utcnow(),
+            end_date=datetime.fromisoformat(data['end_date']) if data.get('end_date') else datetime.utcnow() + timedelta(days=7),
+            is_active=data.get('is_active', True),
+            author_id=current_user.id
+        )
+        db.session.add(new_announcement)
+        db.session.commit()
+        invalidate_admin_lists('announcements')
+        content_cache.invalidate('announcements')
+        
+        if new_announcement.is_active:
+            event_hub.broadcast('announcement', {'action': 'added', 'announcement': announcement_to_dict(new_announcement)})
+        
+        return jsonify({'success': True, 'message': 'E\'lon muvaffaqiyatli qo\'shildi', 'announcement_id': new_announcement.id})
+    except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/admin/delete_announcement/<int:announcement_id>', methods=['POST'])
+@login_required
+def delete_announcement(announcement_id):
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'error': 'Admin huquqi yo\'q'})
+    
+    announcement = Announcement.query.get(announcement_id)
+    if announcement:
+        db.session.delete(announcement)
+        db.session.commit()
+        invalidate_admin_lists('announcements')
+        content_cache.invalidate('announcements')
+        event_hub.broadcast('announcement', {'action': 'deleted', 'id': announcement_id})
+        return jsonify({'success': True, 'message': 'E\'lon muvaffaqiyatli o\'chirildi'})
+    
+    return jsonify({'success': False, 'error': 'E\'lon topilmadi'})
+
 # DO'KON ADMIN FUNKSIYALARI
 @app.route('/admin/add_item', methods=['POST'])
 @login_required
@@ -1420,6 +3640,7 @@ def add_item():
         )
         db.session.add(new_item)
         db.session.commit()
+        invalidate_admin_lists('shop')
         return jsonify({'success': True, 'message': 'Mahsulot muvaffaqiyatli qo\'shildi', 'item_id': new_item.id})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1442,6 +3663,7 @@ def update_item(item_id):
         item.is_active = data.get('is_active', item.is_active)
         
         db.session.commit()
+        invalidate_admin_lists('shop')
         return jsonify({'success': True, 'message': 'Mahsulot muvaffaqiyatli yangilandi'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1458,6 +3680,7 @@ def delete_item(item_id):
         Inventory.query.filter_by(item_id=item_id).delete()
         db.session.delete(item)
         db.session.commit()
+        invalidate_admin_lists('shop')
         return jsonify({'success': True, 'message': 'Mahsulot muvaffaqiyatli o\'chirildi'})
     
     return jsonify({'success': False, 'error': 'Mahsulot topilmadi'})
@@ -1493,38 +3716,63 @@ def games():
 @app.route('/news')
 @login_required
 def news():
-    # Yangiliklarni bazadan olish
-    news_list = News.query.filter_by(status='active').order_by(News.created_at.desc()).all()
-    
-    # E'lonlarni bazadan olish - faqat faol va hozirgi vaqtda amal qiladiganlar
-    now = datetime.utcnow()
-    active_announcements = Announcement.query.filter(
-        Announcement.is_active == True,
-        Announcement.start_date <= now,
-        Announcement.end_date >= now
-    ).order_by(Announcement.created_at.desc()).all()
-    
-    print(f"📢 E'lonlar soni: {len(active_announcements)}")  # Debug uchun
-    
     return render_template('news.html', 
                          user=current_user, 
-                         news_list=news_list, 
-                         announcements=active_announcements)
+                         news_list=active_news(), 
+                         announcements=active_announcements())
     
 @app.route('/news/<int:news_id>')
 @login_required
 def news_detail(news_id):
     news = News.query.get_or_404(news_id)
-    news.views_count += 1
-    db.session.commit()
+    news_views.record(news.id, current_user.id)
+    views = (news.views_count or 0) + news_views.pending(news.id)
     
-    return render_template('news_detail.html', user=current_user, news=news)
+    return render_template('news_detail.html', user=current_user, news=news, views=views,
+                         unique_viewers=news_views.unique_viewers(news.id))
+
+@app.route('/api/news/top')
+@login_required
+def top_news():
+    limit = min(max(request.args.get('limit', 5, type=int), 1), 50)
+    return jsonify({'success': True, 'news': news_views.top(limit)})
 
 @app.route('/leaderboard')
 @login_required
 def leaderboard():
-    users = User.query.filter_by(role='child').order_by(User.coins.desc()).limit(20).all()
-    return render_template('leaderboard.html', user=current_user, users=users)
+    top = leaderboard_engine.top(LEADERBOARD_SIZE)
+    users_by_id = {u.id: u for u in User.query.filter(User.id.in_([entry['user_id'] for entry in top])).all()}
+    users = [users_by_id[entry['user_id']] for entry in top if entry['user_id'] in users_by_id]
+    
+    my_rank = leaderboard_engine.rank(current_user.id)
+    around_me = leaderboard_engine.around(current_user.id) if my_rank and my_rank > LEADERBOARD_SIZE else []
+    
+    return render_template('leaderboard.html',
+                         user=current_user,
+                         users=users,
+                         my_rank=my_rank,
+                         around_me=around_me,
+                         total_players=len(leaderboard_engine))
+
+@app.route('/get_leaderboard')
+@login_required
+def get_leaderboard():
+    board = request.args.get('board', 'all')
+    limit = min(request.args.get('limit', LEADERBOARD_SIZE, type=int), 100)
+    
+    if board in PERIOD_BOARD_DAYS:
+        return jsonify({'success': True, 'board': board, 'top': period_leaderboard(board, limit)})
+    
+    return jsonify({
+        'success': True,
+        'board': 'all',
+        'top': leaderboard_engine.top(limit),
+        'me': {
+            'rank': leaderboard_engine.rank(current_user.id),
+            'around': leaderboard_engine.around(current_user.id)
+        },
+        'total_players': len(leaderboard_engine)
+    })
 
 @app.route('/missions')
 @login_required
@@ -1614,42 +3862,145 @@ def logout():
     return redirect(url_for('login'))
 
 # API ROUTE'LARI
-@app.route('/get_user_stats')
-@login_required
-def get_user_stats():
-    return jsonify({
-        'success': True,
-        'coins': current_user.coins,
-        'energy': current_user.energy,
-        'streak': current_user.streak,
-        'level': current_user.level,
-        'experience': current_user.experience
-    })
+def bump_stats_version(user):
+    """Coin/energiya/progress o'zgarganda foydalanuvchi statistikasi versiyasini oshirish"""
+    user.stats_version = (user.stats_version or 0) + 1
 
-@app.route('/get_daily_progress')
-@login_required
-def get_daily_progress():
+def build_user_stats(user):
+    return {
+        'coins': user.coins,
+        'energy': user.energy,
+        'streak': user.streak,
+        'level': user.level,
+        'experience': user.experience
+    }
+
+def build_daily_progress(user_id):
     today = datetime.utcnow().date()
-    daily_progress = DailyProgress.query.filter_by(user_id=current_user.id, date=today).first()
+    daily_progress = DailyProgress.query.filter_by(user_id=user_id, date=today).first()
     
     if daily_progress:
-        return jsonify({
-            'success': True,
+        return {
             'tasks_completed': daily_progress.tasks_completed,
             'quizzes_completed': daily_progress.quizzes_completed,
             'coins_earned': daily_progress.coins_earned
-        })
+        }
+    return {
+        'tasks_completed': 0,
+        'quizzes_completed': 0,
+        'coins_earned': 0
+    }
+
+@app.route('/get_user_stats')
+@login_required
+def get_user_stats():
+    return jsonify({'success': True, **build_user_stats(current_user)})
+
+@app.route('/get_daily_progress')
+@login_required
+def get_daily_progress():
+    return jsonify({'success': True, **build_daily_progress(current_user.id)})
+
+@app.route('/events')
+@login_required
+def events():
+    """Foydalanuvchi uchun SSE oqimi (Last-Event-ID bilan davom ettirish mumkin).
+    
+    Oqim berilmasa 204: EventSource qayta ulanmaydi va mijoz /get_stats so'roviga o'tadi.
+    """
+    if not streaming_supported(request.environ) or not acquire_stream_slot():
+        return Response(status=204)
+    user_id = current_user.id
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    try:
+        last_event_id = int(last_event_id) if last_event_id is not None else None
+    except ValueError:
+        last_event_id = None
+    engine = db.engine
+    versions = stream_versions(engine, user_id)
+    # Oqim uzoq yashaydi: user_loader ochgan ulanish pulga darhol qaytariladi
+    db.session.remove()
+    
+    def generate():
+        known_versions = versions
+        checked_at = time.monotonic()
+        subscriber = event_hub.subscribe(user_id)
+        last_sent = last_event_id or 0
+        try:
+            yield f'retry: {SSE_HEARTBEAT_SECONDS * 1000}\n\n'
+            
+            if last_event_id is not None:
+                missed, complete = event_hub.replay(user_id, last_event_id)
+                if not complete:
+                    yield format_sse(None, 'resync', {})
+                for event_id, event, data in missed:
+                    yield format_sse(event_id, event, data)
+                    last_sent = event_id
+            
+            while True:
+                if time.monotonic() - checked_at >= SSE_VERSION_CHECK_SECONDS:
+                    # Boshqa jarayondagi o'zgarishlar bu jarayon hodisalarida ko'rinmaydi
+                    current_versions = stream_versions(engine, user_id)
+                    checked_at = time.monotonic()
+                    if current_versions != known_versions:
+                        known_versions = current_versions
+                        yield format_sse(None, 'resync', {})
+                
+                try:
+                    event_id, event, data = subscriber.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                
+                if event == 'stats':
+                    known_versions = (data.get('version', known_versions[0]), known_versions[1])
+                if event_hub.take_overflow(subscriber):
+                    yield format_sse(None, 'resync', {})
+                if event_id <= last_sent:
+                    continue
+                yield format_sse(event_id, event, data)
+                last_sent = event_id
+        finally:
+            event_hub.unsubscribe(user_id, subscriber)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    # Generator hech boshlanmasa ham (mijoz darhol uzilsa) slot qaytariladi
+    response.call_on_close(release_stream_slot)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/get_stats')
+@login_required
+def get_stats():
+    """Header statistikasi uchun yengil feed (ETag va ?since=<version> bilan 304)"""
+    version = current_user.stats_version or 0
+    since = request.args.get('since', type=int)
+    
+    # Versiya o'zgarmagan bo'lsa, statistika va kunlik progress so'rovlari bajarilmaydi
+    # (current_user'ni user_loader baribir bazadan yuklaydi)
+    if since is not None and since == version:
+        response = app.response_class(status=304)
     else:
-        return jsonify({
+        payload = {
             'success': True,
-            'tasks_completed': 0,
-            'quizzes_completed': 0,
-            'coins_earned': 0
-        })
+            'version': version,
+            **build_user_stats(current_user),
+            'daily_progress': build_daily_progress(current_user.id)
+        }
+        body = json.dumps(payload, sort_keys=True)
+        response = app.response_class(body, mimetype='application/json')
+        response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest())
+        response = response.make_conditional(request)
+    
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Stats-Version'] = str(version)
+    return response
 
 if __name__ == '__main__':
     init_database()
-    start_daily_scheduler()
+    
+    print(f"✍️ Javob variantlari indekslandi: {len(get_answer_matcher().variants)} ta variant")
     
     questions_data = load_questions_from_json()
     question_count = len(questions_data.get('eco_questions', []))
@@ -1663,7 +4014,7 @@ if __name__ == '__main__':
     print("🛍️ Do'kon boshqaruvi: http://localhost:5000/admin/shop")
     print("📅 Kunlik topshiriqlar: http://localhost:5000/admin/daily_tasks")
     print("\n🔄 Kunlik yangilanishlar soat 00:00 da avtomatik bajariladi")
-    print("\n📋 Demo loginlar:")
+    print("\n📋 Demo loginlar (flask seed-demo dan keyin):")
     print("   👨‍💼 Admin: admin / admin123")
     print("   👦 Bola: eco_bola / bola123") 
     print("   👨 Katta: eco_katta / katta123")
@@ -0,0 +1,148 @@
+"""Yuklama testlari uchun soxta Telegram Bot API va update generatori.
+
+Tarmoqsiz o'lchash:
+    1) python fake_telegram.py serve --port 8081
+    2) BOT_MODE=webhook TELEGRAM_API_URL=http://127.0.0.1:8081 WEBHOOK_SECRET=test python main.py
+    3) python fake_telegram.py load --api http://127.0.0.1:8081 --webhook http://127.0.0.1:8080/webhook \\
+           --secret test --updates 5000 --chats 200
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+import aiohttp
+from aiohttp import web
+
+class FakeTelegramAPI:
+    """/bot<token>/<method> so'rovlariga Telegram kabi javob beradi va chaqiruvlarni sanaydi"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.sent_by_chat = Counter()
+        self.first_sent_at = None
+        self.last_sent_at = None
+        self._message_ids = itertools.count(1)
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        self.calls[method] += 1
+        if request.content_type == 'application/json':
+            payload = await request.json()
+        else:
+            payload = dict(await request.post())
+        return web.json_response({'ok': True, 'result': self.result_for(method, payload)})
+
+    def result_for(self, method, payload):
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'EcoVerse', 'username': 'ecoverse_bot'}
+        if method in ('sendMessage', 'editMessageText'):
+            now = time.perf_counter()
+            self.first_sent_at = self.first_sent_at or now
+            self.last_sent_at = now
+            chat_id = int(payload.get('chat_id', 0))
+            self.sent_by_chat[chat_id] += 1
+            return {
+                'message_id': next(self._message_ids),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': payload.get('text', ''),
+            }
+        # setWebhook, deleteWebhook, answerCallbackQuery va boshqalar
+        return True
+
+    async def stats(self, request):
+        return web.json_response({
+            'calls': dict(self.calls),
+            'sent': sum(self.sent_by_chat.values()),
+            'chats': len(self.sent_by_chat),
+        })
+
+    async def reset(self, request):
+        self.__init__()
+        return web.json_response({'ok': True})
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        app.router.add_get('/stats', self.stats)
+        app.router.add_post('/reset', self.reset)
+        return app
+
+def build_update(update_id, chat_id, text):
+    command_length = len(text.split()[0]) if text.startswith('/') else 0
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': chat_id, 'type': 'private'},
+        'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Load', 'username': f'load_{chat_id}'},
+        'text': text,
+    }
+    if command_length:
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': command_length}]
+    return {'update_id': update_id, 'message': message}
+
+async def run_load(api, webhook, secret, updates, chats, text, concurrency):
+    """Update'larni webhook'ga yuborib, barcha javoblar soxta API'ga kelguncha kutish"""
+    headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession() as session:
+        await session.post(f'{api}/reset')
+
+        async def send(update_id):
+            payload = build_update(update_id, 100000 + update_id % chats, text)
+            async with semaphore:
+                # 503 - backpressure: Telegram kabi qisqa kutib qayta yuboriladi
+                while True:
+                    async with session.post(webhook, json=payload, headers=headers) as response:
+                        statuses[response.status] += 1
+                        if response.status != 503:
+                            return
+                    await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(update_id) for update_id in range(1, updates + 1)))
+        accepted_at = time.perf_counter()
+
+        sent = 0
+        while time.perf_counter() - accepted_at < 60:
+            async with session.get(f'{api}/stats') as response:
+                sent = (await response.json())['sent']
+            if sent >= updates:
+                break
+            await asyncio.sleep(0.1)
+        finished = time.perf_counter()
+
+    print(f"Yuborildi: {updates} update, {chats} chat, HTTP: {dict(statuses)}")
+    print(f"Qabul qilish: {updates / (accepted_at - started):.0f} update/s")
+    print(f"To'liq qayta ishlash: {sent} javob, {sent / (finished - started):.0f} update/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="Soxta Telegram API'ni ishga tushirish")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8081)
+
+    load = commands.add_parser('load', help="Webhook'ga update'lar oqimini yuborish")
+    load.add_argument('--api', default='http://127.0.0.1:8081')
+    load.add_argument('--webhook', default='http://127.0.0.1:8080/webhook')
+    load.add_argument('--secret')
+    load.add_argument('--updates', type=int, default=5000)
+    load.add_argument('--chats', type=int, default=200)
+    load.add_argument('--text', default='/energy')
+    load.add_argument('--concurrency', type=int, default=100)
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        web.run_app(FakeTelegramAPI().create_app(), host=args.host, port=args.port)
+    else:
+        asyncio.run(run_load(args.api, args.webhook, args.secret, args.updates, args.chats,
+                             args.text, args.concurrency))
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,27 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
+from datetime import datetime, timedelta
+from utils.database import db
 
 energy_router = Router()
 
 @energy_router.message(Command("energy"))
 async def energy_handler(message: Message):
-    energy_info = """
+    user_data = await db.get_user_by_telegram_id(message.from_user.id)
+    
+    if not user_data:
+        await message.answer("❌ Siz hali ro'yxatdan o'tmagansiz. /start ni bosing.")
+        return
+    
+    # Kunlik yangilanish UTC 00:00 da
+    now = datetime.utcnow()
+    hours_left = int((datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) - now).total_seconds() // 3600)
+    
+    energy_info = f"""
 ⚡ *Energiya Tizimi*
 
-Joriy energiya: *75/100*
+Joriy energiya: *{user_data.energy}/100*
 
 📊 *Energiya sarflash:*
 • Topshiriq bajarish - 10 energiya
@@ -21,7 +33,7 @@ Joriy energiya: *75/100*
 • Streak bonus - +5-20 energiya
 • Vazifa bonuslari - +5-15 energiya
 
-⏰ *Keyingi to'ldirish:* 8 soat
+⏰ *Keyingi to'ldirish:* {hours_left} soat
 
 Energiya har kun soat 00:00 da to'liq to'lanadi!
     """
@@ -1,28 +1,41 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
+from ecoverse import escape_markdown
+from ecoverse.readmodel import item_type_label
+from utils.database import db
 
 inventory_router = Router()
 
 @inventory_router.message(Command("inventory"))
 async def inventory_handler(message: Message):
-    inventory_text = """
-🎒 *Sizning Inventoryingiz*
-
-*Kiyimlar:*
-✅ Yashil Kepka (Faol)
-✅ Ekologik Futbolka
-
-*Aksessuarlar:*
-✅ Eco Sumka
-⛔ Daraxt Nishoni (Faol emas)
-
-*Fonlar:*
-⛔ O'simlik Fon (Faol emas)
-
-*Umumiy: 4 ta buyum*
-
-Buyumni faollashtirish uchun web ilovamizdan foydalaning!
-    """
+    snapshot = await db.get_snapshot(message.from_user.id)
+    
+    if not snapshot:
+        await message.answer("❌ Siz hali ro'yxatdan o'tmagansiz. /start ni bosing.")
+        return
+    
+    if not snapshot.inventory:
+        await message.answer(
+            "🎒 *Sizning Inventoryingiz*\n\nHozircha buyumlar yo'q. /shop orqali do'konni ko'ring!",
+            parse_mode="Markdown"
+        )
+        return
+    
+    groups = {}
+    for entry in snapshot.inventory:
+        groups.setdefault(entry.item_type, []).append(entry)
+    
+    lines = ["🎒 *Sizning Inventoryingiz*", ""]
+    for item_type, entries in groups.items():
+        lines.append(f"*{item_type_label(item_type)}:*")
+        lines.extend(
+            f"{'✅' if entry.equipped else '⛔'} {escape_markdown(entry.name)}{' (Faol)' if entry.equipped else ''}"
+            for entry in entries
+        )
+        lines.append("")
+    lines.append(f"*Umumiy: {len(snapshot.inventory)} ta buyum*")
+    lines.append("")
+    lines.append("Buyumni faollashtirish uchun web ilovamizdan foydalaning!")
     
-    await message.answer(inventory_text, parse_mode="Markdown")
\ No newline at end of file
+    await message.answer("\n".join(lines), parse_mode="Markdown")
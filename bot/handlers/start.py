@@ -1,21 +1,20 @@
 from aiogram import Router, F
 from aiogram.types import Message
 from aiogram.filters import Command
-from utils.database import Database
+from utils.database import db
 
 start_router = Router()
-db = Database()
 
 @start_router.message(Command("start"))
 async def start_handler(message: Message):
     user = message.from_user
     
     # Foydalanuvchini tekshirish va ro'yxatdan o'tkazish
-    existing_user = db.get_user_by_telegram_id(user.id)
+    existing_user = await db.get_user_by_telegram_id(user.id)
     
     if not existing_user:
         # Ro'yxatdan o'tkazish
-        success = db.create_telegram_user({
+        success = await db.create_telegram_user({
             'id': user.id,
             'username': user.username,
             'first_name': user.first_name,
@@ -47,16 +46,14 @@ Salom {user.first_name}! Siz muvaffaqiyatli ro'yxatdan o'tdingiz.
             welcome_text = "❌ Ro'yxatdan o'tishda xatolik yuz berdi. Iltimos, qayta urinib ko'ring."
     else:
         # Mavjud foydalanuvchi
-        user_id, username, email, password_hash, role, coins, energy, streak, last_login, created_at = existing_user
-        
         welcome_text = f"""
 🌍 *EcoVerse ga Xush Kelibsiz!*
 
 Salom {user.first_name}! Sizning profilingiz:
 
-💰 *Coins:* {coins}
-⚡ *Energiya:* {energy}
-🔥 *Streak:* {streak} kun
+💰 *Coins:* {existing_user.coins}
+⚡ *Energiya:* {existing_user.energy}
+🔥 *Streak:* {existing_user.streak} kun
 
 📊 *Mavjud komandalar:*
 /shop - Do'kon
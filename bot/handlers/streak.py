@@ -1,24 +1,23 @@
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
-from utils.database import Database
+from utils.database import db
 
 streak_router = Router()
-db = Database()
 
 @streak_router.message(Command("streak"))
 async def streak_handler(message: Message):
     user = message.from_user
     
     # Foydalanuvchi ma'lumotlarini olish
-    user_data = db.get_user_by_telegram_id(user.id)
+    user_data = await db.get_user_by_telegram_id(user.id)
     
     if not user_data:
         await message.answer("❌ Siz hali ro'yxatdan o'tmagansiz. /start ni bosing.")
         return
     
-    streak = user_data[7]  # streak indeksi
-    coins = user_data[5]   # coins indeksi
+    streak = user_data.streak
+    coins = user_data.coins
     
     # Level hisoblash
     level = (streak // 7) + 1
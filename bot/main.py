@@ -1,6 +1,14 @@
 import asyncio
 import logging
+import os
+import sys
+from aiohttp import web
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+# Web ilova bilan umumiy `ecoverse` paketi loyiha ildizida
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
 
 
 from handlers.start import start_router
@@ -11,14 +19,29 @@ from handlers.news import news_router
 from handlers.streak import streak_router
 from handlers.energy import energy_router
 from handlers.profile import profile_router
+from utils.database import db
+from webhook import create_webhook_app
 
 # Logging sozlash
 logging.basicConfig(level=logging.INFO)
 
 # Bot token
-BOT_TOKEN = ("8257163432:AAFmWvYNGMJhi3Ja7bpxKJvukOTkgPBj6oQ")
+BOT_TOKEN = os.environ.get("BOT_TOKEN", "8257163432:AAFmWvYNGMJhi3Ja7bpxKJvukOTkgPBj6oQ")
+
+# Ishga tushirish rejimi: polling (standart) yoki webhook
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.environ.get("WEBHOOK_BASE_URL")  # masalan https://eco.example.uz
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+WEBAPP_HOST = os.environ.get("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.environ.get("WEBAPP_PORT", "8080"))
+WEBHOOK_MAX_CONCURRENCY = int(os.environ.get("WEBHOOK_MAX_CONCURRENCY", "32"))
+WEBHOOK_MAX_PENDING = int(os.environ.get("WEBHOOK_MAX_PENDING", "1000"))
+# Yuklama testlari uchun soxta Telegram API (fake_telegram.py)
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL")
 
-bot = Bot(token=BOT_TOKEN)
+session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+bot = Bot(token=BOT_TOKEN, session=session)
 dp = Dispatcher()
 
 # Routerlarni qo'shish
@@ -33,7 +56,40 @@ dp.include_router(profile_router)
 
 async def main():
     logging.info("Bot ishga tushdi...")
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot)
+    finally:
+        db.close()
+
+async def on_webhook_startup(app):
+    if WEBHOOK_BASE_URL:
+        # Bir nechta instansiya bitta URL (load balancer) ortida ishlashi mumkin
+        await bot.set_webhook(
+            f"{WEBHOOK_BASE_URL}{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=WEBHOOK_MAX_CONCURRENCY
+        )
+    logging.info(f"Bot webhook rejimida ishga tushdi: {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+
+async def on_webhook_cleanup(app):
+    await bot.session.close()
+    db.close()
+
+def run_webhook():
+    app = create_webhook_app(
+        bot, dp, WEBHOOK_PATH,
+        secret=WEBHOOK_SECRET,
+        max_concurrency=WEBHOOK_MAX_CONCURRENCY,
+        max_pending=WEBHOOK_MAX_PENDING
+    )
+    app.on_startup.append(on_webhook_startup)
+    # on_shutdown (create_webhook_app) navbatni bo'shatadi, keyin resurslar yopiladi
+    app.on_cleanup.append(on_webhook_cleanup)
+    web.run_app(app, host=WEBAPP_HOST, port=WEBAPP_PORT)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(main())
\ No newline at end of file
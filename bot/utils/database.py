@@ -1,126 +1,91 @@
-import sqlite3
-import os
-from datetime import datetime
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ecoverse import DATABASE_PATH, connect, ensure_schema, ProfileService, SharedContent
+
+# Ulanishlar har bir worker oqimida bir marta ochiladi va qayta ishlatiladi;
+# sqlite3 har bir ulanishda tayyorlangan so'rovlarni keshlaydi.
+POOL_SIZE = 4
 
 class Database:
-    def __init__(self, db_path="../eco.db"):
+    """Bot uchun asinxron ma'lumotlar qatlami.
+
+    Schema va so'rovlar web ilova bilan umumiy `ecoverse` paketida. So'rovlar
+    event loop'ni to'xtatmaydi: ular doimiy ulanishli kichik oqimlar pulida
+    bajariladi, keshdagi profillar esa pulga umuman bormaydi.
+    """
+
+    def __init__(self, db_path=DATABASE_PATH, pool_size=POOL_SIZE):
         self.db_path = db_path
+        self.profiles = ProfileService()
+        self.shared = SharedContent()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='bot-db')
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self.init_database()
-    
+
+    def _connect(self):
+        """Joriy worker oqimining doimiy ulanishi"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(self._connect(), *args))
+
     def init_database(self):
-        """Initialize database tables - web bilan bir xil database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Web ilova bilan bir xil jadvallar
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                email TEXT,
-                password_hash TEXT,
-                role TEXT DEFAULT 'child',
-                coins INTEGER DEFAULT 0,
-                energy INTEGER DEFAULT 100,
-                streak INTEGER DEFAULT 0,
-                last_login TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS telegram_user (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER UNIQUE,
-                user_id INTEGER,
-                username TEXT,
-                first_name TEXT,
-                last_name TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES user (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
-    def get_user_by_telegram_id(self, telegram_id):
-        """Get user by telegram ID"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT u.* FROM user u 
-            JOIN telegram_user tu ON u.id = tu.user_id 
-            WHERE tu.telegram_id = ?
-        ''', (telegram_id,))
-        user = cursor.fetchone()
-        
-        conn.close()
-        return user
-    
-    def create_telegram_user(self, telegram_user_data, username=None):
-        """Create new telegram user with registration"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Avval telegram foydalanuvchi mavjudligini tekshirish
-        cursor.execute('SELECT * FROM telegram_user WHERE telegram_id = ?', (telegram_user_data['id'],))
-        existing_user = cursor.fetchone()
-        
-        if existing_user:
+        """Web ilova yaratgan schema mavjudligini tekshirish"""
+        conn = connect(self.db_path)
+        try:
+            ensure_schema(conn)
+        finally:
             conn.close()
-            return False  # Foydalanuvchi allaqachon mavjud
-        
-        # Yangi user yaratish (coins 0 bilan)
-        cursor.execute('''
-            INSERT INTO user (username, email, password_hash, role, coins, energy, streak)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            f"tg_{telegram_user_data['id']}",
-            f"tg_{telegram_user_data['id']}@ecoverse.com",
-            'telegram_user',  # Maxsus parol hash
-            'child',
-            0,  # Coins 0 dan boshlanadi
-            100,
-            0
-        ))
-        
-        user_id = cursor.lastrowid
-        
-        # Telegram user yaratish
-        cursor.execute('''
-            INSERT INTO telegram_user (telegram_id, user_id, username, first_name, last_name)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            telegram_user_data['id'],
-            user_id,
-            telegram_user_data.get('username'),
-            telegram_user_data.get('first_name'),
-            telegram_user_data.get('last_name')
-        ))
-        
-        conn.commit()
-        conn.close()
-        return True
-    
-    def update_user_coins(self, user_id, coins):
-        """Update user coins"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('UPDATE user SET coins = ? WHERE id = ?', (coins, user_id))
-        
-        conn.commit()
-        conn.close()
-    
-    def get_user_stats(self, user_id):
+
+    async def get_snapshot(self, telegram_id):
+        """Profil va inventar (UserSnapshot) yoki None; keshda bo'lsa pulga bormaydi"""
+        snapshot = self.profiles.cached(telegram_id)
+        if snapshot is not None:
+            return snapshot
+        return await self._run(self.profiles.get_snapshot, telegram_id)
+
+    async def get_user_by_telegram_id(self, telegram_id):
+        """Telegram ID bo'yicha profil (UserProfile) yoki None"""
+        snapshot = await self.get_snapshot(telegram_id)
+        return snapshot.profile if snapshot else None
+
+    async def shared_text(self, name):
+        """Umumiy tayyor Markdown matn ('shop', 'news', 'announcements')"""
+        text = self.shared.peek(name)
+        if text is not None:
+            return text
+        return await self._run(self.shared.get, name)
+
+    async def create_telegram_user(self, telegram_user_data, username=None):
+        """Create new telegram user with registration"""
+        return await self._run(self.profiles.register_telegram_user, telegram_user_data)
+
+    async def update_user_coins(self, user_id, amount, reason='telegram', reference=None):
+        """Coin'larni amount ga o'zgartirish (ledger orqali); yangi balans yoki yetmasa None"""
+        return await self._run(self.profiles.update_coins, user_id, amount, reason, reference)
+
+    async def get_user_stats(self, user_id):
         """Get user statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT coins, energy, streak FROM user WHERE id = ?', (user_id,))
-        stats = cursor.fetchone()
-        
-        conn.close()
-        return stats
\ No newline at end of file
+        return await self._run(self.profiles.get_stats, user_id)
+
+    def close(self):
+        """Pulni to'xtatish va barcha ulanishlarni yopish"""
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+# Barcha handler'lar uchun bitta pul
+db = Database()
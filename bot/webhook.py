@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from collections import deque
+
+from aiohttp import web
+from aiogram.types import Update
+
+MAX_CONCURRENCY = 32
+MAX_PENDING = 1000
+DRAIN_TIMEOUT_SECONDS = 30
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+def update_chat_id(update):
+    """Tartib kaliti: update qaysi chatga tegishli (aniqlanmasa None)"""
+    for field in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        message = getattr(update, field, None)
+        if message is not None:
+            return message.chat.id
+    callback_query = getattr(update, 'callback_query', None)
+    if callback_query is not None:
+        if callback_query.message is not None:
+            return callback_query.message.chat.id
+        return callback_query.from_user.id
+    for field in ('inline_query', 'chosen_inline_result', 'my_chat_member', 'chat_member'):
+        event = getattr(update, field, None)
+        if event is not None:
+            chat = getattr(event, 'chat', None)
+            return chat.id if chat is not None else event.from_user.id
+    return None
+
+class ChatOrderedPool:
+    """Cheklangan parallellikdagi update ishlovchisi.
+
+    Bir chat ichidagi update'lar kelish tartibida ketma-ket bajariladi, turli
+    chatlar esa parallel (ko'pi bilan max_concurrency ta). Navbatdagi update'lar
+    soni max_pending ga yetsa submit() False qaytaradi - webhook 503 beradi va
+    Telegram keyinroq qayta yuboradi.
+    """
+
+    def __init__(self, handler, max_concurrency=MAX_CONCURRENCY, max_pending=MAX_PENDING):
+        self._handler = handler
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_pending = max_pending
+        self._chains = {}
+        self._tasks = set()
+        self._pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.accepting = True
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def submit(self, key, update):
+        if not self.accepting or self._pending >= self.max_pending:
+            self.rejected += 1
+            return False
+        self._pending += 1
+        self._idle.clear()
+        if key is None:
+            self._spawn(self._process(update))
+        elif key in self._chains:
+            self._chains[key].append(update)
+        else:
+            self._chains[key] = deque([update])
+            self._spawn(self._run_chain(key))
+        return True
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_chain(self, key):
+        chain = self._chains[key]
+        try:
+            while chain:
+                await self._process(chain.popleft())
+        finally:
+            # Tekshiruv va o'chirish orasida await yo'q - yangi update yo'qolmaydi
+            del self._chains[key]
+
+    async def _process(self, update):
+        async with self._semaphore:
+            try:
+                await self._handler(update)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logging.exception("Update'ni qayta ishlashda xatolik")
+            finally:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.set()
+
+    async def drain(self, timeout=DRAIN_TIMEOUT_SECONDS):
+        """Yangi update qabul qilinmaydi, navbatdagilar tugashi kutiladi"""
+        self.accepting = False
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logging.warning(f"Drain vaqti tugadi: {self._pending} ta update bekor qilindi")
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            return False
+
+def create_webhook_app(bot, dp, path, secret=None, max_concurrency=MAX_CONCURRENCY,
+                       max_pending=MAX_PENDING, drain_timeout=DRAIN_TIMEOUT_SECONDS):
+    """aiohttp ilovasi: update darhol navbatga qo'yiladi va 200 qaytariladi"""
+
+    async def handle_update(update):
+        await dp.feed_update(bot, update)
+
+    pool = ChatOrderedPool(handle_update, max_concurrency, max_pending)
+
+    async def webhook_handler(request):
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={'bot': bot})
+        except Exception:
+            return web.Response(status=400)
+        if not pool.submit(update_chat_id(update), update):
+            # Backpressure: Telegram 2xx bo'lmagan javobdan keyin qayta yuboradi
+            return web.Response(status=503, headers={'Retry-After': '1'})
+        return web.Response()
+
+    async def stats_handler(request):
+        if request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+        return web.json_response({
+            'pending': pool.pending,
+            'processed': pool.processed,
+            'failed': pool.failed,
+            'rejected': pool.rejected,
+            'accepting': pool.accepting,
+        })
+
+    async def on_shutdown(app):
+        drained = await pool.drain(drain_timeout)
+        logging.info(f"Webhook to'xtatildi (drain {'tugadi' if drained else 'uzildi'}): {pool.processed} ta update")
+
+    app = web.Application()
+    app['pool'] = pool
+    app.router.add_post(path, webhook_handler)
+    # Navbat statistikasi faqat maxfiy token bilan (token sozlanmagan bo'lsa route yo'q)
+    if secret:
+        app.router.add_get(f'{path}/stats', stats_handler)
+    app.on_shutdown.append(on_shutdown)
+    return app
@@ -0,0 +1,10 @@
+# ecoverse - web ilova va Telegram bot uchun umumiy domen qatlami
+from .storage import DATABASE_PATH, CONTENT_TABLES, connect, ensure_schema, content_trigger_statements
+from .profiles import UserProfile, UserSnapshot, InventoryEntry, ProfileService
+from .readmodel import SharedContent, escape_markdown
+
+__all__ = [
+    'DATABASE_PATH', 'CONTENT_TABLES', 'connect', 'ensure_schema', 'content_trigger_statements',
+    'UserProfile', 'UserSnapshot', 'InventoryEntry', 'ProfileService',
+    'SharedContent', 'escape_markdown',
+]
@@ -0,0 +1,180 @@
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+PROFILE_CACHE_TTL_SECONDS = 10
+
+class UserProfile(NamedTuple):
+    id: int
+    username: str
+    role: str
+    coins: int
+    energy: int
+    streak: int
+    level: int
+    experience: int
+    created_at: Optional[str]
+
+class InventoryEntry(NamedTuple):
+    name: str
+    item_type: str
+    equipped: bool
+
+class UserSnapshot(NamedTuple):
+    profile: UserProfile
+    inventory: Tuple[InventoryEntry, ...]
+
+# Faqat profil uchun kerakli ustunlar - to'liq qator olinmaydi
+PROFILE_COLUMNS = ', '.join(f'u.{name}' for name in UserProfile._fields)
+
+# Profil va inventar bitta so'rovda (LEFT JOIN: inventari bo'sh foydalanuvchi ham qaytadi)
+SELECT_SNAPSHOT_BY_TELEGRAM_ID = f'''
+    SELECT {PROFILE_COLUMNS}, i.name AS item_name, i.item_type, inv.equipped
+    FROM telegram_user tu
+    JOIN user u ON u.id = tu.user_id
+    LEFT JOIN inventory inv ON inv.user_id = u.id
+    LEFT JOIN item i ON i.id = inv.item_id
+    WHERE tu.telegram_id = ?
+    ORDER BY inv.equipped DESC, i.item_type, i.name
+'''
+SELECT_TELEGRAM_USER = 'SELECT 1 FROM telegram_user WHERE telegram_id = ?'
+# SQLAlchemy default'lari bazada yo'q, shuning uchun barcha ustunlar aniq beriladi
+INSERT_USER = '''
+    INSERT INTO user (username, email, password_hash, role, coins, energy, streak, created_at,
+                      avatar, is_admin, last_daily_reset, level, experience, stats_version)
+    VALUES (?, ?, ?, 'child', 0, 100, 0, ?, 'default.png', 0, ?, 1, 0, 0)
+'''
+INSERT_TELEGRAM_USER = '''
+    INSERT INTO telegram_user (telegram_id, user_id, username, first_name, last_name, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+# Web ilovadagi ledger bilan bir xil: nisbiy, shartli o'zgarish + coin_transaction yozuvi.
+# stats_version oshadi - SSE, reyting va ETag keshlari bot o'zgarishini ko'radi.
+UPDATE_USER_COINS = '''
+    UPDATE user SET coins = coins + ?, stats_version = COALESCE(stats_version, 0) + 1
+    WHERE id = ? AND coins + ? >= 0
+'''
+SELECT_USER_COINS = 'SELECT coins FROM user WHERE id = ?'
+INSERT_COIN_TRANSACTION = '''
+    INSERT INTO coin_transaction (user_id, amount, balance_after, reason, reference, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+SELECT_USER_STATS = 'SELECT coins, energy, streak FROM user WHERE id = ?'
+
+def profile_from_row(row):
+    return UserProfile(**{name: row[name] for name in UserProfile._fields})
+
+def snapshot_from_rows(rows):
+    inventory = tuple(
+        InventoryEntry(row['item_name'], row['item_type'], bool(row['equipped']))
+        for row in rows if row['item_name'] is not None
+    )
+    return UserSnapshot(profile_from_row(rows[0]), inventory)
+
+class ProfileService:
+    """Telegram foydalanuvchi snapshot'lari (profil + inventar): read-through kesh bilan.
+
+    Bot har bir komandada snapshot'ni o'qiydi; kesh TTL ichida bazaga bormaydi.
+    Botning o'z yozuvlari keshni darhol tozalaydi, web ilovadagi o'zgarishlar
+    ko'pi bilan TTL kechikish bilan ko'rinadi.
+    """
+    
+    def __init__(self, ttl=PROFILE_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._telegram_ids = {}
+    
+    def cached(self, telegram_id):
+        """Keshdagi UserSnapshot yoki None"""
+        with self._lock:
+            entry = self._profiles.get(telegram_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+    
+    def get_snapshot(self, conn, telegram_id):
+        snapshot = self.cached(telegram_id)
+        if snapshot is not None:
+            return snapshot
+        rows = conn.execute(SELECT_SNAPSHOT_BY_TELEGRAM_ID, (telegram_id,)).fetchall()
+        if not rows:
+            # Ro'yxatdan o'tmaganlar keshlanmaydi: /start dan keyin darhol ko'rinadi
+            return None
+        snapshot = snapshot_from_rows(rows)
+        with self._lock:
+            self._profiles[telegram_id] = (time.monotonic() + self.ttl, snapshot)
+            self._telegram_ids[snapshot.profile.id] = telegram_id
+        return snapshot
+    
+    def get_by_telegram_id(self, conn, telegram_id):
+        snapshot = self.get_snapshot(conn, telegram_id)
+        return snapshot.profile if snapshot else None
+    
+    def register_telegram_user(self, conn, telegram_user_data):
+        """Web ilovaning user jadvalida hisob va unga bog'langan telegram_user yaratish"""
+        telegram_id = telegram_user_data['id']
+        now = datetime.utcnow().isoformat(sep=' ')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute(SELECT_TELEGRAM_USER, (telegram_id,)).fetchone():
+                conn.rollback()
+                return False
+            cursor = conn.execute(INSERT_USER, (
+                f"tg_{telegram_id}",
+                f"tg_{telegram_id}@ecoverse.com",
+                'telegram_user',  # Maxsus parol hash: web orqali login qilib bo'lmaydi
+                now,
+                now
+            ))
+            conn.execute(INSERT_TELEGRAM_USER, (
+                telegram_id,
+                cursor.lastrowid,
+                telegram_user_data.get('username'),
+                telegram_user_data.get('first_name'),
+                telegram_user_data.get('last_name'),
+                now
+            ))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.invalidate(telegram_id)
+        return True
+    
+    def update_coins(self, conn, user_id, amount, reason='telegram', reference=None):
+        """Coin'larni amount ga o'zgartirish; yangi balans yoki yetmasa None"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(UPDATE_USER_COINS, (amount, user_id, amount))
+            if cursor.rowcount != 1:
+                conn.rollback()
+                return None
+            balance = conn.execute(SELECT_USER_COINS, (user_id,)).fetchone()[0]
+            conn.execute(INSERT_COIN_TRANSACTION, (
+                user_id, amount, balance, reason,
+                str(reference) if reference is not None else None,
+                datetime.utcnow().isoformat(sep=' ')
+            ))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.invalidate_user(user_id)
+        return balance
+    
+    def get_stats(self, conn, user_id):
+        return conn.execute(SELECT_USER_STATS, (user_id,)).fetchone()
+    
+    def invalidate(self, telegram_id):
+        with self._lock:
+            entry = self._profiles.pop(telegram_id, None)
+            if entry:
+                self._telegram_ids.pop(entry[1].profile.id, None)
+    
+    def invalidate_user(self, user_id):
+        with self._lock:
+            telegram_id = self._telegram_ids.pop(user_id, None)
+            if telegram_id is not None:
+                self._profiles.pop(telegram_id, None)
@@ -0,0 +1,159 @@
+import threading
+import time
+from datetime import datetime
+
+from .storage import CONTENT_TABLES
+
+# content_version har so'rovda emas, ko'pi bilan shu oraliqda tekshiriladi
+CONTENT_CHECK_INTERVAL_SECONDS = 2
+# E'lonlar vaqtga bog'liq (start_date/end_date): matnlar shundan eski bo'lmaydi
+CONTENT_MAX_AGE_SECONDS = 300
+SHOP_PREVIEW_LIMIT = 15
+NEWS_PREVIEW_LIMIT = 5
+ANNOUNCEMENT_PREVIEW_LIMIT = 5
+
+ITEM_TYPE_LABELS = {
+    'hat': '🧢 Bosh kiyimlar',
+    'clothes': '👕 Kiyimlar',
+    'shoes': '👟 Oyoq kiyimlar',
+    'accessory': '👜 Aksessuarlar',
+    'background': '🖼️ Fonlar',
+}
+
+SELECT_CONTENT_VERSIONS = 'SELECT name, version FROM content_version'
+SELECT_SHOP_ITEMS = '''
+    SELECT name, price, item_type FROM item
+    WHERE is_active = 1
+    ORDER BY price, id
+    LIMIT ?
+'''
+COUNT_SHOP_ITEMS = 'SELECT COUNT(*) FROM item WHERE is_active = 1'
+SELECT_LATEST_NEWS = '''
+    SELECT title, content, created_at FROM news
+    WHERE status = 'active'
+    ORDER BY created_at DESC
+    LIMIT ?
+'''
+SELECT_ACTIVE_ANNOUNCEMENTS = '''
+    SELECT title, content, announcement_type FROM announcement
+    WHERE is_active = 1 AND start_date <= ? AND end_date >= ?
+    ORDER BY created_at DESC
+    LIMIT ?
+'''
+
+def escape_markdown(text):
+    """Telegram Markdown (legacy) uchun maxsus belgilarni ekranlash"""
+    for char in ('\\', '_', '*', '`', '['):
+        text = text.replace(char, '\\' + char)
+    return text
+
+def item_type_label(item_type):
+    return ITEM_TYPE_LABELS.get(item_type, f"📦 {escape_markdown((item_type or 'boshqa').capitalize())}")
+
+def render_shop(conn):
+    """Do'kon katalogi: eng arzon faol mahsulotlar turi bo'yicha guruhlangan"""
+    rows = conn.execute(SELECT_SHOP_ITEMS, (SHOP_PREVIEW_LIMIT,)).fetchall()
+    if not rows:
+        return "Hozircha do'konda mahsulotlar yo'q."
+    total = conn.execute(COUNT_SHOP_ITEMS).fetchone()[0]
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(row['item_type'], []).append(row)
+    lines = []
+    for item_type, items in groups.items():
+        lines.append(f"*{item_type_label(item_type)}*")
+        lines.extend(f"• {escape_markdown(row['name'])} - {row['price']} coin" for row in items)
+        lines.append('')
+    if total > len(rows):
+        lines.append(f"_...va yana {total - len(rows)} ta mahsulot web ilovada_")
+    return '\n'.join(lines).strip()
+
+def render_news(conn):
+    rows = conn.execute(SELECT_LATEST_NEWS, (NEWS_PREVIEW_LIMIT,)).fetchall()
+    if not rows:
+        return "Hozircha yangiliklar yo'q."
+    blocks = []
+    for row in rows:
+        content = row['content'] if len(row['content']) <= 150 else row['content'][:150] + '...'
+        blocks.append(
+            f"*{escape_markdown(row['title'])}*\n"
+            f"{escape_markdown(content)}\n"
+            f"📅 {(row['created_at'] or '')[:10]}"
+        )
+    return '\n\n'.join(blocks)
+
+def render_announcements(conn):
+    now = datetime.utcnow().isoformat(sep=' ')
+    rows = conn.execute(SELECT_ACTIVE_ANNOUNCEMENTS, (now, now, ANNOUNCEMENT_PREVIEW_LIMIT)).fetchall()
+    if not rows:
+        return "Hozircha e'lonlar yo'q."
+    icons = {'warning': '⚠️', 'success': '✅'}
+    return '\n\n'.join(
+        f"{icons.get(row['announcement_type'], '📢')} *{escape_markdown(row['title'])}*\n{escape_markdown(row['content'])}"
+        for row in rows
+    )
+
+# tayyor matn nomi -> (manba jadval, renderer)
+SHARED_TEMPLATES = {
+    'shop': ('item', render_shop),
+    'news': ('news', render_news),
+    'announcements': ('announcement', render_announcements),
+}
+
+class SharedContent:
+    """Barcha foydalanuvchilar uchun bir xil Markdown matnlar (katalog, yangiliklar).
+
+    Matn bir marta yaratiladi va manba jadvaldagi ko'rinadigan ustunlar
+    o'zgarmaguncha (content_version triggerlari) qayta ishlatiladi. Komanda
+    narxi katalog hajmiga bog'liq emas.
+    """
+
+    def __init__(self, templates=SHARED_TEMPLATES, check_interval=CONTENT_CHECK_INTERVAL_SECONDS,
+                 max_age=CONTENT_MAX_AGE_SECONDS):
+        unknown = {table for table, _ in templates.values()} - set(CONTENT_TABLES)
+        if unknown:
+            raise ValueError(f"content_version kuzatmaydigan jadvallar: {', '.join(sorted(unknown))}")
+        self.templates = templates
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._rendered = {}
+        self._versions = {}
+        self._checked_at = 0.0
+
+    def peek(self, name):
+        """Versiya tekshiruvi kerak bo'lmasa tayyor matn, aks holda None"""
+        now = time.monotonic()
+        table = self.templates[name][0]
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                return None
+            entry = self._rendered.get(name)
+            version = self._versions.get(table, 0)
+        if entry and entry[0] == version and now - entry[1] < self.max_age:
+            return entry[2]
+        return None
+
+    def get(self, conn, name):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._refresh_versions(conn, now)
+
+        table, render = self.templates[name]
+        with self._lock:
+            version = self._versions.get(table, 0)
+            entry = self._rendered.get(name)
+        if entry and entry[0] == version and now - entry[1] < self.max_age:
+            return entry[2]
+
+        text = render(conn)
+        with self._lock:
+            self._rendered[name] = (version, now, text)
+        return text
+
+    def _refresh_versions(self, conn, now):
+        versions = dict(conn.execute(SELECT_CONTENT_VERSIONS).fetchall())
+        with self._lock:
+            self._versions = versions
+            self._checked_at = now
@@ -0,0 +1,64 @@
+import os
+import sqlite3
+
+# Web ilova (SQLAlchemy) va bot bitta bazadan foydalanadi
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DATABASE_PATH = os.environ.get('ECOVERSE_DATABASE', os.path.join(BASE_DIR, 'ecoverse.db'))
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 64
+
+# Bot o'qiydigan/yozadigan jadvallar; schema web modellari tomonidan yaratiladi
+REQUIRED_TABLES = ('user', 'telegram_user', 'item', 'inventory', 'news', 'announcement', 'content_version')
+
+# Umumiy kontent jadvallari: ko'rinadigan ustunlar o'zgarsa content_version oshadi.
+# Bot tayyor matnlarni faqat versiya o'zgarganda qayta yaratadi (views_count kabi
+# hisoblagichlar versiyani o'zgartirmaydi).
+CONTENT_TABLES = {
+    'item': ('name', 'price', 'item_type', 'is_active'),
+    'news': ('title', 'content', 'category', 'status'),
+    'announcement': ('title', 'content', 'announcement_type', 'start_date', 'end_date', 'is_active'),
+}
+
+def content_trigger_statements():
+    """content_version'ni yangilaydigan triggerlar (idempotent DDL)"""
+    bump = (
+        "INSERT INTO content_version (name, version) VALUES ('{table}', 1) "
+        "ON CONFLICT(name) DO UPDATE SET version = version + 1;"
+    )
+    statements = []
+    for table, columns in CONTENT_TABLES.items():
+        events = {
+            'insert': 'INSERT',
+            'delete': 'DELETE',
+            'update': f"UPDATE OF {', '.join(columns)}",
+        }
+        for suffix, event in events.items():
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{suffix}_version AFTER {event} ON {table} "
+                f"BEGIN {bump.format(table=table)} END"
+            )
+    return statements
+
+def connect(path=None):
+    """Nomli qatorli (sqlite3.Row) va WAL rejimidagi ulanish"""
+    conn = sqlite3.connect(
+        path or DATABASE_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    return conn
+
+def ensure_schema(conn):
+    """Schema'ni yaratmaydi: faqat web migratsiyasi bajarilganini tekshiradi"""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    missing = [table for table in REQUIRED_TABLES if table not in existing]
+    if missing:
+        raise RuntimeError(
+            f"Bazada jadvallar yo'q: {', '.join(missing)}. Avval web ilovada `flask init-db` ni bajaring."
+        )
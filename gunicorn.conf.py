@@ -0,0 +1,15 @@
+# gunicorn app:app (shu fayl avtomatik o'qiladi)
+#
+# /events (SSE) oqimi so'rov davomida bitta thread'ni band qiladi. Standart sync
+# worker'da u butun worker'ni egallaydi, shuning uchun gthread ishlatiladi.
+# Har bir worker'da ECOVERSE_SSE_MAX_STREAMS (standart 16) tadan ko'p oqim ochilmaydi,
+# qolgan thread'lar oddiy so'rovlar uchun bo'sh qoladi. Sync worker bilan ishga
+# tushirilsa, /events 204 qaytaradi va sahifalar /get_stats so'roviga o'tadi.
+import os
+
+bind = os.environ.get('ECOVERSE_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('ECOVERSE_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('ECOVERSE_THREADS', 32))
+# SSE heartbeat (15 s) bundan qisqa bo'lishi kerak
+timeout = 60
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Testlar repo'dagi ecoverse.db ga tegmaydi va fon oqimlarini ishga tushirmaydi
+os.environ.setdefault('ECOVERSE_DATABASE', os.path.join(tempfile.mkdtemp(prefix='ecoverse-tests-'), 'ecoverse.db'))
+os.environ.setdefault('ECOVERSE_BACKGROUND', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def database():
+    """Har bir test uchun bo'sh, migratsiya qilingan vaqtinchalik baza (app context ichida)"""
+    import app as ecoverse_app
+
+    with ecoverse_app.app.app_context():
+        ecoverse_app.db.drop_all()
+        ecoverse_app.migrate_schema()
+        yield ecoverse_app
+        ecoverse_app.db.session.remove()
@@ -0,0 +1,68 @@
+import numpy as np
+
+from ML.adaptive import REPEAT_WINDOW, AdaptiveSelector
+from ML.analytics import pack_answers
+
+def question_bank(count=30):
+    categories = ('suv', 'energiya', 'chiqindi')
+    difficulties = ('easy', 'medium', 'hard')
+    return [{'id': 100 + index, 'category': categories[index % 3], 'difficulty': difficulties[index // 3 % 3]}
+            for index in range(count)]
+
+def observe(selector, user_id, result_id, question_ids, correct):
+    questions, _, flags = pack_answers(question_ids, np.zeros(len(question_ids)), correct)
+    selector.observe(user_id, result_id, questions, flags)
+
+def test_selects_distinct_known_questions():
+    selector = AdaptiveSelector()
+    selector.set_questions(question_bank())
+
+    chosen = selector.select(1, 5)
+
+    assert len(chosen) == len(set(chosen)) == 5
+    assert set(chosen) <= {question['id'] for question in question_bank()}
+
+def test_recent_questions_are_skipped():
+    selector = AdaptiveSelector()
+    selector.set_questions(question_bank())
+    seen = set()
+    for result_id in range(1, REPEAT_WINDOW + 1):
+        chosen = selector.select(1, 5)
+        assert not seen & set(chosen)
+        seen |= set(chosen)
+        observe(selector, 1, result_id, chosen, [1, 0, 1, 0, 1])
+
+def test_recent_questions_return_when_bank_is_small():
+    selector = AdaptiveSelector()
+    selector.set_questions(question_bank(6))
+    observe(selector, 1, 1, [100, 101, 102, 103, 104], [1] * 5)
+
+    assert len(set(selector.select(1, 5))) == 5
+
+def test_candidates_limit_selection():
+    selector = AdaptiveSelector()
+    selector.set_questions(question_bank())
+
+    assert sorted(selector.select(1, 5, candidate_ids=[100, 103, 999])) == [100, 103]
+
+def test_mastered_questions_lose_priority():
+    selector = AdaptiveSelector()
+    selector.set_questions(question_bank())
+    easy = [question['id'] for question in question_bank() if question['difficulty'] == 'easy']
+    for result_id in range(1, 30):
+        observe(selector, 1, result_id, easy, [1] * len(easy))
+
+    # Har doim to'g'ri yechilgan savollarda axborot kam - ular tanlovning oxiriga tushadi
+    chosen = selector.select(1, 5)
+    assert not set(chosen) & set(easy)
+
+def test_observed_result_is_counted_once():
+    selector = AdaptiveSelector()
+    selector.set_questions(question_bank())
+    observe(selector, 1, 5, [100, 101], [1, 1])
+    overall = selector.state(1).overall
+
+    observe(selector, 1, 5, [100, 101], [1, 1])
+    observe(selector, 1, 4, [100, 101], [0, 0])
+
+    assert selector.state(1).overall == overall
@@ -0,0 +1,49 @@
+from werkzeug.datastructures import MultiDict
+
+def add_users(database, users):
+    database.db.session.add_all([
+        database.User(username=username, email=f'{username.lower()}@example.com', password_hash='-', coins=coins)
+        for username, coins in users
+    ])
+    database.db.session.commit()
+    database.aggregate_cache.clear()
+
+def page(database, **args):
+    return database.ADMIN_LISTS['users'].page(MultiDict(args))
+
+def test_cursors_walk_ties_in_both_directions(database):
+    add_users(database, [(f'bola{index}', coins) for index, coins in enumerate([30, 20, 20, 20, 20, 10, 10])])
+    users = database.User.query.all()
+    expected = [user.id for user in sorted(users, key=lambda user: (-user.coins, -user.id))]
+
+    pages = [page(database, sort='coins', limit=2)]
+    while pages[-1].next_cursor:
+        pages.append(page(database, sort='coins', limit=2, after=pages[-1].next_cursor))
+
+    assert [user.id for result in pages for user in result.items] == expected
+    assert pages[0].prev_cursor is None
+    assert pages[0].total == len(users)
+
+    # Oxirgi sahifadan orqaga: har bir sahifa oldinga yurishdagisi bilan bir xil
+    backwards = [pages[-1]]
+    while backwards[-1].prev_cursor:
+        backwards.append(page(database, sort='coins', limit=2, before=backwards[-1].prev_cursor))
+
+    assert [[user.id for user in result.items] for result in reversed(backwards)] == \
+           [[user.id for user in result.items] for result in pages]
+
+def test_ascending_order(database):
+    add_users(database, [('a', 5), ('b', 5), ('c', 1)])
+
+    result = page(database, sort='coins', order='asc', limit=10)
+
+    assert [(user.coins, user.username) for user in result.items] == [(1, 'c'), (5, 'a'), (5, 'b')]
+    assert result.next_cursor is None
+
+def test_prefix_search_is_case_insensitive(database):
+    add_users(database, [('eco_ali', 1), ('Eco_Vali', 2), ('ecology', 3), ('bola', 4), ('neco', 5)])
+
+    result = page(database, q='ECO_', sort='username', order='asc')
+
+    assert [user.username for user in result.items] == ['eco_ali', 'Eco_Vali']
+    assert result.total == 2
@@ -0,0 +1,43 @@
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from ML.ml import AnswerMatcher, linear_check_answer, load_variants, normalize, with_typo
+
+@pytest.fixture(scope='module')
+def variants():
+    return load_variants()
+
+@pytest.fixture(scope='module')
+def matcher(variants):
+    return AnswerMatcher(variants)
+
+def fixture_answers(variants):
+    rng = random.Random(3)
+    answers = [with_typo(variant, rng) for variant in variants]
+    answers += [variant.upper().replace("'", "‘") for variant in variants[:20]]
+    # SequenceMatcher(a, b) != SequenceMatcher(b, a): bu javobda tartib natijani o'zgartiradi
+    answers.append("ko'rinardi bitta kesilgan")
+    return answers
+
+def test_scores_match_linear_scan(variants, matcher):
+    for answer in fixture_answers(variants):
+        _, score = matcher.best_match(normalize(answer))
+        _, linear_score = linear_check_answer(variants, answer)
+        assert score == linear_score, answer
+
+def test_score_uses_answer_as_first_sequence(matcher):
+    text = normalize("ko'rinardi bitta kesilgan")
+    expected = max(SequenceMatcher(None, text, matcher.normalized[variant_id]).ratio()
+                   for variant_id in matcher.shortlist(text))
+
+    assert matcher.best_match(text)[1] == expected
+
+def test_exact_and_unrelated_answers(variants, matcher):
+    assert matcher.check_answer(variants[0].upper())['match_percent'] == 100.0
+    assert matcher.best_match(normalize('xyz')) == (None, 0.0)
+
+def test_batch_matches_single_checks(variants, matcher):
+    answers = fixture_answers(variants)[:30] * 2
+    assert matcher.check_answers(answers) == [matcher.check_answer(answer) for answer in answers]
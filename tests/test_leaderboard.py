@@ -0,0 +1,65 @@
+import threading
+
+def add_children(database, coins):
+    users = [database.User(username=f'bola{index}', email=f'bola{index}@example.com', password_hash='-',
+                           role='child', coins=amount) for index, amount in enumerate(coins)]
+    database.db.session.add_all(users)
+    database.db.session.commit()
+    return [user.id for user in users]
+
+def ranking(board):
+    return [(entry['user_id'], entry['coins']) for entry in board.top(100)]
+
+def test_rank_and_neighbours_follow_updates(database):
+    ids = add_children(database, [50, 40, 30, 20, 10])
+    board = database.Leaderboard()
+
+    assert board.rank(ids[2]) == 3
+    assert [entry['user_id'] for entry in board.around(ids[2], radius=1)] == ids[1:4]
+
+    board.update(ids[4], 'bola4', 45)
+    assert ranking(board) == [(ids[0], 50), (ids[4], 45), (ids[1], 40), (ids[2], 30), (ids[3], 20)]
+    assert board.rank(ids[1]) == 3
+
+    board.remove(ids[0])
+    assert board.rank(ids[0]) is None
+    assert board.rank(ids[4]) == 1
+    assert [entry['rank'] for entry in board.around(ids[3], radius=2)] == [2, 3, 4]
+
+def test_equal_coins_ranked_by_id(database):
+    ids = add_children(database, [20, 20, 20])
+    board = database.Leaderboard()
+
+    assert [board.rank(user_id) for user_id in ids] == [1, 2, 3]
+
+def test_updates_during_rebuild_are_replayed(database, monkeypatch):
+    ids = add_children(database, [30, 20, 10])
+    board = database.Leaderboard()
+    board.top()
+    board.invalidate()
+
+    rebuilds = []
+
+    class DeferredThread:
+        def __init__(self, target, daemon=None):
+            rebuilds.append(target)
+
+        def start(self):
+            pass
+
+    monkeypatch.setattr(threading, 'Thread', DeferredThread)
+    database.db.session.get(database.User, ids[1]).coins = 5
+    database.db.session.commit()
+
+    # Eskirgan indeks darhol beriladi, qayta qurish fonda
+    assert ranking(board) == [(ids[0], 30), (ids[1], 20), (ids[2], 10)]
+    assert len(rebuilds) == 1
+    monkeypatch.undo()
+
+    # Qayta qurish paytidagi o'zgarishlar bazadagi eski qiymatdan ustun
+    board.update(ids[2], 'bola2', 100)
+    board.remove(ids[0])
+    rebuilds[0]()
+
+    assert ranking(board) == [(ids[2], 100), (ids[1], 5)]
+    assert board._rebuilding is None
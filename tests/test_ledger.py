@@ -0,0 +1,46 @@
+import threading
+
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+
+THREADS = 20
+BALANCE = 100
+PRICE = 15
+
+def test_concurrent_purchases_never_overspend(database):
+    db = database.db
+    # Kam iteratsiyali hash: 20 ta login testni sekinlashtirmasin
+    password_hash = generate_password_hash('parol123', method='pbkdf2:sha256:1000')
+    user = database.User(username='xaridor', email='xaridor@example.com', password_hash=password_hash,
+                         role='child', coins=BALANCE, energy=100)
+    item = database.Item(name='Shapka', price=PRICE, item_type='hat', energy_boost=0)
+    db.session.add_all([user, item])
+    db.session.commit()
+    user_id, item_id = user.id, item.id
+
+    barrier = threading.Barrier(THREADS)
+    results = []
+
+    def buy():
+        # Har bir oqim o'z sessiyasi bilan (fixture'ning app context'i bu oqimlarda yo'q)
+        client = database.app.test_client()
+        assert client.post('/login', data={'username': 'xaridor', 'password': 'parol123'}).status_code == 302
+        barrier.wait()
+        results.append(client.post(f'/buy_item/{item_id}').get_json()['success'])
+
+    threads = [threading.Thread(target=buy) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.expire_all()
+    coins = db.session.get(database.User, user_id).coins
+    purchases = db.session.scalar(select(func.count(database.Inventory.id)).where(database.Inventory.user_id == user_id))
+    ledger_total = db.session.scalar(
+        select(func.sum(database.CoinTransaction.amount)).where(database.CoinTransaction.user_id == user_id))
+
+    assert len(results) == THREADS
+    assert coins >= 0
+    assert results.count(True) == purchases == BALANCE // PRICE
+    assert ledger_total == coins - BALANCE
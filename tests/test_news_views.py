@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+def add_news(database, count):
+    author = database.User(username='admin', email='admin@example.com', password_hash='-', role='adult')
+    database.db.session.add(author)
+    database.db.session.flush()
+    news = [database.News(title=f'Yangilik {index}', content='...', category='yangilik', author_id=author.id,
+                          status='active') for index in range(count)]
+    database.db.session.add_all(news)
+    database.db.session.commit()
+    database.aggregate_cache.clear()
+    return [item.id for item in news]
+
+def views(database, news_id):
+    database.db.session.expire_all()
+    return database.db.session.get(database.News, news_id).views_count or 0
+
+def test_flush_writes_all_pending_views_in_one_update(database):
+    first, second, third = add_news(database, 3)
+    counter = database.ViewCounter()
+    for news_id in [first, first, second, first, third, second]:
+        counter.record(news_id)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(database.db.engine, 'before_cursor_execute', listener)
+    try:
+        assert counter.flush() == 6
+    finally:
+        event.remove(database.db.engine, 'before_cursor_execute', listener)
+
+    assert [statement.split()[0] for statement in statements] == ['UPDATE']
+    assert [views(database, news_id) for news_id in (first, second, third)] == [3, 2, 1]
+    assert counter.pending() == {}
+    assert counter.flush() == 0
+
+def test_failed_flush_requeues_views(database, monkeypatch):
+    news_id, = add_news(database, 1)
+    counter = database.ViewCounter()
+    counter.record(news_id)
+    counter.record(news_id)
+
+    class BrokenEngine:
+        def begin(self):
+            raise OperationalError('UPDATE', {}, Exception('database is locked'))
+
+    monkeypatch.setattr(type(database.db), 'engine', property(lambda self: BrokenEngine()))
+    with pytest.raises(OperationalError):
+        counter.flush()
+    counter.record(news_id)
+    monkeypatch.undo()
+
+    assert counter.pending(news_id) == 3
+    assert counter.flush() == 3
+    assert views(database, news_id) == 3
+
+def test_max_pending_flushes_without_background_thread(database):
+    news_id, = add_news(database, 1)
+    counter = database.ViewCounter(max_pending=3)
+    for _ in range(3):
+        counter.record(news_id)
+
+    assert counter.pending() == {}
+    assert views(database, news_id) == 3
+
+def test_sketches_are_bounded_and_dropped_with_news(database, monkeypatch):
+    monkeypatch.setattr(database, 'VIEW_SKETCH_MAX_NEWS', 2)
+    counter = database.ViewCounter()
+    for news_id in (1, 2, 1, 3):
+        counter.record(news_id, viewer_id=7)
+
+    # 2 eng uzoq ko'rilmagan - chiqarildi; 1 qayta ko'rilgani uchun qoldi
+    assert [counter.unique_viewers(news_id) for news_id in (1, 2, 3)] == [1, 0, 1]
+
+    counter.forget(3)
+    assert counter.unique_viewers(3) == 0
+    assert counter.pending(3) == 0
+
+def test_top_is_cached_until_news_is_deleted(database):
+    first, second = add_news(database, 2)
+    counter = database.ViewCounter()
+    counter.record(second)
+
+    assert [entry['id'] for entry in counter.top(2)] == [second, first]
+    counter.record(first)
+    counter.record(first)
+    assert [entry['id'] for entry in counter.top(2)] == [second, first]
+
+    counter.forget(second)
+    assert [entry['id'] for entry in counter.top(2)] == [first, second]
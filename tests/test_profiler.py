@@ -0,0 +1,12 @@
+def test_slow_query_log_hides_parameter_values(caplog):
+    import app as ecoverse_app
+
+    profiler = ecoverse_app.RequestProfiler()
+    with ecoverse_app.app.app_context():
+        profiler.log_slow_query('login', 'SELECT * FROM user WHERE email = ?', ('bola@example.com', 7), 150.0)
+        profiler.log_slow_query('register', 'INSERT INTO user ...', {'password_hash': 'pbkdf2:sha256$maxfiy'}, 120.0)
+        profiler.log_slow_query('seed', 'INSERT INTO task ...', [('a', 1), ('b', 2)], 110.0)
+
+    logged = ' '.join(entry['parameters'] for entry in profiler.slow_queries) + caplog.text
+    assert 'bola@example.com' not in logged and 'maxfiy' not in logged
+    assert [entry['parameters'] for entry in profiler.slow_queries] == ['2 qator', 'password_hash: str', 'str, int']
@@ -0,0 +1,15 @@
+from sqlalchemy import text
+
+def schema_snapshot(db):
+    return sorted(db.session.execute(text('SELECT type, name, sql FROM sqlite_master')).all())
+
+def test_hot_queries_use_indexes(database):
+    assert database.check_query_plans() == {}
+
+def test_second_migration_is_noop(database):
+    before = schema_snapshot(database.db)
+
+    report = database.migrate_schema()
+
+    assert report == {'columns': [], 'indexes': [], 'deduplicated': {}}
+    assert schema_snapshot(database.db) == before
@@ -0,0 +1,64 @@
+import numpy as np
+
+from ML.analytics import QuizStats, pack_answers
+
+def random_results(count, seed=11):
+    rng = np.random.default_rng(seed)
+    results = []
+    for result_id in range(1, count + 1):
+        length = int(rng.integers(1, 8))
+        question_ids = rng.choice(40, size=length, replace=False) + 1
+        correct = rng.integers(0, 2, size=length)
+        questions, _, flags = pack_answers(question_ids, np.zeros(length), correct)
+        results.append((result_id, float(correct.mean() * 100), int(rng.integers(0, 5)), questions, flags))
+    return results
+
+def build(results, chunk_size):
+    stats = QuizStats()
+    for start in range(0, len(results), chunk_size):
+        stats.update(*zip(*results[start:start + chunk_size]))
+    return stats
+
+def assert_same(left, right):
+    assert (left.last_result_id, left.result_count, left.answer_count) == \
+           (right.last_result_id, right.result_count, right.answer_count)
+    np.testing.assert_allclose(left.stats, right.stats)
+    np.testing.assert_array_equal(left.level_hist, right.level_hist)
+    np.testing.assert_allclose(left.level_score_sum, right.level_score_sum)
+
+def test_incremental_updates_equal_full_rebuild():
+    results = random_results(300)
+    full = build(results, len(results))
+
+    for chunk_size in (1, 7, 64):
+        assert_same(build(results, chunk_size), full)
+
+def test_report_matches_direct_computation():
+    results = random_results(200)
+    report = build(results, 50).report({})
+
+    answers = {}
+    for _, _, _, questions, flags in results:
+        question_ids = np.frombuffer(questions, dtype='<i4')
+        if len(question_ids) < 2:
+            continue
+        for question_id, flag in zip(question_ids.tolist(), np.frombuffer(flags, dtype='u1').tolist()):
+            answers.setdefault(question_id, []).append(flag)
+
+    by_id = {row['id']: row for row in report['questions']}
+    assert set(by_id) == set(answers)
+    for question_id, flags in answers.items():
+        assert by_id[question_id]['answers'] == len(flags)
+        assert by_id[question_id]['p_correct'] == round(sum(flags) / len(flags), 4)
+    assert report['results'] == 200
+
+def test_saved_stats_resume_where_they_stopped(tmp_path):
+    results = random_results(120)
+    path = str(tmp_path / 'quiz_analytics.npz')
+    build(results[:80], 16).save(path)
+
+    resumed = QuizStats.load(path)
+    resumed.update(*zip(*results[80:]))
+
+    assert_same(resumed, build(results, len(results)))
+    assert QuizStats.load(str(tmp_path / 'yoq.npz')).result_count == 0
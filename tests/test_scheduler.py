@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import app as ecoverse_app
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += timedelta(seconds=seconds)
+
+def test_daily_job_runs_every_midnight(monkeypatch):
+    clock = FakeClock(datetime(2026, 1, 1, 13, 30))
+    runs = []
+    monkeypatch.setattr(ecoverse_app, 'run_scheduled_job', lambda job_name, slot: runs.append((job_name, slot)))
+
+    ecoverse_app.scheduler_loop(clock=clock, sleep=clock.sleep, max_runs=7)
+
+    assert runs == [('daily_reset', datetime(2026, 1, 2) + timedelta(days=day)) for day in range(7)]
+    assert max(clock.sleeps) <= ecoverse_app.SCHEDULER_MAX_SLEEP_SECONDS
+
+def test_late_wakeup_still_runs_due_slot(monkeypatch):
+    clock = FakeClock(datetime(2026, 1, 1, 23, 59))
+    runs = []
+    monkeypatch.setattr(ecoverse_app, 'run_scheduled_job', lambda job_name, slot: runs.append(slot))
+
+    def oversleep(seconds):
+        clock.now += timedelta(minutes=10)
+
+    ecoverse_app.scheduler_loop(clock=clock, sleep=oversleep, max_runs=1)
+
+    assert runs == [datetime(2026, 1, 2)]
+
+def test_failed_slot_is_retried_with_backoff(monkeypatch):
+    statuses = iter(['failed', 'failed', 'success'])
+    runs = []
+    sleeps = []
+
+    def run(job_name, slot):
+        runs.append(slot)
+        return next(statuses)
+
+    monkeypatch.setattr(ecoverse_app, 'run_scheduled_job', run)
+
+    assert ecoverse_app.run_job_with_retry('daily_reset', datetime(2026, 1, 2), sleep=sleeps.append) == 'success'
+    assert runs == [datetime(2026, 1, 2)] * 3
+    assert sleeps == [ecoverse_app.SCHEDULER_RETRY_SECONDS, ecoverse_app.SCHEDULER_RETRY_SECONDS * 2]
+
+def test_retries_are_bounded(monkeypatch):
+    runs = []
+    monkeypatch.setattr(ecoverse_app, 'run_scheduled_job', lambda job_name, slot: runs.append(slot) or 'failed')
+
+    assert ecoverse_app.run_job_with_retry('daily_reset', datetime(2026, 1, 2), sleep=lambda seconds: None) == 'failed'
+    assert len(runs) == ecoverse_app.SCHEDULER_MAX_ATTEMPTS
+
+def test_skipped_slot_is_not_retried(monkeypatch):
+    runs = []
+    monkeypatch.setattr(ecoverse_app, 'run_scheduled_job', lambda job_name, slot: runs.append(slot))
+
+    ecoverse_app.run_job_with_retry('daily_reset', datetime(2026, 1, 2), sleep=lambda seconds: None)
+    assert len(runs) == 1
+
+def test_first_request_starts_scheduler_once_per_process(monkeypatch):
+    started = []
+    monkeypatch.setattr(ecoverse_app, 'start_daily_scheduler', lambda: started.append(True))
+    monkeypatch.setattr(ecoverse_app, 'background_pid', None)
+    monkeypatch.setitem(ecoverse_app.app.config, 'BACKGROUND_SERVICES', True)
+
+    client = ecoverse_app.app.test_client()
+    client.get('/__missing__')
+    client.get('/__missing__')
+
+    assert started == [True]
@@ -0,0 +1,20 @@
+from sqlalchemy import func, select
+
+def row_counts(database):
+    return {
+        model.__tablename__: database.db.session.scalar(select(func.count()).select_from(model))
+        for model in (database.User, database.Task, database.Item, database.DailyTask)
+    }
+
+def test_repeated_init_keeps_data_and_fits_budget(database):
+    database.init_database()
+    database.create_demo_data()
+    database.create_daily_tasks()
+    before = row_counts(database)
+    assert before['user'] and before['task']
+
+    elapsed = database.init_database()
+
+    database.db.session.expire_all()
+    assert row_counts(database) == before
+    assert elapsed < database.STARTUP_BUDGET_SECONDS
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('aiogram')
+
+from aiohttp.test_utils import TestClient, TestServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bot'))
+from webhook import SECRET_HEADER, ChatOrderedPool, create_webhook_app
+
+def update_json(update_id, chat_id):
+    return {
+        'update_id': update_id,
+        'message': {'message_id': update_id, 'date': 0, 'chat': {'id': chat_id, 'type': 'private'}, 'text': 'salom'},
+    }
+
+def test_updates_of_one_chat_run_in_order():
+    async def scenario():
+        handled = []
+        running = 0
+        peak = 0
+
+        async def handler(update):
+            nonlocal running, peak
+            chat, number = update
+            running += 1
+            peak = max(peak, running)
+            # Keyingi update'lar oldingisini "quvib o'tishi" uchun imkon beriladi
+            await asyncio.sleep(0.001 * (5 - number))
+            running -= 1
+            handled.append(update)
+
+        pool = ChatOrderedPool(handler, max_concurrency=4)
+        for number in range(5):
+            for chat in ('a', 'b', 'c'):
+                assert pool.submit(chat, (chat, number))
+        assert await pool.drain(timeout=5)
+        return handled, peak, pool
+
+    handled, peak, pool = asyncio.run(scenario())
+
+    for chat in ('a', 'b', 'c'):
+        assert [number for key, number in handled if key == chat] == list(range(5))
+    assert peak > 1
+    assert pool.processed == 15 and pool.pending == 0
+
+def test_failed_update_does_not_stop_its_chat():
+    async def scenario():
+        handled = []
+
+        async def handler(update):
+            if update == 1:
+                raise ValueError('xato')
+            handled.append(update)
+
+        pool = ChatOrderedPool(handler)
+        for update in range(3):
+            pool.submit('a', update)
+        await pool.drain(timeout=5)
+        return handled, pool
+
+    handled, pool = asyncio.run(scenario())
+
+    assert handled == [0, 2]
+    assert (pool.processed, pool.failed) == (2, 1)
+
+def test_drain_timeout_cancels_stuck_updates():
+    async def scenario():
+        async def handler(update):
+            await asyncio.Event().wait()
+
+        pool = ChatOrderedPool(handler)
+        pool.submit('a', 1)
+        await asyncio.sleep(0)
+        drained = await pool.drain(timeout=0.05)
+        return drained, pool.submit('b', 2), pool
+
+    drained, accepted, pool = asyncio.run(scenario())
+
+    assert drained is False
+    assert accepted is False and pool.rejected == 1
+
+class BlockingDispatcher:
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.updates = []
+
+    async def feed_update(self, bot, update):
+        await self.release.wait()
+        self.updates.append(update.update_id)
+
+def test_webhook_returns_503_when_queue_is_full():
+    async def scenario():
+        dispatcher = BlockingDispatcher()
+        app = create_webhook_app(None, dispatcher, '/webhook', secret='maxfiy', max_pending=2)
+        headers = {SECRET_HEADER: 'maxfiy'}
+        async with TestClient(TestServer(app)) as client:
+            statuses = []
+            for update_id in range(1, 4):
+                response = await client.post('/webhook', json=update_json(update_id, 10), headers=headers)
+                statuses.append((response.status, response.headers.get('Retry-After')))
+            unauthorized = (await client.get('/webhook/stats')).status
+            stats = await (await client.get('/webhook/stats', headers=headers)).json()
+            dispatcher.release.set()
+            drained = await app['pool'].drain(timeout=5)
+        return statuses, unauthorized, stats, drained, dispatcher.updates
+
+    statuses, unauthorized, stats, drained, updates = asyncio.run(scenario())
+
+    assert statuses == [(200, None), (200, None), (503, '1')]
+    assert unauthorized == 401
+    assert stats['pending'] == 2 and stats['rejected'] == 1
+    assert drained and updates == [1, 2]